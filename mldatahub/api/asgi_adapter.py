@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import asyncio
+import contextvars
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from werkzeug.exceptions import RequestEntityTooLarge
+
+__author__ = "Iván de Paz Centeno"
+
+
+def build_environ(scope: dict, body) -> dict:
+    """
+    Translates the scope of an ASGI HTTP connection into a WSGI environ.
+    :param scope: ASGI scope of the connection.
+    :param body: file-like object with the body of the request.
+    :return: WSGI environ dict.
+    """
+    server = scope.get('server') or ("localhost", 80)
+    client = scope.get('client') or ("", 0)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', "").encode("utf8").decode("latin1"),
+        'PATH_INFO': scope['path'].encode("utf8").decode("latin1"),
+        'QUERY_STRING': scope.get('query_string', b"").decode("latin1"),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': "HTTP/{}".format(scope.get('http_version', "1.1")),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', "http"),
+        'wsgi.input': body,
+        # The body is completely received before the app is called, so it can be read even without a content length.
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+
+        if name not in ["CONTENT_TYPE", "CONTENT_LENGTH"]:
+            name = "HTTP_{}".format(name)
+
+        # Repeated headers are folded into a single comma-separated one, as WSGI servers do.
+        environ[name] = value if name not in environ else "{},{}".format(environ[name], value)
+
+    return environ
+
+
+class AsgiAdapter(object):
+    """
+    ASGI application that serves a WSGI application without binding a thread to each connection.
+
+    The event loop receives the request bodies and sends the responses, so slow clients and queued connections only
+    cost a coroutine. The work of the WSGI application runs in a bounded pool of threads by steps: the handling of the
+    request and the generation of each chunk of a streamed response. A thread is only taken while a step runs, not
+    while a chunk is being sent, so any thread of the pool may run the next step of a request. The steps of a request
+    run in a context of its own, which holds the Flask request context and the ODM session of the request
+    (see ContextLocalODMSession).
+    """
+    def __init__(self, wsgi_app, max_workers: int, max_request_size: int=None, spool_size: int=0):
+        """
+        :param wsgi_app: WSGI application to serve.
+        :param max_workers: size of the pool of threads that runs the steps of the requests.
+        :param max_request_size: maximum size in bytes of the request bodies. Bigger ones are answered with a 413.
+        :param spool_size: size in bytes from which the request bodies are moved from memory to a temporary file.
+        """
+        self.wsgi_app = wsgi_app
+        self.max_request_size = max_request_size
+        self.spool_size = spool_size
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="asgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == "http":
+            await self.__serve_http(scope, receive, send)
+        elif scope['type'] == "lifespan":
+            await self.__serve_lifespan(receive, send)
+
+    async def __serve_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+
+            if message['type'] == "lifespan.startup":
+                await send({'type': "lifespan.startup.complete"})
+            elif message['type'] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+
+                await send({'type': "lifespan.shutdown.complete"})
+                return
+
+    async def __read_body(self, receive):
+        """
+        Receives the whole body of the request. It is kept in memory until it grows over the spool size, then it is
+        moved to disk.
+        :return: file-like object with the body, or None if the client disconnected.
+        :raise RequestEntityTooLarge: if the body is bigger than the maximum request size.
+        """
+        body = SpooledTemporaryFile(max_size=self.spool_size)
+        more_body = True
+
+        try:
+            while more_body:
+                message = await receive()
+
+                if message['type'] == "http.disconnect":
+                    body.close()
+                    return None
+
+                body.write(message.get('body', b""))
+                more_body = message.get('more_body', False)
+
+                if self.max_request_size is not None and body.tell() > self.max_request_size:
+                    raise RequestEntityTooLarge()
+
+        except BaseException:
+            body.close()
+            raise
+
+        body.seek(0)
+        return body
+
+    async def __serve_http(self, scope, receive, send):
+        try:
+            body = await self.__read_body(receive)
+        except RequestEntityTooLarge as ex:
+            await send({'type': "http.response.start", 'status': ex.code,
+                        'headers': [(b"content-type", b"text/plain")]})
+            await send({'type': "http.response.body", 'body': ex.description.encode()})
+            return
+
+        if body is None:
+            return
+
+        with body:
+            await self.__run_app(scope, body, send)
+
+    async def __run_app(self, scope, body, send):
+        loop = asyncio.get_running_loop()
+
+        # Every step of the request runs inside the same context, so that the Flask request context pushed by the
+        # handler and the ODM session are still available for the streamed chunks. The context starts empty, so
+        # that nothing is shared with other requests.
+        context = contextvars.Context()
+
+        def run_step(func, *args):
+            return loop.run_in_executor(self.executor, context.run, func, *args)
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            response_start['status'] = int(status.split(" ", 1)[0])
+            response_start['headers'] = [(name.lower().encode("latin1"), value.encode("latin1"))
+                                         for name, value in headers]
+
+        environ = build_environ(scope, body)
+        result = await run_step(self.wsgi_app, environ, start_response)
+
+        try:
+            iterator = iter(result)
+            chunk = await run_step(next, iterator, None)
+
+            await send({'type': "http.response.start", 'status': response_start['status'],
+                        'headers': response_start['headers']})
+
+            while chunk is not None:
+                if len(chunk) > 0:
+                    await send({'type': "http.response.body", 'body': chunk, 'more_body': True})
+
+                chunk = await run_step(next, iterator, None)
+
+            await send({'type': "http.response.body", 'body': b""})
+
+        finally:
+            if hasattr(result, "close"):
+                await run_step(result.close)
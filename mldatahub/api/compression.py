@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import zlib
+from flask import request
+from mldatahub.config.config import global_config
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__author__ = "Iván de Paz Centeno"
+
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Responses without body or whose body must be sent untouched.
+UNCOMPRESSIBLE_STATUS = {204, 206, 304}
+
+
+def supported_encodings() -> list:
+    """
+    :return: list of content codings supported by the server, by order of preference.
+    """
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+class GzipCompressor(object):
+    def __init__(self):
+        # wbits 31 produces the gzip container instead of the raw zlib one.
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+
+class ZstdCompressor(object):
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self.compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self.compressor.flush()
+
+
+COMPRESSORS = {
+    "gzip": GzipCompressor,
+    "zstd": ZstdCompressor
+}
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    Compresses a whole body.
+    :param data: body to compress.
+    :param encoding: content coding to apply (one of supported_encodings()).
+    :return: compressed body.
+    """
+    compressor = COMPRESSORS[encoding]()
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compresses a streamed body chunk by chunk, so that it is never held as a whole.
+    :param chunks: iterable of bytes of the body.
+    :param encoding: content coding to apply (one of supported_encodings()).
+    :return: generator of compressed bytes.
+    """
+    compressor = COMPRESSORS[encoding]()
+
+    try:
+        for chunk in chunks:
+            compressed_chunk = compressor.compress(chunk)
+
+            # Compressors buffer small inputs; empty chunks would end a chunked transfer.
+            if len(compressed_chunk) > 0:
+                yield compressed_chunk
+
+        yield compressor.flush()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response):
+    """
+    Compresses the body of a response with the best content coding accepted by the client (Accept-Encoding).
+    Only the mimetypes listed in the "compression_mimetypes" config value are compressed, so that contents already
+    compressed (like images) are sent as they are. Bodies smaller than "compression_min_size" Bytes are not worth it.
+    :param response: response of the request.
+    :return: the same response, compressed if possible.
+    """
+    if response.status_code < 200 or response.status_code in UNCOMPRESSIBLE_STATUS or request.method == "HEAD":
+        return response
+
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+
+    if response.mimetype not in global_config.get_compression_mimetypes():
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = request.accept_encodings.best_match(supported_encodings())
+
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+
+        if len(data) < global_config.get_compression_min_size():
+            return response
+
+        response.set_data(compress(data, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+
+    # A strong ETag identifies the exact bytes sent, which now depend on the coding.
+    etag, weak = response.get_etag()
+
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def register_compression(app):
+    """
+    Negotiates the compression of the responses of the given Flask application.
+    :param app: Flask application.
+    """
+    app.after_request(compress_response)
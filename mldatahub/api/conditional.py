@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from datetime import timezone
+import hashlib
+import json
+from flask import request, Response
+from werkzeug.http import quote_etag, http_date
+
+__author__ = "Iván de Paz Centeno"
+
+
+def metadata_etag(document_id, modification_date) -> str:
+    """
+    Builds the ETag of a document from its modification date. Mongo keeps dates with milliseconds precision.
+    :param document_id: ID of the document.
+    :param modification_date: datetime of the last modification of the document.
+    :return: string with the ETag.
+    """
+    return "{}-{}".format(document_id, modification_date.strftime("%Y%m%d%H%M%S%f")[:-3])
+
+
+def serialization_etag(serialization: dict) -> str:
+    """
+    Builds the ETag of a serialized document from its content.
+    :param serialization: dict with the serialized document.
+    :return: string with the ETag.
+    """
+    return hashlib.sha256(json.dumps(serialization, sort_keys=True).encode()).hexdigest()
+
+
+def _to_utc(date):
+    # Naive dates are local dates (see timing_helper.now()).
+    return date.astimezone(timezone.utc) if date.tzinfo is None else date
+
+
+def validators_headers(etag: str, last_modified=None) -> dict:
+    """
+    Builds the headers that allow clients to validate their cached copy of the resource.
+    Resources are mutable under the same URL and restricted to the token that requested them, thus they are only
+    cached privately and revalidated on every read.
+    :param etag: strong ETag of the resource.
+    :param last_modified: datetime of the last modification of the resource, if known.
+    :return: dict with the headers.
+    """
+    headers = {'ETag': quote_etag(etag), 'Cache-Control': "private, no-cache"}
+
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(_to_utc(last_modified))
+
+    return headers
+
+
+def is_not_modified(etag: str, last_modified=None) -> bool:
+    """
+    Checks the conditional headers of the current request. If-None-Match takes precedence over If-Modified-Since.
+    :param etag: strong ETag of the resource.
+    :param last_modified: datetime of the last modification of the resource, if known.
+    :return: True if the client copy is still valid, False otherwise.
+    """
+    if request.if_none_match:
+        # Weak comparison: the ETag is weakened when the response is compressed.
+        return request.if_none_match.contains_weak(etag)
+
+    if_modified_since = request.if_modified_since
+
+    if last_modified is None or if_modified_since is None:
+        return False
+
+    if if_modified_since.tzinfo is None:
+        if_modified_since = if_modified_since.replace(tzinfo=timezone.utc)
+
+    # HTTP dates have seconds precision.
+    return _to_utc(last_modified).replace(microsecond=0) <= if_modified_since
+
+
+def not_modified_response(headers: dict) -> Response:
+    """
+    :param headers: validators headers of the resource.
+    :return: Response 304 without body.
+    """
+    return Response(status=304, headers=headers)
@@ -22,7 +22,9 @@
 
 from flask import request
 from flask_restful import reqparse, abort
+from mldatahub.api.conditional import serialization_etag, validators_headers, is_not_modified, not_modified_response
 from mldatahub.api.tokenized_resource import TokenizedResource, control_access
+from mldatahub.cache.dataset_cache import invalidate_dataset
 from mldatahub.config.config import global_config
 from mldatahub.config.privileges import Privileges
 from mldatahub.factory.dataset_factory import DatasetFactory
@@ -88,8 +90,6 @@ class Datasets(TokenizedResource):
         Retrieves all the datasets associated to the current token.
         :return:
         """
-        self.session.clear()
-
         required_privileges = [
             Privileges.RO_WATCH_DATASET,
             Privileges.ADMIN_EDIT_TOKEN
@@ -97,7 +97,8 @@ class Datasets(TokenizedResource):
 
         _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
 
-        result = [dataset.serialize() for dataset in token.datasets]
+        # Views are serialized by the JSON representation as it writes the list.
+        result = DatasetFactory(token).get_datasets_view()
 
         return result
 
@@ -194,7 +195,14 @@ class Dataset(TokenizedResource):
         dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
         result = dataset.serialize()
 
-        return result, 200
+        # The modification date of the dataset does not cover its elements, thus the ETag is built from the result.
+        etag = serialization_etag(result)
+        headers = validators_headers(etag)
+
+        if is_not_modified(etag):
+            return not_modified_response(headers)
+
+        return result, 200, headers
 
     @control_access()
     def patch(self, token_prefix, dataset_prefix):
@@ -346,7 +354,7 @@ class DatasetSize(TokenizedResource):
         dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
 
         total_size = global_config.get_storage().get_files_size([l.file_ref_id for l in dataset.elements])
-        dataset.size = total_size
-        self.session.flush()
+        DatasetDAO.query.update({'_id': dataset._id}, {'$set': {'size': total_size}})
+        invalidate_dataset(dataset.url_prefix)
 
         return total_size, 200
@@ -21,21 +21,98 @@
 # MA  02110-1301, USA.
 
 from io import BytesIO
+from tempfile import SpooledTemporaryFile
 from threading import Lock
 
 from bson import ObjectId
-from flask import send_file, request
+from flask import send_file, request, Response, stream_with_context
 from flask_restful import reqparse, abort
-from pyzip import PyZip
+from werkzeug.datastructures import ContentRange
+from pyzip import InvalidKeysHashes
 
+from mldatahub.api.conditional import metadata_etag, validators_headers, is_not_modified, not_modified_response
 from mldatahub.api.tokenized_resource import TokenizedResource, control_access
 from mldatahub.config.config import global_config
 from mldatahub.config.privileges import Privileges
 from mldatahub.factory.dataset_element_factory import DatasetElementFactory
 from mldatahub.factory.dataset_factory import DatasetFactory
+from mldatahub.helper.frame_helper import FRAMES_MIMETYPE, InvalidFrames, stream_frames, iterate_frames
+from mldatahub.helper.manifest_helper import MANIFEST_MIMETYPE
+from mldatahub.helper.zip_helper import stream_zip, iterate_zip
 
 __author__ = "Iván de Paz Centeno"
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ZIP_MIMETYPE = "application/octet-stream"
+
+
+def _spool_request_content():
+    """
+    Reads the body of the request in chunks into a temporary file. It is kept in memory until it grows over the
+    "upload_spool_size" config value, then it is moved to disk. Requests bigger than "max_request_size" are rejected
+    before buffering them.
+    :return: SpooledTemporaryFile with the content of the request, positioned at the beginning.
+    """
+    max_request_size = global_config.get_max_request_size()
+
+    if request.content_length is not None and request.content_length > max_request_size:
+        abort(413, message="Request size limit of {} Bytes exceeded".format(max_request_size))
+
+    spooled_content = SpooledTemporaryFile(max_size=global_config.get_upload_spool_size())
+    read_size = 0
+
+    for chunk in iter(lambda: request.stream.read(UPLOAD_CHUNK_SIZE), b""):
+        read_size += len(chunk)
+
+        if read_size > max_request_size:
+            spooled_content.close()
+            abort(413, message="Request size limit of {} Bytes exceeded".format(max_request_size))
+
+        spooled_content.write(chunk)
+
+    spooled_content.seek(0)
+    return spooled_content
+
+
+def _read_request_bytes(max_size, limit_name="Request"):
+    """
+    Reads a body small enough to be kept in memory, like a chunk of an upload by parts or the content of a single
+    element. Bodies bigger than the limit are rejected as soon as the limit is crossed.
+    :param max_size: max size in Bytes of the body.
+    :param limit_name: name of the limit, for the error message.
+    :return: bytes of the body.
+    """
+    if request.content_length is not None and request.content_length > max_size:
+        abort(413, message="{} size limit of {} Bytes exceeded".format(limit_name, max_size))
+
+    content = BytesIO()
+
+    for chunk in iter(lambda: request.stream.read(UPLOAD_CHUNK_SIZE), b""):
+        if content.tell() + len(chunk) > max_size:
+            abort(413, message="{} size limit of {} Bytes exceeded".format(limit_name, max_size))
+
+        content.write(chunk)
+
+    return content.getvalue()
+
+
+def _get_content_range(etag: str):
+    """
+    Retrieves the byte range requested by the client, if it can be served. Only single ranges are supported,
+    otherwise the whole content is served. If-Range is honoured with the ETag of the content.
+    :param etag: strong ETag of the content.
+    :return: tuple (start, end) with python slice semantics, or None if the whole content must be served.
+    """
+    if request.range is None or request.range.units != "bytes" or len(request.range.ranges) != 1:
+        return None
+
+    if_range = request.if_range
+
+    if if_range.date is not None or (if_range.etag is not None and if_range.etag != etag):
+        return None
+
+    return request.range.ranges[0]
+
 
 def _get_elements_real_id(elements_ids: list, dataset_element_factory: DatasetElementFactory):
     """
@@ -102,6 +179,13 @@ class DatasetElements(TokenizedResource):
                     "help": "Tags for the dataset (ease the searches for this dataset).",
                     "location": "json"
                 },
+            "content_sha256":
+                {
+                    "type": str,
+                    "required": False,
+                    "help": "SHA256 hash of a content already stored in the server, to be referenced by the element.",
+                    "location": "json"
+                },
         }
 
         for argument, kwargs in arguments.items():
@@ -142,9 +226,10 @@ class DatasetElements(TokenizedResource):
         else:
             options = None
 
-        elements_info = DatasetElementFactory(token, dataset).get_elements_info(page, options=options, page_size=page_size)
+        elements_info = DatasetElementFactory(token, dataset).get_elements_view(page, options=options, page_size=page_size)
 
-        result = [element.serialize() for element in elements_info]
+        # Views are serialized by the JSON representation as it writes the page.
+        result = elements_info
 
         return result
 
@@ -222,12 +307,13 @@ class DatasetElementsBundle(TokenizedResource):
         new_elements_ids = _get_elements_real_id(elements_ids, dataset_element_factory)
 
         try:
-            elements_info = dataset_element_factory.get_specific_elements_info(new_elements_ids)
+            elements_info = dataset_element_factory.get_specific_elements_view(new_elements_ids)
         except KeyError as e:
             elements_info = []
             abort(404, message=str(e)[1:-1])
 
-        result = [element.serialize() for element in elements_info]
+        # Views are serialized by the JSON representation as it writes the page.
+        result = elements_info
 
         # The client has to check for a "previous_id" field in the result.
         # In case he finds it, he must update his index table to change "previous_id" to "_id".
@@ -364,6 +450,13 @@ class DatasetElement(TokenizedResource):
                     "help": "Tags for the dataset (ease the searches for this dataset).",
                     "location": "json"
                 },
+            "content_sha256":
+                {
+                    "type": str,
+                    "required": False,
+                    "help": "SHA256 hash of a content already stored in the server, to replace the element's content.",
+                    "location": "json"
+                },
         }
 
         for argument, kwargs in arguments.items():
@@ -392,9 +485,15 @@ class DatasetElement(TokenizedResource):
 
         element = dataset_element_factory.get_element_info(real_element_id)
 
+        etag = metadata_etag(element._id, element.modification_date)
+        headers = validators_headers(etag, last_modified=element.modification_date)
+
+        if is_not_modified(etag, last_modified=element.modification_date):
+            return not_modified_response(headers)
+
         result = element.serialize()
 
-        return result, 200
+        return result, 200, headers
 
     @control_access()
     def patch(self, token_prefix, dataset_prefix, element_id):
@@ -485,9 +584,36 @@ class DatasetElementContent(TokenizedResource):
         # certain cases where not: after a modification of a forked element.
         real_element_id = _get_elements_real_id([wrapped_element_id], dataset_element_factory)[0]
 
+        # Contents are addressed by their hash: it is enough to validate the client copy without reading the storage.
+        etag = dataset_element_factory.get_element_content_hash(real_element_id)
+        headers = validators_headers(etag)
+        headers['Accept-Ranges'] = "bytes"
+
+        if is_not_modified(etag):
+            return not_modified_response(headers)
+
+        content_range = _get_content_range(etag)
+
+        if content_range is not None:
+            start, end = content_range
+            file = dataset_element_factory.get_element_content_range(real_element_id, start, end)
+            first, last, _ = slice(start, end).indices(file.size)
+
+            if first >= last:
+                headers['Content-Range'] = ContentRange("bytes", None, None, file.size).to_header()
+                return Response(status=416, headers=headers)
+
+            headers['Content-Range'] = ContentRange("bytes", first, last, file.size).to_header()
+            return Response(file.content, status=206, headers=headers, mimetype="application/octet-stream")
+
         content = dataset_element_factory.get_element_content(real_element_id)
 
-        return send_file(BytesIO(content), mimetype="application/octet-stream")
+        response = send_file(BytesIO(content), mimetype="application/octet-stream", conditional=False)
+
+        for header, value in headers.items():
+            response.headers[header] = value
+
+        return response
 
     @control_access()
     def put(self, token_prefix, dataset_prefix, element_id):
@@ -511,7 +637,11 @@ class DatasetElementContent(TokenizedResource):
         # certain cases where not: after a modification of a forked element.
         real_element_id = _get_elements_real_id([wrapped_element_id], dataset_element_factory)[0]
 
-        content = request.stream.read()
+        # The storage keeps a content in a single document, thus it is read into memory. Spooling it would not help:
+        # contents are bounded by the file size limit, and bigger ones are rejected as soon as they cross it.
+        content = _read_request_bytes(min(global_config.get_file_size_limit(), global_config.get_max_request_size()),
+                                      "File")
+
         dataset_element_factory.edit_element(real_element_id, content=content)
 
         self.session.flush()
@@ -564,11 +694,14 @@ class DatasetElementContentBundle(TokenizedResource):
         # certain cases where not: after a modification of a forked element.
         real_elements_ids = _get_elements_real_id(elements_ids, dataset_element_factory)
 
-        elements_content = dataset_element_factory.get_elements_content(real_elements_ids)
+        elements_content = dataset_element_factory.iterate_elements_content(real_elements_ids)
 
-        packet = PyZip(elements_content)
+        # Zip is the default format. Frames are served only to the clients that ask for them.
+        if request.accept_mimetypes.best_match([ZIP_MIMETYPE, FRAMES_MIMETYPE]) == FRAMES_MIMETYPE:
+            return Response(stream_with_context(stream_frames(elements_content)), mimetype=FRAMES_MIMETYPE)
 
-        return send_file(BytesIO(packet.to_bytes()), mimetype="application/octet-stream")
+        # The zip is streamed entry by entry as the contents are read from the storage.
+        return Response(stream_with_context(stream_zip(elements_content)), mimetype=ZIP_MIMETYPE)
 
     @control_access()
     def put(self, token_prefix, dataset_prefix):
@@ -580,25 +713,294 @@ class DatasetElementContentBundle(TokenizedResource):
         _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
         full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
 
-        content = request.stream.read()
-        try:
-            packet = PyZip().from_bytes(content)
-        except Exception:
-            packet = None
-            abort(422, message="The content pushed is not readable. Ensure that your version of DHUB is the latest one.")
+        with _spool_request_content() as spooled_content:
+            try:
+                if request.mimetype == FRAMES_MIMETYPE:
+                    keys, entries = iterate_frames(spooled_content)
+                else:
+                    keys, entries = iterate_zip(spooled_content)
+
+                elements_ids = [ObjectId(key) for key in keys]
+            except Exception:
+                keys, entries, elements_ids = None, None, None
+                abort(422, message="The content pushed is not readable. Ensure that your version of DHUB is the latest one.")
+
+            dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+            dataset_element_factory = DatasetElementFactory(token, dataset)
+
+            translation_dict = dataset_element_factory.discover_real_id(elements_ids)
+            real_elements_ids = [translation_dict.get(element_id, element_id) for element_id in elements_ids]
+
+            # Entries are read, verified and stored one by one, with the new ids.
+            def contents_generator():
+                try:
+                    for key, content in entries:
+                        element_id = ObjectId(key)
+                        yield translation_dict.get(element_id, element_id), content
+                except (InvalidKeysHashes, InvalidFrames) as ex:
+                    abort(422, message="The content pushed is corrupted: {}".format(ex))
+
+            dataset_element_factory.edit_elements_content(real_elements_ids, contents_generator())
+
+        self.session.flush()
+
+        return "Done", 200
+
+
+class DatasetElementContentUploads(TokenizedResource):
+    def __init__(self):
+        super().__init__()
+        self.post_parser = reqparse.RequestParser()
+        self.post_parser.add_argument("size", type=int, required=True, location="json",
+                                      help="Size in Bytes of the whole content to upload.")
+        self.post_parser.add_argument("sha256", type=str, required=False, location="json",
+                                      help="SHA256 hash of the whole content, verified when the upload is committed.")
+        self.session = global_config.get_session()
+
+    @control_access()
+    def post(self, token_prefix, dataset_prefix, element_id):
+        """
+        Opens an upload by parts of the content of the element. The content is sent in chunks of "chunk_size" Bytes
+        to /datasets/<token_prefix>/<dataset_prefix>/uploads/<upload_id>/<chunk_index>, in any order and as many times
+        as needed, and then the upload is committed.
+        :return:
+        """
+        required_privileges = [
+            Privileges.EDIT_ELEMENTS,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+        args = self.post_parser.parse_args()
+
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
 
         dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
 
         dataset_element_factory = DatasetElementFactory(token, dataset)
 
-        elements_ids = list(packet.keys())
-        translation_dict = dataset_element_factory.discover_real_id(elements_ids)
+        real_element_id = _get_elements_real_id([ObjectId(element_id)], dataset_element_factory)[0]
 
-        # Now rebuild the elements with the new ids
-        elements_kwargs_postprocessed = {(k if k not in translation_dict else translation_dict[k]): {'content': v} for k, v in packet.items()}
+        upload = dataset_element_factory.create_upload(real_element_id, args['size'], args['sha256'])
 
-        dataset_element_factory.edit_elements(elements_kwargs_postprocessed)
+        result = {
+            "upload_id": str(upload['_id']),
+            "chunk_size": upload['chunk_size'],
+            "chunks_count": DatasetElementFactory.get_upload_chunks_count(upload)
+        }
+
+        return result, 201
+
+
+class DatasetUpload(TokenizedResource):
+    def __init__(self):
+        super().__init__()
+        self.session = global_config.get_session()
+
+    @control_access()
+    def get(self, token_prefix, dataset_prefix, upload_id):
+        """
+        Retrieves the state of an upload by parts, to resume it: the chunks received so far and their offsets.
+        :return:
+        """
+        required_privileges = [
+            Privileges.EDIT_ELEMENTS,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
+
+        dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+        upload, received_chunks = DatasetElementFactory(token, dataset).get_upload(ObjectId(upload_id))
+
+        result = {
+            "upload_id": str(upload['_id']),
+            "element_id": str(upload['element_id']),
+            "size": upload['size'],
+            "chunk_size": upload['chunk_size'],
+            "chunks_count": DatasetElementFactory.get_upload_chunks_count(upload),
+            "received_chunks": received_chunks,
+            "received_offsets": [index * upload['chunk_size'] for index in received_chunks]
+        }
+
+        return result, 200
+
+    @control_access()
+    def post(self, token_prefix, dataset_prefix, upload_id):
+        """
+        Commits an upload by parts: its chunks become the content of the element.
+        :return:
+        """
+        required_privileges = [
+            Privileges.EDIT_ELEMENTS,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
+
+        dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+        element = DatasetElementFactory(token, dataset).commit_upload(ObjectId(upload_id))
 
         self.session.flush()
 
+        return str(element._id), 200
+
+    @control_access()
+    def delete(self, token_prefix, dataset_prefix, upload_id):
+        required_privileges = [
+            Privileges.EDIT_ELEMENTS,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
+
+        dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+        DatasetElementFactory(token, dataset).abort_upload(ObjectId(upload_id))
+
         return "Done", 200
+
+
+class DatasetUploadChunk(TokenizedResource):
+    def __init__(self):
+        super().__init__()
+        self.session = global_config.get_session()
+
+    @control_access()
+    def put(self, token_prefix, dataset_prefix, upload_id, chunk_index):
+        required_privileges = [
+            Privileges.EDIT_ELEMENTS,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
+
+        dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+        content = _read_request_bytes(global_config.get_upload_chunk_size(), "Chunk")
+
+        DatasetElementFactory(token, dataset).put_upload_chunk(ObjectId(upload_id), chunk_index, content)
+
+        return "Done", 200
+
+
+class DatasetElementsContentNegotiation(TokenizedResource):
+    def __init__(self):
+        super().__init__()
+        self.post_parser = reqparse.RequestParser()
+        self.post_parser.add_argument("hashes", type=list, required=True, location="json",
+                                      help="List of SHA256 hashes of the contents to upload.")
+        self.session = global_config.get_session()
+
+    @control_access()
+    def post(self, token_prefix, dataset_prefix):
+        """
+        Negotiates the upload of a bundle of contents: returns the SHA256 hashes whose content is not stored in the
+        server. The rest can be referenced by their hash (field "content_sha256") when creating or editing elements,
+        without transferring them again.
+        :return:
+        """
+        required_privileges = [
+            Privileges.ADD_ELEMENTS,
+            Privileges.EDIT_ELEMENTS,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+        self.post_parser.parse_args()
+
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
+
+        dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+        # That json value is required, it is validated by the post_parser; so, it is ensured that key exists in the dict.
+        hashes = request.json['hashes']
+
+        missing_hashes = DatasetElementFactory(token, dataset).get_missing_contents(hashes)
+
+        return {"missing": missing_hashes}, 200
+
+
+class DatasetManifest(TokenizedResource):
+    def __init__(self):
+        super().__init__()
+        self.session = global_config.get_session()
+
+    @control_access()
+    def get(self, token_prefix, dataset_prefix):
+        required_privileges = [
+            Privileges.RO_WATCH_DATASET,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
+
+        dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+        dataset_element_factory = DatasetElementFactory(token, dataset)
+
+        # The manifest only changes with the version of the dataset: a cached copy is validated without building it.
+        etag = "{}-{}".format(dataset._id, dataset_element_factory.get_version())
+        headers = validators_headers(etag)
+
+        if is_not_modified(etag):
+            return not_modified_response(headers)
+
+        manifest = dataset_element_factory.get_manifest()
+
+        # The dataset may have changed meanwhile: the ETag must be the one of the manifest served.
+        headers = validators_headers("{}-{}".format(dataset._id, manifest.version))
+
+        return Response(manifest.content, headers=headers, mimetype=MANIFEST_MIMETYPE)
+
+
+class DatasetChanges(TokenizedResource):
+    def __init__(self):
+        super().__init__()
+        self.get_parser = reqparse.RequestParser()
+        self.get_parser.add_argument("since", type=int, required=True, location="args",
+                                     help="Version of the dataset after which the changes are retrieved.")
+        self.session = global_config.get_session()
+
+    @control_access()
+    def get(self, token_prefix, dataset_prefix):
+        """
+        Retrieves the changes of the elements of the dataset after the given version, as logged by the factories.
+        The version of the manifest is a valid starting point. Clients must keep requesting while "version" is lower
+        than "latest_version".
+        :return:
+        """
+        required_privileges = [
+            Privileges.RO_WATCH_DATASET,
+            Privileges.ADMIN_EDIT_TOKEN
+        ]
+
+        _, token = self.token_parser.parse_args(required_any_token_privileges=required_privileges)
+        args = self.get_parser.parse_args()
+        full_dataset_url_prefix = "{}/{}".format(token_prefix, dataset_prefix)
+
+        dataset = DatasetFactory(token).get_dataset(full_dataset_url_prefix)
+
+        version, latest_version, entries = DatasetElementFactory(token, dataset).get_changes(args['since'])
+
+        changes = []
+
+        for entry in entries:
+            for change in entry['changes']:
+                change = {k: str(v) for k, v in change.items()}
+                change.update(seq=entry['seq'], date=str(entry['date']))
+                changes.append(change)
+
+        return {"version": version, "latest_version": latest_version, "changes": changes}, 200
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from datetime import timedelta
+from threading import Event, Lock, Thread
+import time
+from pymongo import ReturnDocument, UpdateOne
+from mldatahub.config.config import global_config
+from mldatahub.helper.mongo_helper import is_in_memory
+from mldatahub.helper.timing_helper import now
+from mldatahub.log.logger import Logger
+
+__author__ = 'Iván de Paz Centeno'
+
+
+logger = Logger("RATE-LIMITER",
+                verbosity_level=global_config.get_log_verbosity(),
+                log_file=global_config.get_log_file())
+
+w = logger.warning
+
+# Counters of the accesses of each key, shared by the processes of the "memory" rate limiter.
+RATE_LIMITS_COLLECTION = "rate_limit"
+
+# Accesses of each key within its current window, for the "mongo" rate limiter.
+ACCESS_WINDOWS_COLLECTION = "rate_limit_window"
+
+
+def ensure_indexes(session=None):
+    """
+    Creates the TTL indexes that remove the documents of the rate limiters once they expire.
+    :param session: ODM session whose database holds the collections. If None, the global one is used.
+    """
+    if session is None:
+        session = global_config.get_session()
+
+    for collection_name in [RATE_LIMITS_COLLECTION, ACCESS_WINDOWS_COLLECTION]:
+        session.impl.db[collection_name].create_index('expires', expireAfterSeconds=0)
+
+
+class RateLimiter(object):
+    """
+    Base class of the rate limiters. Each key (like an IP or a token) is allowed a max number of accesses within
+    a time window of "reset_time" seconds.
+    """
+
+    def __init__(self, reset_time):
+        self.reset_time = reset_time
+
+    def allow(self, key, max_accesses) -> bool:
+        pass
+
+    def start(self):
+        """
+        Starts the background work of the rate limiter, if any. Each process must start it once it is forked.
+        """
+        pass
+
+    def stop(self):
+        pass
+
+
+class MongoRateLimiter(RateLimiter):
+    """
+    Rate limiter that counts the accesses of each key within its current window in a document of Mongo, which is
+    updated on every access. The document expires with its window.
+    """
+
+    def __init__(self, reset_time, session=None):
+        super().__init__(reset_time)
+
+        if session is None:
+            session = global_config.get_session()
+
+        self.session = session
+
+    def allow(self, key, max_accesses) -> bool:
+        collection = self.session.impl.db[ACCESS_WINDOWS_COLLECTION]
+        current_date = now()
+
+        document = collection.find_one_and_update({'_id': key, 'expires': {'$gt': current_date}},
+                                                  {'$inc': {'accesses': 1}}, return_document=ReturnDocument.AFTER)
+
+        if document is None:
+            # No window in progress: this access opens a new one.
+            window = {'accesses': 1, 'expires': current_date + timedelta(seconds=self.reset_time)}
+            collection.update_one({'_id': key}, {'$set': window}, upsert=True)
+            accesses = 1
+        else:
+            accesses = document['accesses']
+
+        # The accesses before this one are checked against the max.
+        return accesses - 1 <= max_accesses
+
+
+class TokenBucketRateLimiter(RateLimiter):
+    """
+    In-process rate limiter based on token buckets. Each key has a bucket of "max_accesses" tokens, refilled at a
+    rate of "max_accesses" tokens every "reset_time" seconds. Buckets are spread in shards, each one with its own lock.
+
+    Every "sync_interval" seconds a background thread adds the accesses of this process to a counter per key in Mongo.
+    The accesses made by the rest of the processes since the last sync are then taken from the local buckets. Counters
+    expire once no process has synced them for two windows, when all the buckets of the key are full again.
+    """
+
+    def __init__(self, reset_time, shards_count=16, sync_interval=5, session=None):
+        super().__init__(reset_time)
+
+        if session is None:
+            session = global_config.get_session()
+
+        self.session = session
+        self.sync_interval = sync_interval
+        self.shards = [({}, {}, Lock()) for _ in range(shards_count)]
+        self.synced_totals = {}
+        self.sync_lock = Lock()
+        self.sync_thread = None
+        self.sync_stopped = Event()
+
+    def __get_shard(self, key):
+        return self.shards[hash(key) % len(self.shards)]
+
+    def allow(self, key, max_accesses) -> bool:
+        buckets, pending, lock = self.__get_shard(key)
+        current_time = time.monotonic()
+
+        with lock:
+            tokens, last_time = buckets.get(key, (max_accesses, current_time))
+            tokens = min(max_accesses, tokens + (current_time - last_time) * max_accesses / self.reset_time)
+            allowed = tokens >= 1
+
+            if allowed:
+                tokens -= 1
+                pending[key] = pending.get(key, 0) + 1
+
+            buckets[key] = (tokens, current_time)
+
+        return allowed
+
+    def start(self):
+        """
+        Starts the thread that syncs the accesses every "sync_interval" seconds, out of the requests.
+        """
+        if self.sync_thread is not None and self.sync_thread.is_alive():
+            return
+
+        self.sync_stopped.clear()
+        self.sync_thread = Thread(target=self.__sync_periodically, name="rate-limiter-sync", daemon=True)
+        self.sync_thread.start()
+
+    def stop(self):
+        """
+        Stops the thread that syncs the accesses, after a last sync.
+        """
+        if self.sync_thread is None:
+            return
+
+        self.sync_stopped.set()
+        self.sync_thread.join()
+        self.sync_thread = None
+
+    def __sync_periodically(self):
+        stopped = False
+
+        while not stopped:
+            stopped = self.sync_stopped.wait(self.sync_interval)
+
+            try:
+                self.sync()
+            except Exception as ex:
+                # The local buckets keep limiting the accesses meanwhile.
+                w("Accesses could not be synced: {}".format(ex))
+
+    def __consume(self, key, count):
+        buckets, _, lock = self.__get_shard(key)
+
+        with lock:
+            if key in buckets:
+                tokens, last_time = buckets[key]
+                buckets[key] = (max(0, tokens - count), last_time)
+
+    def sync(self):
+        """
+        Shares the accesses of this process with the rest of the processes through Mongo.
+        Only one thread of the process syncs at a time; the rest skip it.
+        """
+        if not self.sync_lock.acquire(blocking=False):
+            return
+
+        try:
+            current_time = time.monotonic()
+            accesses = {}
+
+            for buckets, pending, lock in self.shards:
+                with lock:
+                    # Buckets idle for a whole window are full, they can be dropped.
+                    idle_keys = [key for key, (_, last_time) in buckets.items() if current_time - last_time >= self.reset_time]
+
+                    for key in idle_keys:
+                        del buckets[key]
+                        self.synced_totals.pop(key, None)
+
+                    # Keys with a bucket are synced even without accesses, to learn about the ones of other processes.
+                    accesses.update({key: 0 for key in buckets})
+                    accesses.update(pending)
+                    pending.clear()
+
+            if len(accesses) == 0:
+                return
+
+            collection = self.session.impl.db[RATE_LIMITS_COLLECTION]
+            expires = now() + timedelta(seconds=2 * self.reset_time)
+
+            updates = {key: {'$inc': {'accesses': count}, '$set': {'expires': expires}} for key, count in accesses.items()}
+
+            # A round trip for the increments of all the keys, and another one to read their totals.
+            if is_in_memory(collection):
+                # The in-memory backend only applies the first operation of a bulk write.
+                for key, update in updates.items():
+                    collection.update_one({'_id': key}, update, upsert=True)
+            else:
+                collection.bulk_write([UpdateOne({'_id': key}, update, upsert=True) for key, update in updates.items()],
+                                      ordered=False)
+
+            totals = {document['_id']: document['accesses']
+                      for document in collection.find({'_id': {'$in': list(accesses)}}, {'accesses': 1})}
+
+            for key, count in accesses.items():
+                total = totals.get(key, count)
+                previous_total = self.synced_totals.get(key)
+                self.synced_totals[key] = total
+
+                # Totals of other processes are only known between consecutive syncs of the same counter.
+                if previous_total is not None and total > previous_total:
+                    self.__consume(key, total - previous_total - count)
+        finally:
+            self.sync_lock.release()
+
+
+def build_rate_limiter() -> RateLimiter:
+    """
+    Builds the rate limiter specified in the "rate_limiter" config key.
+    :return: RateLimiter instance.
+    """
+    backend = global_config.get_rate_limiter()
+    reset_time = global_config.get_access_reset_time()
+
+    if backend == "mongo":
+        return MongoRateLimiter(reset_time)
+
+    return TokenBucketRateLimiter(reset_time, shards_count=global_config.get_rate_limiter_shards(),
+                                  sync_interval=global_config.get_rate_limiter_sync_interval())
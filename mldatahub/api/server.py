@@ -25,6 +25,7 @@ __author__ = "Iván de Paz Centeno"
 
 from flask import request
 from mldatahub import __version__
+from mldatahub.api.session_scope import identity_map_metric
 from mldatahub.api.tokenized_resource import TokenizedResource, control_access
 from mldatahub.config.config import global_config
 from mldatahub.config.privileges import Privileges
@@ -55,4 +56,7 @@ class Server(TokenizedResource):
             'Page-Size': global_config.get_page_size()
         }
 
+        if token.privileges & Privileges.ADMIN_EDIT_TOKEN:
+            response['Identity-Map'] = identity_map_metric.serialize()
+
         return response
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from threading import Lock
+from mldatahub.config.config import global_config
+from mldatahub.log.logger import Logger
+
+__author__ = "Iván de Paz Centeno"
+
+
+logger = Logger("SESSION",
+                verbosity_level=global_config.get_log_verbosity(),
+                log_file=global_config.get_log_file())
+
+d = logger.debug
+
+session = global_config.get_session()
+
+
+class IdentityMapMetric(object):
+    """
+    Keeps track of the number of objects held by the identity map of the ODM session at the end of each request.
+    """
+    def __init__(self):
+        self.lock = Lock()
+        self.last = 0
+        self.peak = 0
+        self.requests = 0
+
+    def record(self, size: int) -> bool:
+        """
+        Records the size of an identity map.
+        :param size: number of objects in the identity map.
+        :return: True if the size is a new peak, False otherwise.
+        """
+        with self.lock:
+            self.last = size
+            self.requests += 1
+            new_peak = size > self.peak
+
+            if new_peak:
+                self.peak = size
+
+        return new_peak
+
+    def serialize(self) -> dict:
+        with self.lock:
+            return {'last': self.last, 'peak': self.peak, 'requests': self.requests}
+
+
+identity_map_metric = IdentityMapMetric()
+
+
+def identity_map_size() -> int:
+    """
+    :return: number of objects tracked by the identity map of the current context's ODM session.
+    """
+    return sum(1 for _ in session.imap)
+
+
+def open_request_session():
+    """
+    Starts the unit of work of a request with an empty ODM session, so that nothing leaks from previous
+    requests served by the same thread.
+    """
+    session.clear()
+
+
+def commit_request_session(response):
+    """
+    Flushes the unit of work of a request, only if the request succeeded.
+    Aborted requests must not persist the half-done modifications they left in the session.
+    :param response: response of the request.
+    :return: the same response.
+    """
+    if response.status_code < 400:
+        session.flush()
+
+    return response
+
+
+def close_request_session(exception=None):
+    """
+    Closes the unit of work of a request. The ODM session is always cleared, even if the request failed.
+    :param exception: exception raised by the request, if any.
+    """
+    try:
+        size = identity_map_size()
+
+        if identity_map_metric.record(size):
+            d("Identity map peak reached: {} objects tracked in a single request.".format(size))
+    finally:
+        session.clear()
+
+
+def register_session_scope(app):
+    """
+    Binds the ODM session to the lifetime of each request of the given Flask application.
+    :param app: Flask application.
+    """
+    app.before_request(open_request_session)
+    app.after_request(commit_request_session)
+    app.teardown_request(close_request_session)
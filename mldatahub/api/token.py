@@ -79,6 +79,18 @@ class Tokens(TokenizedResource):
                     "help": "Token URL prefix.",
                     "location": "json"
                 },
+            "read_your_writes":
+                {
+                    "type": bool,
+                    "help": "Flag to force the reads of this token to be served by the primary DB.",
+                    "location": "json"
+                },
+            "max_access_times":
+                {
+                    "type": int,
+                    "help": "Max number of accesses of this token within the access reset time. 0 for the default.",
+                    "location": "json"
+                },
 
         }
 
@@ -190,6 +202,18 @@ class Token(TokenizedResource):
                 "help": "Token URL prefix.",
                 "location": "json"
             },
+            "read_your_writes":
+            {
+                "type": bool,
+                "help": "Flag to force the reads of this token to be served by the primary DB.",
+                "location": "json"
+            },
+            "max_access_times":
+            {
+                "type": int,
+                "help": "Max number of accesses of this token within the access reset time. 0 for the default.",
+                "location": "json"
+            },
         }
 
         for argument, kwargs in arguments.items():
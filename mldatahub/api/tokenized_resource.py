@@ -20,13 +20,14 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 # MA  02110-1301, USA.
 
+from functools import reduce
+from operator import or_
 from flask import request
 from flask_restful import reqparse, abort, Resource
+from mldatahub.api.rate_limiter import build_rate_limiter
+from mldatahub.cache.token_cache import get_token
 from mldatahub.helper.timing_helper import now
 from mldatahub.config.config import global_config
-from mldatahub.odm.dataset_dao import DatasetDAO
-from mldatahub.odm.restapi_dao import RestAPIDAO
-from mldatahub.odm.token_dao import TokenDAO
 
 __author__ = 'Iván de Paz Centeno'
 
@@ -51,14 +52,22 @@ class TokenizedRequestParser(reqparse.RequestParser):
         if token_gui is None:
             abort(404)
 
-        token = TokenDAO.query.get(token_gui=token_gui)
+        token = get_token(token_gui)
 
         if token is None:
             print("Token invalid {}".format(token_gui))
             abort(404)
 
-        pbac_ok = all([bool(token.privileges & privilege) for privilege in required_all_token_privileges]) and \
-                any([bool(token.privileges & privilege) for privilege in required_any_token_privileges])
+        # Tokens are limited in addition to the IPs, as a token may be used from several IPs.
+        if not rate_limiter.allow("token:{}".format(token._id), token.max_access_times or TOKEN_MAX_ACCESS_TIMES):
+            abort(429)
+
+        # Privileges are bits, thus the requirements are checked at once against the masks.
+        required_all_mask = reduce(or_, required_all_token_privileges, 0)
+        required_any_mask = reduce(or_, required_any_token_privileges, 0)
+
+        pbac_ok = token.privileges & required_all_mask == required_all_mask and \
+                  bool(token.privileges & required_any_mask)
 
         if not pbac_ok:
             abort(401)
@@ -78,31 +87,15 @@ class TokenizedResource(Resource):
 
 
 MAX_ACCESS_TIMES = global_config.get_max_access_times()
-ACCESS_RESET_TIME = global_config.get_access_reset_time()
-session = global_config.get_session()
+TOKEN_MAX_ACCESS_TIMES = global_config.get_token_max_access_times()
+rate_limiter = build_rate_limiter()
 
 def control_access():
     def func_wrap(func):
         def args_wrap(*args, **kwargs):
-            remote_ip = request.remote_addr
-
-            ip_control = RestAPIDAO.query.get(ip=remote_ip)
-
-            if ip_control is None:
-                ip_control = RestAPIDAO(ip=remote_ip, last_access=now(), num_accesses=0)
-
-            if (now() - ip_control.last_access).total_seconds() > ACCESS_RESET_TIME:
-                ip_control.last_access = now()
-                ip_control.num_accesses = 0
-
-            if ip_control.num_accesses > MAX_ACCESS_TIMES:
+            if not rate_limiter.allow(request.remote_addr, MAX_ACCESS_TIMES):
                 abort(429)
 
-            ip_control.num_accesses += 1
-
-            session.flush()
-            session.clear()
-
             return func(*args, **kwargs)
         return args_wrap
     return func_wrap
@@ -27,10 +27,14 @@ from threading import Thread
 from time import sleep
 from bson import ObjectId, BSON
 from mldatahub.odm.token_dao import TokenDAO
+from mldatahub.cache.dataset_cache import invalidate_dataset
+from mldatahub.cache.manifest_cache import manifest_cache
+from mldatahub.odm.dataset_change_log import DatasetChangeLog
 from mldatahub.odm.dataset_dao import DatasetDAO, DatasetElementDAO
 from mldatahub.helper.timing_helper import Measure, now
 from mldatahub.config.config import global_config
 from mldatahub.log.logger import Logger
+from mldatahub.storage.async_storage import ExecutorStorage
 
 __author__ = 'Iván de Paz Centeno'
 
@@ -163,8 +167,14 @@ class FileBackuper(MultiprocessingTaskedObject, MultiprocessingStoppableObject):
         """
         if storage is None:
             storage = global_config.get_storage()
+            async_storage = global_config.get_async_storage()
+        else:
+            async_storage = ExecutorStorage(storage, int(global_config.get_async_storage_workers()),
+                                            int(global_config.get_async_storage_batch_size()))
 
         self.storage = storage
+        # Packets are read through the asynchronous storage, that splits them in concurrent batches.
+        self.async_storage = async_storage
 
         self.uploader = Thread(target=self.__uploader__, daemon=True)
         self.downloader = Thread(target=self.__downloader__, daemon=True)
@@ -253,7 +263,7 @@ class FileBackuper(MultiprocessingTaskedObject, MultiprocessingStoppableObject):
             :param files_list: list of file IDs
             :return: files packet. It is a dict with format ID -> Content
             """
-            return {str(file_repr.id): file_repr.content for file_repr in self.storage.get_files(files_list)}
+            return {str(file_repr.id): file_repr.content for file_repr in self.async_storage.iterate_files(files_list)}
 
         def store_packet(packet):
             """
@@ -512,6 +522,7 @@ class DatasetBackuper():
         if previous_dataset is not None:
             d("Deleting previous dataset ({})".format(previous_dataset.url_prefix))
             previous_dataset.delete()
+            invalidate_dataset(previous_dataset.url_prefix)
         else:
             d("No previous dataset found.")
 
@@ -539,6 +550,13 @@ class DatasetBackuper():
         global_config.get_session().flush()
         d("Flushing...")
 
+        # The contents of the dataset were replaced: clients synchronizing by changes or manifests must start again.
+        DatasetChangeLog.append({dataset._id: [{'op': 'reset'}]})
+        manifest_cache.remove(dataset._id)
+
+        if previous_dataset is not None and previous_dataset._id != dataset._id:
+            manifest_cache.remove(previous_dataset._id)
+
         return dataset
 
     def __push_files_to_storage(self, files_ref_ids: list):
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from mldatahub.cache.versioned_cache import VersionedCache
+from mldatahub.config.config import global_config
+from mldatahub.odm.dataset_dao import DatasetDAO
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class CachedDataset(object):
+    """
+    Read-only snapshot of the header of a dataset, used to resolve the datasets of the requests.
+    Elements and comments are not part of the snapshot: they are queried from the DB when accessed, as in DatasetDAO.
+    """
+    __slots__ = ["_id", "url_prefix", "title", "description", "reference", "creation_date", "modification_date",
+                 "size", "tags", "fork_count", "forked_from_id"]
+
+    def __init__(self, dataset: DatasetDAO):
+        self._id = dataset._id
+        self.url_prefix = dataset.url_prefix
+        self.title = dataset.title
+        self.description = dataset.description
+        self.reference = dataset.reference
+        self.creation_date = dataset.creation_date
+        self.modification_date = dataset.modification_date
+        self.size = dataset.size
+        self.tags = tuple(dataset.tags)
+        self.fork_count = dataset.fork_count
+        self.forked_from_id = dataset.forked_from_id
+
+    def __getitem__(self, item):
+        return getattr(self, item)
+
+    # These only rely on the fields of the header, thus they are shared with DatasetDAO.
+    comments = DatasetDAO.comments
+    elements = DatasetDAO.elements
+    forked_from = property(DatasetDAO.forked_from.fget)
+    get_comments = DatasetDAO.get_comments
+    get_elements = DatasetDAO.get_elements
+    has_element = DatasetDAO.has_element
+    serialize = DatasetDAO.serialize
+
+
+dataset_cache = VersionedCache("dataset", global_config.get_dataset_cache_ttl(),
+                               global_config.get_cache_version_check_interval())
+
+
+def get_dataset(url_prefix: str) -> CachedDataset:
+    """
+    Retrieves the header of the dataset for the given url prefix, from the cache if possible.
+    :param url_prefix: url prefix of the dataset.
+    :return: CachedDataset or None if the dataset does not exist.
+    """
+    dataset = dataset_cache.get(url_prefix)
+
+    if dataset is None:
+        generation = dataset_cache.get_generation()
+        dataset_dao = DatasetDAO.query.get(url_prefix=url_prefix)
+
+        if dataset_dao is None:
+            return None
+
+        dataset = CachedDataset(dataset_dao)
+        dataset_cache.put(url_prefix, dataset, generation)
+
+    return dataset
+
+
+def invalidate_dataset(url_prefix: str):
+    """
+    Invalidates the cached dataset in every process, after a modification of the dataset.
+    :param url_prefix: url prefix of the dataset.
+    """
+    dataset_cache.invalidate([url_prefix])
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from collections import OrderedDict
+from threading import Lock
+from mldatahub.config.config import global_config
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class Manifest(object):
+    """
+    Manifest of a dataset for a given version.
+    It keeps the encoded entry of each element together with the fields it was built from, so that the manifest of the
+    next version can reuse the entries of the elements that did not change.
+    """
+    __slots__ = ["version", "entries", "content"]
+
+    def __init__(self, version, entries, content):
+        """
+        :param version: version of the dataset.
+        :param entries: associative array with element ID -> (file_ref_id, modification_date, encoded entry).
+        :param content: bytes of the manifest.
+        """
+        self.version = version
+        self.entries = entries
+        self.content = content
+
+
+class ManifestCache(object):
+    """
+    In-process cache of the latest manifest of the most recently requested datasets.
+    """
+
+    def __init__(self, max_datasets):
+        """
+        :param max_datasets: max number of datasets whose manifest is kept. The least recently used is dropped first.
+        """
+        self.max_datasets = max_datasets
+        self.lock = Lock()
+        self.manifests = OrderedDict()
+
+    def get(self, dataset_id) -> Manifest:
+        with self.lock:
+            manifest = self.manifests.get(dataset_id)
+
+            if manifest is not None:
+                self.manifests.move_to_end(dataset_id)
+
+        return manifest
+
+    def put(self, dataset_id, manifest: Manifest):
+        with self.lock:
+            previous_manifest = self.manifests.get(dataset_id)
+
+            # Concurrent builds might finish out of order, the newest version is the one kept.
+            if previous_manifest is None or previous_manifest.version <= manifest.version:
+                self.manifests[dataset_id] = manifest
+
+            self.manifests.move_to_end(dataset_id)
+
+            while len(self.manifests) > self.max_datasets:
+                self.manifests.popitem(last=False)
+
+    def remove(self, dataset_id):
+        with self.lock:
+            self.manifests.pop(dataset_id, None)
+
+
+manifest_cache = ManifestCache(global_config.get_manifest_cache_size())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from concurrent.futures import Future
+from threading import Lock
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class SingleFlight(object):
+    """
+    Coalesces concurrent calls with the same key: only the first one is executed, and the rest wait for it and share
+    its result (or its exception). Nothing is kept once the call finishes, so later calls are executed again.
+    Results are shared among threads, thus they must not be modified by the callers.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.calls = {}
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """
+        Executes the function, unless a call with the same key is already in flight. In that case, waits for it.
+        :param key: hashable key that identifies the call.
+        :param func: function to execute.
+        :return: result of the function.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self.calls[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.result()
+
+        try:
+            result = func(*args, **kwargs)
+            call.set_result(result)
+            return result
+
+        except BaseException as ex:
+            call.set_exception(ex)
+            raise
+
+        finally:
+            with self.lock:
+                del self.calls[key]
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from mldatahub.cache.versioned_cache import VersionedCache
+from mldatahub.config.config import global_config
+from mldatahub.odm.token_dao import TokenDAO
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class CachedToken(object):
+    """
+    Read-only snapshot of a token, used to authenticate the requests.
+    It exposes the same attributes as TokenDAO, with the linked datasets IDs held as a set.
+    """
+    __slots__ = ["_id", "token_gui", "description", "max_dataset_count", "max_dataset_size", "creation_date",
+                 "modification_date", "end_date", "privileges", "url_prefix", "read_your_writes", "max_access_times",
+                 "_datasets", "datasets_ids"]
+
+    def __init__(self, token: TokenDAO):
+        self._id = token._id
+        self.token_gui = token.token_gui
+        self.description = token.description
+        self.max_dataset_count = token.max_dataset_count
+        self.max_dataset_size = token.max_dataset_size
+        self.creation_date = token.creation_date
+        self.modification_date = token.modification_date
+        self.end_date = token.end_date
+        self.privileges = token.privileges
+        self.url_prefix = token.url_prefix
+        self.read_your_writes = token.read_your_writes
+        self.max_access_times = token.max_access_times
+        self._datasets = tuple(token._datasets)
+        self.datasets_ids = frozenset(self._datasets)
+
+    @property
+    def datasets(self):
+        return TokenDAO.DIterator(self._datasets)
+
+    def has_dataset(self, dataset):
+        return self.has_dataset_id(dataset._id)
+
+    def has_dataset_id(self, dataset_id):
+        return dataset_id in self.datasets_ids
+
+
+token_cache = VersionedCache("token", global_config.get_token_cache_ttl(),
+                             global_config.get_cache_version_check_interval())
+
+
+def get_token(token_gui: str) -> CachedToken:
+    """
+    Retrieves the token for the given GUI, from the cache if possible.
+    :param token_gui: GUI of the token.
+    :return: CachedToken or None if the token does not exist.
+    """
+    token = token_cache.get(token_gui)
+
+    if token is None:
+        generation = token_cache.get_generation()
+        token_dao = TokenDAO.query.get(token_gui=token_gui)
+
+        if token_dao is None:
+            return None
+
+        token = CachedToken(token_dao)
+        token_cache.put(token_gui, token, generation)
+
+    return token
+
+
+def invalidate_token(token_gui: str):
+    """
+    Invalidates the cached token in every process, after a modification of the token.
+    :param token_gui: GUI of the token.
+    """
+    token_cache.invalidate([token_gui])
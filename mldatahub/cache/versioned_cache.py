@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from threading import Lock
+import time
+from pymongo import ReturnDocument
+from mldatahub.config.config import global_config
+
+__author__ = 'Iván de Paz Centeno'
+
+
+CACHE_VERSIONS_COLLECTION = "cache_version"
+
+
+class VersionedCache(object):
+    """
+    In-process cache of records with a short time to live.
+    Entries are invalidated locally by the process that modifies them. The rest of the processes are notified through
+    a version counter stored in Mongo, which is polled at most once every "version_check_interval" seconds.
+    """
+
+    def __init__(self, name, ttl, version_check_interval, session=None):
+        """
+        :param name: name of the cache. It identifies the version counter shared by all the processes.
+        :param ttl: seconds that an entry is kept in the cache.
+        :param version_check_interval: min seconds between two checks of the version counter.
+        :param session: ODM session whose database keeps the version counters.
+        """
+        if session is None:
+            session = global_config.get_session()
+
+        self.name = name
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self.session = session
+        self.lock = Lock()
+        self.entries = {}
+        self.version = None
+        self.generation = 0
+        self.last_version_check = 0
+
+    def __collection(self):
+        return self.session.impl.db[CACHE_VERSIONS_COLLECTION]
+
+    def __check_version(self):
+        current_time = time.monotonic()
+
+        if current_time - self.last_version_check < self.version_check_interval:
+            return
+
+        self.last_version_check = current_time
+        document = self.__collection().find_one({'_id': self.name})
+        version = 0 if document is None else document['version']
+
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.generation += 1
+                self.version = version
+
+    def get_generation(self) -> int:
+        """
+        Retrieves the generation of the cache. It must be taken before reading the record to cache, so that
+        put() can discard it if it was invalidated meanwhile.
+        :return: generation of the cache.
+        """
+        self.__check_version()
+        return self.generation
+
+    def get(self, key, default=None):
+        """
+        Retrieves the entry for the given key.
+        :param key: key of the entry.
+        :param default: value to return if the entry is not cached or is expired.
+        :return: the cached value or the default.
+        """
+        self.__check_version()
+
+        entry = self.entries.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            return default
+
+        return entry[1]
+
+    def put(self, key, value, generation: int):
+        """
+        Caches a value for the given key.
+        :param key: key of the entry.
+        :param value: value to cache.
+        :param generation: generation of the cache retrieved with get_generation() before reading the value.
+        """
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, keys=None):
+        """
+        Invalidates the entries of the given keys in this process, and increases the version counter so that the
+        rest of the processes drop their entries.
+        :param keys: list of keys to invalidate. If None, all the entries are invalidated.
+        """
+        document = self.__collection().find_one_and_update({'_id': self.name}, {'$inc': {'version': 1}}, upsert=True,
+                                                           return_document=ReturnDocument.AFTER)
+
+        with self.lock:
+            if keys is None:
+                self.entries.clear()
+            else:
+                for key in keys:
+                    self.entries.pop(key, None)
+
+            self.generation += 1
+
+            # Only the entries invalidated by this process are dropped here.
+            if self.version is not None and document['version'] == self.version + 1:
+                self.version = document['version']
+
+    def clear(self):
+        """
+        Drops all the entries of this process only.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.generation += 1
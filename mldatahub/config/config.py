@@ -23,9 +23,9 @@
 import os
 from functools import partial
 from ming import create_datastore
-from ming.odm import ThreadLocalODMSession
 from pyfolder import PyFolder
 from mldatahub.log.logger import Logger
+from mldatahub.odm.context_local_session import ContextLocalODMSession
 
 __author__ = 'Iván de Paz Centeno'
 
@@ -46,12 +46,14 @@ class GlobalConfig(object):
     Represents a configuration object, as a Singleton for several options.
     """
     # Special keys that cannot be set in the config
-    __forbidden_keys = {"log_file", "session", "storage"}
+    __forbidden_keys = {"log_file", "session", "read_session", "storage", "async_storage"}
 
     # Current config
     __config = {}
     __storage = None
+    __async_storage = None
     __session = None
+    __read_session = None
 
     def __init__(self):
         """
@@ -82,7 +84,9 @@ class GlobalConfig(object):
         # We take the default config from the example file itself.
         self.__default_config = pyfolder[example_config_route[0]]
         self.__default_config["session"] = self.__get_session__
+        self.__default_config["read_session"] = self.__get_read_session__
         self.__default_config["storage"] = self.__get_storage__
+        self.__default_config["async_storage"] = self.__get_async_storage__
         self.__default_config["log_file"] = self.__get_log_file
 
         self.load_from_file()
@@ -98,9 +102,52 @@ class GlobalConfig(object):
         :return: ODM Session used by ODM classes.
         """
         if self.__session is None:
-            self.__session = ThreadLocalODMSession(bind=create_datastore(self.get_session_uri()))
+            self.__session = ContextLocalODMSession(create_datastore(self.get_session_uri()))
         return self.__session
 
+    def __create_read_datastore(self):
+        """
+        :return: ming DataStore for the "read_session_uri" config key, with the configured read preference.
+        """
+        kwargs = {'readPreference': self.get_read_preference()}
+
+        if kwargs['readPreference'] != "primary" and self.get_read_max_staleness() > 0:
+            kwargs['maxStalenessSeconds'] = self.get_read_max_staleness()
+
+        return create_datastore(self.get_read_session_uri(), **kwargs)
+
+    def __get_read_session__(self):
+        """
+        :return: ODM Session used for read-only queries. It is bound to the datastore specified in the
+        "read_session_uri" config key, with the configured read preference. If not specified, the main
+        session is used instead.
+        """
+        read_session_uri = self.get_read_session_uri()
+
+        if read_session_uri is None or read_session_uri == "":
+            return self.__get_session__()
+
+        if self.__read_session is None:
+            self.__read_session = ContextLocalODMSession(self.__create_read_datastore())
+
+        return self.__read_session
+
+    def reset_connections(self):
+        """
+        Binds the sessions to new datastores, whose Mongo clients are created on their next use, and drops the
+        asynchronous storage.
+        Required in the processes forked after a session was used: Mongo clients are not fork-safe.
+        The ODM sessions themselves are kept, as they are referenced by the modules.
+        """
+        if self.__session is not None:
+            self.__session.doc_session.bind = create_datastore(self.get_session_uri())
+
+        if self.__read_session is not None:
+            self.__read_session.doc_session.bind = self.__create_read_datastore()
+
+        # The threads of the pool of the asynchronous storage are not inherited either.
+        self.__async_storage = None
+
     def __get_storage__(self):
         """
         :return: storage used to save/retrieve files' contents.
@@ -111,6 +158,17 @@ class GlobalConfig(object):
 
         return self.__storage
 
+    def __get_async_storage__(self):
+        """
+        :return: asynchronous storage, that runs the calls to the storage in a bounded pool of threads.
+        """
+        if self.__async_storage is None:
+            from mldatahub.storage.async_storage import ExecutorStorage
+            self.__async_storage = ExecutorStorage(self.get_storage(), int(self.get_async_storage_workers()),
+                                                   int(self.get_async_storage_batch_size()))
+
+        return self.__async_storage
+
     def __read_config__(self, key):
         """
         Reads the key from the current config.
@@ -69,24 +69,73 @@ def main():
         parser.print_help()
 
 
+def ensure_indexes():
+    """
+    Creates the indexes of the collections, like the unique ones and the TTL ones that expire the temporary documents.
+    It is an explicit step of the deployment rather than done on import, so that importing the modules does not
+    connect to Mongo. Indexes that already exist are left untouched.
+    """
+    from ming.odm import Mapper
+    from mldatahub.odm.dataset_dao import DatasetDAO
+    from mldatahub.odm.token_dao import TokenDAO
+    from mldatahub.odm.dataset_change_log import DatasetChangeLog
+    from mldatahub.odm.file_chunk import FileChunk
+    from mldatahub.odm.upload_session import UploadSession
+    from mldatahub.api.rate_limiter import ensure_indexes as ensure_rate_limiter_indexes
+
+    # Indexes of the mapped classes, like DatasetDAO and TokenDAO.
+    Mapper.ensure_all_indexes()
+    DatasetChangeLog.ensure_indexes()
+    FileChunk.ensure_indexes()
+    UploadSession.ensure_indexes()
+    ensure_rate_limiter_indexes()
+
+
+def setup_process():
+    """
+    Prepares the current process to serve the API: ensures the indexes and starts the background sync of the rate
+    limiter. Every process that serves the API runs it once, after it is forked.
+    """
+    ensure_indexes()
+
+    from mldatahub.api.tokenized_resource import rate_limiter
+    rate_limiter.start()
+
+
 def purge_database():
     from mldatahub.odm.dataset_dao import DatasetDAO, DatasetCommentDAO, DatasetElementDAO, DatasetElementCommentDAO
+    from mldatahub.odm.dataset_change_log import DatasetChangeLog
+    from mldatahub.odm.dataset_version import DatasetVersion
+    from mldatahub.odm.file_chunk import FileChunk
+    from mldatahub.odm.upload_session import UploadSession
     from mldatahub.odm.restapi_dao import RestAPIDAO
+    from mldatahub.api.rate_limiter import RATE_LIMITS_COLLECTION, ACCESS_WINDOWS_COLLECTION
     from mldatahub.odm.file_dao import FileDAO
     from mldatahub.odm.token_dao import TokenDAO
+    from mldatahub.cache.token_cache import token_cache
+    from mldatahub.cache.dataset_cache import dataset_cache
+    ensure_indexes()
     TokenDAO.query.remove()
+    token_cache.invalidate()
     print("Purging tokens...")
     DatasetDAO.query.remove()
+    dataset_cache.invalidate()
     print("Purging datasets...")
     DatasetCommentDAO.query.remove()
     print("Purging dataset comments...")
     DatasetElementDAO.query.remove()
+    global_config.get_session().impl.db[DatasetVersion.collection_name].delete_many({})
+    global_config.get_session().impl.db[DatasetChangeLog.collection_name].delete_many({})
     print("Purging datasets' elements...")
     DatasetElementCommentDAO.query.remove()
     print("Purging datasets' elements comments...")
     FileDAO.query.remove()
+    global_config.get_session().impl.db[FileChunk.collection_name].delete_many({})
+    global_config.get_session().impl.db[UploadSession.collection_name].delete_many({})
     print("Purging files...")
     RestAPIDAO.query.remove()
+    global_config.get_session().impl.db[RATE_LIMITS_COLLECTION].delete_many({})
+    global_config.get_session().impl.db[ACCESS_WINDOWS_COLLECTION].delete_many({})
     print("Purging accesses records...")
     print("Finished.")
 
@@ -108,6 +157,7 @@ def create_token(args):
 
     args = parser.parse_args(args)
 
+    ensure_indexes()
     duration_in_days = args.token_duration_days
 
     token = __create_token__(args.namespace, args.description, args.maxds, args.maxl, args.privileges, duration_in_days)
@@ -157,15 +207,24 @@ def build_app():
     from flask_restful import Api
     from mldatahub.api.dataset import Datasets, Dataset, DatasetForker, DatasetSize
     from mldatahub.api.dataset_element import DatasetElements, DatasetElement, DatasetElementContent, \
-        DatasetElementsBundle, DatasetElementContentBundle
+        DatasetElementsBundle, DatasetElementContentBundle, DatasetElementsContentNegotiation, DatasetManifest, DatasetChanges, \
+        DatasetElementContentUploads, DatasetUpload, DatasetUploadChunk
     from mldatahub.api.server import Server
     from mldatahub.api.token import Tokens, Token, TokenLinker
+    from mldatahub.api.session_scope import register_session_scope
+    from mldatahub.api.compression import register_compression
+    from mldatahub.api.representations import register_representations
 
     app = Flask(__name__)
     app.config['DEBUG'] = False
     app.config['ERROR_404_HELP'] = False
+    app.config['MAX_CONTENT_LENGTH'] = global_config.get_max_request_size()
+
+    register_session_scope(app)
+    register_compression(app)
 
     api = Api(app)
+    register_representations(api)
 
     api.add_resource(Server, '/server')
     api.add_resource(Tokens, '/tokens')
@@ -179,17 +238,52 @@ def build_app():
     api.add_resource(DatasetElement, '/datasets/<token_prefix>/<dataset_prefix>/elements/<element_id>')
     api.add_resource(DatasetElementContent, '/datasets/<token_prefix>/<dataset_prefix>/elements/<element_id>/content')
     api.add_resource(DatasetElementContentBundle, '/datasets/<token_prefix>/<dataset_prefix>/elements/content')
+    api.add_resource(DatasetElementsContentNegotiation, '/datasets/<token_prefix>/<dataset_prefix>/elements/content/negotiation')
+    api.add_resource(DatasetElementContentUploads, '/datasets/<token_prefix>/<dataset_prefix>/elements/<element_id>/content/uploads')
+    api.add_resource(DatasetUpload, '/datasets/<token_prefix>/<dataset_prefix>/uploads/<upload_id>')
+    api.add_resource(DatasetUploadChunk, '/datasets/<token_prefix>/<dataset_prefix>/uploads/<upload_id>/<int:chunk_index>')
     api.add_resource(DatasetSize, '/datasets/<token_prefix>/<dataset_prefix>/size')
+    api.add_resource(DatasetManifest, '/datasets/<token_prefix>/<dataset_prefix>/manifest')
+    api.add_resource(DatasetChanges, '/datasets/<token_prefix>/<dataset_prefix>/changes')
 
     return app
 
 
+def build_asgi_app():
+    """
+    Builds the ASGI version of the app, for ASGI servers such as uvicorn.
+    It serves the same routes as build_app(), but a slow client does not hold a thread while it is sending its
+    request or receiving its response: only the handling of the requests and the generation of their responses run in
+    a bounded pool of threads.
+    """
+    from mldatahub.api.asgi_adapter import AsgiAdapter
+
+    return AsgiAdapter(build_app(), max_workers=int(global_config.get_asgi_threads()),
+                       max_request_size=global_config.get_max_request_size(),
+                       spool_size=global_config.get_upload_spool_size())
+
+
 def deploy():
-    app = build_app()
     global_config.print_config()
     from mldatahub.log.logger import Logger
     logger = Logger(verbosity_level=global_config.get_log_verbosity(), log_file=global_config.get_log_file())
-    app.run(host=global_config.get_host(), port=global_config.get_port(), debug=False, threaded=True)
+
+    try:
+        from mldatahub.prefork_server import PreforkServer
+    except ImportError:
+        PreforkServer = None
+
+    if PreforkServer is None:
+        logger.warning("gunicorn is not installed: running the single-process development server. "
+                       "Install mldatahub[gunicorn] for production deployments.")
+        setup_process()
+        app = build_app()
+        app.run(host=global_config.get_host(), port=global_config.get_port(), debug=False, threaded=True)
+    else:
+        # The master only validates the config: the API modules are imported and the app is built inside each worker,
+        # after the fork (see prefork_server.post_fork).
+        PreforkServer.from_config(build_app).run()
+
     logger.file_logger.finish(True)
 
 
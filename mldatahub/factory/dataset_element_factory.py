@@ -23,8 +23,13 @@
 from bson import ObjectId
 from flask_restful import abort
 from ming.odm.odmsession import ODMCursor
+from mldatahub.cache.manifest_cache import Manifest, manifest_cache
+from mldatahub.cache.single_flight import SingleFlight
+from mldatahub.helper.manifest_helper import encode_manifest, encode_manifest_entry
 from mldatahub.storage.exceptions.file_size_exceeded import FileSizeExceeded
-from mldatahub.storage.generic_storage import GenericStorage
+from mldatahub.storage.exceptions.invalid_chunks import InvalidChunks
+from mldatahub.storage.async_storage import AsyncStorage
+from mldatahub.storage.generic_storage import GenericStorage, File
 from mldatahub.factory.dataset_factory import DatasetFactory
 from mldatahub.helper.timing_helper import now
 from mldatahub.config.config import global_config
@@ -32,18 +37,32 @@ from mldatahub.config.privileges import Privileges
 from mldatahub.odm.token_dao import TokenDAO
 from mldatahub.odm.dataset_dao import DatasetDAO
 from mldatahub.odm.dataset_dao import DatasetElementDAO
+from mldatahub.odm.dataset_change_log import DatasetChangeLog
+from mldatahub.odm.dataset_version import DatasetVersion
+from mldatahub.odm.dataset_view import DatasetElementView
+from mldatahub.odm.upload_session import UploadSession
 
 __author__ = 'Iván de Paz Centeno'
 
+# Seconds after which a gap in the change log of a dataset is considered an expired entry rather than an entry being
+# written.
+CHANGES_GAP_TIMEOUT = 10
+
 
 class DatasetElementFactory(object):
 
+    # Concurrent requests of the same page of elements share a single query.
+    __views_flight = SingleFlight()
+
     def __init__(self, token: TokenDAO, dataset: DatasetDAO):
         self.token = token
         self.dataset = dataset
         self.session = global_config.get_session()
         self.storage = global_config.get_storage() # type: GenericStorage
 
+        # Tokens that require to read their own writes are always served by the primary binding.
+        self.read_session = self.session if self.token.read_your_writes else global_config.get_read_session()
+
         # Can token modify dataset? let's check.
         can_alter_datasets = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
 
@@ -54,6 +73,101 @@ class DatasetElementFactory(object):
     def _dataset_limit_reached(self, new_elements_count=1) -> bool:
         return len(self.dataset.elements) + new_elements_count > self.token.max_dataset_size
 
+    def __detach_element(self, dataset_element: DatasetElementDAO, changes_by_dataset: dict) -> DatasetElementDAO:
+        """
+        Detaches an element from the datasets that share it, before it is modified for this dataset.
+        :param dataset_element: element to modify.
+        :param changes_by_dataset: associative array with dataset ID -> list of changes, where the changes are appended.
+        :return: element to modify, which is a clone if the element was forked from another dataset.
+        """
+        if dataset_element.dataset_id[0] != self.dataset._id:
+            # This is a forked element, we must clone it to make the modifications
+            dataset_element.unlink_dataset(self.dataset)
+            clone = dataset_element.clone(self.dataset._id)
+            changes_by_dataset.setdefault(self.dataset._id, []).append({'op': 'remap', 'element_id': dataset_element._id,
+                                                                        'new_id': clone._id})
+            dataset_element = clone
+
+        elif len(dataset_element.dataset_id) > 1:
+            #  This is the parent dataset, that have been forked. We need to clone the element for each forked dataset,
+            # as it is not forked from this one anymore because of the change.
+            unlinked_datasets = dataset_element.dataset_id[1:]
+            dataset_element.unlink_datasets(unlinked_datasets)
+            for dataset_id in unlinked_datasets:
+                clone = dataset_element.clone(dataset_id)
+                changes_by_dataset.setdefault(dataset_id, []).append({'op': 'remap', 'element_id': dataset_element._id,
+                                                                      'new_id': clone._id})
+
+        changes_by_dataset.setdefault(self.dataset._id, []).append({'op': 'update', 'element_id': dataset_element._id})
+
+        return dataset_element
+
+    def __append_clones_remaps(self, shared_elements: dict, changes_by_dataset: dict):
+        """
+        Appends the remaps of the elements removed from this dataset, which were replaced by clones in the datasets that
+        shared them.
+        :param shared_elements: associative array with element ID -> list of IDs of the other datasets that shared it.
+        :param changes_by_dataset: associative array with dataset ID -> list of changes, where the changes are appended.
+        """
+        if len(shared_elements) == 0:
+            return
+
+        clones = self.session.impl.db[DatasetElementDAO.__mongometa__.name].find(
+            {'_previous_id': {'$in': list(shared_elements)}}, {'_previous_id': 1, 'dataset_id': 1})
+
+        for clone in clones:
+            dataset_id = clone['dataset_id'][0]
+
+            if dataset_id in shared_elements[clone['_previous_id']]:
+                changes_by_dataset.setdefault(dataset_id, []).append({'op': 'remap', 'element_id': clone['_previous_id'],
+                                                                      'new_id': clone['_id']})
+
+    def __pop_contents_hashes(self, elements_kwargs: list) -> list:
+        """
+        Extracts the 'content_sha256' field from each of the kwargs and resolves it into the ID of the stored file that
+        holds that content.
+        Unlike the files IDs, the hash can only be known by someone who holds the content (or who can already read it
+        from any of its datasets), so referencing contents by hash is allowed to any token.
+        :param elements_kwargs: list of kwargs of the elements. They are modified in place.
+        :return: list of files IDs, aligned with elements_kwargs. None for the kwargs without a hash.
+        """
+        hashes = [kwargs.pop('content_sha256', None) for kwargs in elements_kwargs]
+        hashes = [None if sha256 is None else str(sha256).lower() for sha256 in hashes]
+
+        requested_hashes = list({sha256 for sha256 in hashes if sha256 is not None})
+
+        if len(requested_hashes) == 0:
+            return hashes
+
+        files_ids = self.storage.get_files_by_hash(requested_hashes)
+        missing_hashes = [sha256 for sha256 in requested_hashes if sha256 not in files_ids]
+
+        if len(missing_hashes) > 0:
+            abort(404, message="The following contents are not stored in the server: {}".format(missing_hashes))
+
+        return [None if sha256 is None else files_ids[sha256] for sha256 in hashes]
+
+    def get_missing_contents(self, sha256_hashes: list) -> list:
+        """
+        Filters the given SHA256 hashes to those whose content is not stored yet. Clients can upload only those
+        contents and reference the rest by their hash (field 'content_sha256') when creating or editing elements.
+        :param sha256_hashes: list of SHA256 hash strings of the contents to upload.
+        :return: list of the SHA256 hashes whose content must be uploaded.
+        """
+        can_add_elements = bool(self.token.privileges & (Privileges.ADD_ELEMENTS | Privileges.EDIT_ELEMENTS))
+        can_edit_others_elements = bool(self.token.privileges & (Privileges.ADMIN_CREATE_TOKEN | Privileges.ADMIN_EDIT_TOKEN))
+
+        if not any([can_add_elements, can_edit_others_elements]):
+            abort(401, message="Your token does not have privileges enough to upload contents into this dataset.")
+
+        if len(sha256_hashes) > global_config.get_page_size():
+            abort(416, message="Page size exceeded")
+
+        sha256_hashes = [str(sha256).lower() for sha256 in sha256_hashes]
+        files_ids = self.storage.get_files_by_hash(list(set(sha256_hashes)))
+
+        return [sha256 for sha256 in sha256_hashes if sha256 not in files_ids]
+
     def create_element(self, **kwargs) -> DatasetElementDAO:
         can_create_inner_element = bool(self.token.privileges & Privileges.ADD_ELEMENTS)
         can_create_others_elements = bool(self.token.privileges & Privileges.ADMIN_CREATE_TOKEN)
@@ -70,13 +184,21 @@ class DatasetElementFactory(object):
         except KeyError as ex:
             element_content = None
 
+        hashed_file_id = self.__pop_contents_hashes([kwargs])[0]
+
+        if element_content is not None and hashed_file_id is not None:
+            abort(400, message="Either a content or a content hash can be specified, but not both.")
+
         if element_content is None:
-            if 'http_ref' not in kwargs and 'file_ref_id' not in kwargs:
+            if 'http_ref' not in kwargs and 'file_ref_id' not in kwargs and hashed_file_id is None:
                 abort(400, message="At least an HTTP reference or a content is required to create an element.")
 
             if 'file_ref_id' in kwargs and not can_create_others_elements:
                 # Antiexploit: otherwise users might add resources from other tokens over here.
                 abort(401, message="There is a field not allowed in the creation request.")
+
+            if hashed_file_id is not None:
+                kwargs['file_ref_id'] = hashed_file_id
         else:
             # We save the file into the storage
             file_id = self.storage.put_file_content(element_content)
@@ -91,6 +213,7 @@ class DatasetElementFactory(object):
 
         dataset_element = DatasetElementDAO(**kwargs)
         self.session.flush()
+        DatasetChangeLog.append({self.dataset._id: [{'op': 'insert', 'element_id': dataset_element._id}]})
 
         return dataset_element
 
@@ -104,8 +227,11 @@ class DatasetElementFactory(object):
         if not can_create_others_elements and self._dataset_limit_reached(len(elements_kwargs)):
             abort(401, message="Dataset limit reached. Can't add this set of elements. There are only {} slots free".format(len(self.dataset.elements) - self.token.max_dataset_size))
 
+        # Contents referenced by hash are resolved at once.
+        hashed_files_ids = self.__pop_contents_hashes(elements_kwargs)
+
         dataset_elements = []
-        for kwargs in elements_kwargs:
+        for kwargs, hashed_file_id in zip(elements_kwargs, hashed_files_ids):
 
             try:
                 element_content = kwargs["content"]
@@ -113,13 +239,19 @@ class DatasetElementFactory(object):
             except KeyError as ex:
                 element_content = None
 
+            if element_content is not None and hashed_file_id is not None:
+                abort(400, message="Either a content or a content hash can be specified, but not both.")
+
             if element_content is None:
-                if 'http_ref' not in kwargs and 'file_ref_id' not in kwargs:
+                if 'http_ref' not in kwargs and 'file_ref_id' not in kwargs and hashed_file_id is None:
                     abort(400, message="At least an HTTP reference or a content is required to create an element.")
 
                 if 'file_ref_id' in kwargs and not can_create_others_elements:
                     # Antiexploit: otherwise users might add resources from other tokens over here.
                     abort(401, message="There is a field not allowed in the creation request.")
+
+                if hashed_file_id is not None:
+                    kwargs['file_ref_id'] = hashed_file_id
             else:
                 # We save the file into the storage
                 try:
@@ -141,6 +273,8 @@ class DatasetElementFactory(object):
             dataset_elements.append(dataset_element)
 
         self.session.flush()
+        DatasetChangeLog.append({self.dataset._id: [{'op': 'insert', 'element_id': dataset_element._id}
+                                                    for dataset_element in dataset_elements]})
 
         return dataset_elements
 
@@ -154,8 +288,16 @@ class DatasetElementFactory(object):
         if 'file_ref_id' in kwargs and not can_edit_others_elements:
             abort(401, message="File ref ID not allowed.")
 
+        hashed_file_id = self.__pop_contents_hashes([kwargs])[0]
+
+        if 'content' in kwargs and hashed_file_id is not None:
+            abort(400, message="Either a content or a content hash can be specified, but not both.")
+
         dataset_element = DatasetElementDAO.query.get(_id=element_id)
 
+        if hashed_file_id is not None:
+            kwargs['file_ref_id'] = hashed_file_id
+
         if 'content' in kwargs:
             # New content to append here...
             file_id = self.storage.put_file_content(kwargs['content'])
@@ -172,18 +314,8 @@ class DatasetElementFactory(object):
         if not self.dataset.has_element(dataset_element) and not can_edit_others_elements:
             abort(401, message="Operation not allowed, element is not contained by the dataset")
 
-        if dataset_element.dataset_id[0] != self.dataset._id:
-            # This is a forked element, we must clone it to make the modifications
-            dataset_element.unlink_dataset(self.dataset)
-            dataset_element = dataset_element.clone(self.dataset._id)
-
-        elif len(dataset_element.dataset_id) > 1:
-            #  This is the parent dataset, that have been forked. We need to clone the element for each forked dataset,
-            # as it is not forked from this one anymore because of the change.
-            unlinked_datasets = dataset_element.dataset_id[1:]
-            dataset_element.unlink_datasets(unlinked_datasets)
-            for dataset_id in unlinked_datasets:
-                dataset_element.clone(dataset_id)
+        changes_by_dataset = {}
+        dataset_element = self.__detach_element(dataset_element, changes_by_dataset)
 
         kwargs['modification_date'] = now()
 
@@ -192,6 +324,7 @@ class DatasetElementFactory(object):
                 dataset_element[k] = v
 
         self.session.flush()
+        DatasetChangeLog.append(changes_by_dataset)
 
         return dataset_element
 
@@ -213,13 +346,23 @@ class DatasetElementFactory(object):
         elements_content = []
 
         dataset_elements = [d for d in dataset_elements]
-        # First of all we fill the files modifications to apply at once.
-        for dataset_element in dataset_elements:
-            kwargs = elements_kwargs[dataset_element._id]
 
+        for kwargs in elements_kwargs.values():
             if 'file_ref_id' in kwargs and not can_edit_others_elements:
                 abort(401, message="There is a field not allowed in the edit request.")
 
+            if 'content' in kwargs and kwargs.get('content_sha256') is not None:
+                abort(400, message="Either a content or a content hash can be specified, but not both.")
+
+        # Contents referenced by hash are resolved at once.
+        hashed_files_ids = {element_id: file_id for element_id, file_id in
+                            zip(elements_kwargs.keys(), self.__pop_contents_hashes(list(elements_kwargs.values())))
+                            if file_id is not None}
+
+        # First of all we fill the files modifications to apply at once.
+        for dataset_element in dataset_elements:
+            kwargs = elements_kwargs[dataset_element._id]
+
             if ('dataset' in kwargs or 'dataset_id' in kwargs) and not can_edit_others_elements:
                 abort(401, message="There is a field not allowed in the edit request.")
 
@@ -234,27 +377,59 @@ class DatasetElementFactory(object):
             files_refs = None
             abort(413, message=str(ex))
 
+        files_refs.update(hashed_files_ids)
+
+        return self.__apply_elements_edition(dataset_elements, elements_kwargs, files_refs)
+
+    def edit_elements_content(self, elements_ids:list, contents) -> list:
+        """
+        Replaces the content of multiple elements at once. Each content is stored as soon as it is iterated, so that
+        only one of them is held in memory at a time.
+        :param elements_ids: list of IDs of the elements to edit.
+        :param contents: iterable of tuples (element_id, content), like the entries of a zip read one by one.
+        :return: list of the edited elements.
+        """
+        can_edit_inner_element = bool(self.token.privileges & Privileges.EDIT_ELEMENTS)
+        can_edit_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_edit_inner_element, can_edit_others_elements]):
+            abort(401, message="Your token does not have privileges enough to edit elements inside this dataset.")
+
+        if len(elements_ids) > global_config.get_page_size():
+            abort(416, message="Page size exceeded")
+
+        dataset_elements = DatasetElementDAO.query.find({"dataset_id": self.dataset._id, "_id": {"$in" : list(elements_ids)}})
+        dataset_elements = [d for d in dataset_elements]
+
+        found_ids = {dataset_element._id for dataset_element in dataset_elements}
+        files_refs = {}
+
+        for element_id, content in contents:
+            if element_id not in found_ids:
+                continue
+
+            try:
+                files_refs[element_id] = self.storage.put_file_content(content)
+            except FileSizeExceeded as ex:
+                abort(413, message=str(ex))
+
+        elements_kwargs = {element_id: {} for element_id in found_ids}
+
+        return self.__apply_elements_edition(dataset_elements, elements_kwargs, files_refs)
+
+    def __apply_elements_edition(self, dataset_elements:list, elements_kwargs:dict, files_refs:dict) -> list:
         result_elements = []
+        changes_by_dataset = {}
         for dataset_element in dataset_elements:
             original_dataset_element = dataset_element
 
             kwargs = elements_kwargs[dataset_element._id]
 
-            if 'content' in kwargs:
+            if dataset_element._id in files_refs:
                 # New content to append here...
                 kwargs['file_ref_id'] = files_refs[dataset_element._id]
 
-            if dataset_element.dataset_id[0] != self.dataset._id:
-                # This is a forked element, we must clone it to make the modifications
-                dataset_element.unlink_dataset(self.dataset)
-                dataset_element = dataset_element.clone(self.dataset._id)
-            elif len(dataset_element.dataset_id) > 1:
-                #  This is the parent dataset, that have been forked. We need to clone the element for each forked dataset,
-                # as it is not forked from this one anymore because of the change.
-                unlinked_datasets = dataset_element.dataset_id[1:]
-                dataset_element.unlink_datasets(unlinked_datasets)
-                for dataset_id in unlinked_datasets:
-                    dataset_element.clone(dataset_id)
+            dataset_element = self.__detach_element(dataset_element, changes_by_dataset)
 
             kwargs['modification_date'] = now()
 
@@ -268,9 +443,138 @@ class DatasetElementFactory(object):
             abort(404, message="Elements not found.")
 
         self.session.flush()
+        DatasetChangeLog.append(changes_by_dataset)
 
         return result_elements
 
+    def create_upload(self, element_id:ObjectId, size:int, sha256:str=None) -> dict:
+        """
+        Opens a session to upload the content of an element by chunks, so that an interrupted upload can be resumed.
+        :param element_id: ID of the element whose content is going to be uploaded.
+        :param size: size in bytes of the whole content.
+        :param sha256: SHA256 hash of the whole content, if known. It is verified when the upload is committed.
+        :return: the upload session, as a dict.
+        """
+        can_edit_inner_element = bool(self.token.privileges & Privileges.EDIT_ELEMENTS)
+        can_edit_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_edit_inner_element, can_edit_others_elements]):
+            abort(401, message="Your token does not have privileges enough to edit elements inside this dataset.")
+
+        if size < 0:
+            abort(400, message="The size of the content can't be negative.")
+
+        if size >= global_config.get_file_size_limit():
+            abort(413, message="File size limit of {} Bytes exceeded".format(global_config.get_file_size_limit()))
+
+        dataset_element = DatasetElementDAO.query.get(_id=element_id)
+
+        if dataset_element is None:
+            abort(404, message="Dataset element wasn't found")
+
+        if not self.dataset.has_element(dataset_element) and not can_edit_others_elements:
+            abort(401, message="Operation not allowed, element is not contained by the dataset")
+
+        return UploadSession.create(self.token._id, self.dataset._id, element_id, size,
+                                    global_config.get_upload_chunk_size(), None if sha256 is None else sha256.lower())
+
+    def __get_upload(self, upload_id:ObjectId) -> dict:
+        can_edit_inner_element = bool(self.token.privileges & Privileges.EDIT_ELEMENTS)
+        can_edit_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_edit_inner_element, can_edit_others_elements]):
+            abort(401, message="Your token does not have privileges enough to edit elements inside this dataset.")
+
+        upload = UploadSession.get(upload_id)
+
+        # Sessions are private to the token that opened them.
+        if upload is None or upload['token_id'] != self.token._id or upload['dataset_id'] != self.dataset._id:
+            abort(404, message="The upload could not be found.")
+
+        return upload
+
+    @staticmethod
+    def get_upload_chunks_count(upload:dict) -> int:
+        return -(-upload['size'] // upload['chunk_size'])
+
+    def get_upload(self, upload_id:ObjectId) -> tuple:
+        """
+        Retrieves an upload session together with the chunks received so far, to resume it.
+        :param upload_id: ID of the upload session.
+        :return: tuple (upload session as a dict, sorted list of the indexes of the chunks received).
+        """
+        upload = self.__get_upload(upload_id)
+        chunks_count = self.get_upload_chunks_count(upload)
+
+        received_chunks = sorted(index for index in self.storage.get_file_chunks_sizes(upload_id) if index < chunks_count)
+
+        return upload, received_chunks
+
+    def put_upload_chunk(self, upload_id:ObjectId, index:int, content:bytes):
+        """
+        Stores a chunk of an upload. Every chunk but the last one must have the chunk size of the session.
+        :param upload_id: ID of the upload session.
+        :param index: index of the chunk, starting at 0. The chunk starts at the offset index * chunk size.
+        :param content: content of the chunk.
+        """
+        upload = self.__get_upload(upload_id)
+
+        if not 0 <= index < self.get_upload_chunks_count(upload):
+            abort(416, message="The chunk index is out of the content.")
+
+        expected_size = min(upload['chunk_size'], upload['size'] - index * upload['chunk_size'])
+
+        if len(content) != expected_size:
+            abort(400, message="The chunk {} must have a size of {} Bytes.".format(index, expected_size))
+
+        self.storage.put_file_chunk(upload_id, index, content)
+
+        # The session expires after the TTL since its last chunk. Refreshing the staged chunks rewrites all of them,
+        # thus it is done only once every half of the TTL; they expire later than the session anyway.
+        chunks_expire_soon = UploadSession.chunks_expire_soon(upload)
+
+        if chunks_expire_soon:
+            self.storage.touch_file_chunks(upload_id)
+
+        UploadSession.touch(upload_id, chunks_expire_soon)
+
+    def commit_upload(self, upload_id:ObjectId) -> DatasetElementDAO:
+        """
+        Turns the chunks of an upload into a file and sets it as the content of its element.
+        :param upload_id: ID of the upload session.
+        :return: the edited element.
+        """
+        upload = self.__get_upload(upload_id)
+
+        try:
+            file_id = self.storage.put_file_from_chunks(upload_id, self.get_upload_chunks_count(upload), upload['sha256'])
+        except InvalidChunks as ex:
+            file_id = None
+            abort(409, message=str(ex))
+        except FileSizeExceeded as ex:
+            file_id = None
+            abort(413, message=str(ex))
+
+        UploadSession.remove(upload_id)
+
+        # The element might have been cloned meanwhile (after a modification of a forked element).
+        element_id = upload['element_id']
+        clone = DatasetElementDAO.query.get(_previous_id=element_id, dataset_id=self.dataset._id)
+
+        if clone is not None:
+            element_id = clone._id
+
+        return self.edit_element(element_id, content_sha256=self.storage.get_file_hash(file_id))
+
+    def abort_upload(self, upload_id:ObjectId):
+        """
+        Discards an upload session and its chunks.
+        :param upload_id: ID of the upload session.
+        """
+        self.__get_upload(upload_id)
+        self.storage.delete_file_chunks(upload_id)
+        UploadSession.remove(upload_id)
+
     def clone_element(self, element_id:ObjectId, dest_dataset_url_prefix:str) -> DatasetElementDAO:
         can_edit_inner_element = bool(self.token.privileges & (Privileges.RO_WATCH_DATASET +
                                                                Privileges.EDIT_DATASET + Privileges.ADD_ELEMENTS))
@@ -291,6 +595,7 @@ class DatasetElementFactory(object):
         element.link_dataset(dataset)
 
         self.session.flush()
+        DatasetChangeLog.append({dataset._id: [{'op': 'insert', 'element_id': element._id}]})
 
         return element
 
@@ -315,6 +620,7 @@ class DatasetElementFactory(object):
             element.link_dataset(dataset)
 
         self.session.flush()
+        DatasetChangeLog.append({dataset._id: [{'op': 'insert', 'element_id': element._id} for element in elements]})
 
         return elements
 
@@ -353,6 +659,42 @@ class DatasetElementFactory(object):
         else:
             abort(409, message="The page size can't be greater than {}".format(global_config.get_page_size()))
 
+    def get_elements_view(self, page=0, options=None, page_size=global_config.get_page_size()) -> list:
+        """
+        Same as get_elements_info() but retrieves lightweight read-only views rather than ODM objects.
+        Intended for listings, where no modification is going to be done over the elements.
+        :return: list of DatasetElementView.
+        """
+        can_view_inner_element = bool(self.token.privileges & Privileges.RO_WATCH_DATASET)
+        can_view_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_view_inner_element, can_view_others_elements]):
+            abort(401, message="Your token does not have privileges enough to view these elements")
+
+        max_page_size = global_config.get_page_size()
+        min_page_size = 0
+
+        if not min_page_size < page_size <= max_page_size:
+            abort(409, message="The page size can't be greater than {}".format(global_config.get_page_size()))
+
+        query = dict(options) if options is not None else {}
+        query['dataset_id'] = {'$in': [self.dataset._id]}
+
+        def find_elements():
+            return DatasetElementView.find(query, skip=page*page_size, limit=page_size, db=self.read_session.impl.db)
+
+        try:
+            # A joined query may have started before a write of this token, which must be seen by read-your-writes tokens.
+            if self.token.read_your_writes:
+                elements = find_elements()
+            else:
+                elements = list(self.__views_flight.do((self.dataset._id, page, page_size, repr(options)), find_elements))
+        except Exception:
+            elements = []
+            abort(400, message="Provided options syntax is wrong.")
+
+        return elements
+
     def get_specific_elements_info(self, elements_id:list) -> list:
         can_view_inner_element = bool(self.token.privileges & Privileges.RO_WATCH_DATASET)
         can_view_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
@@ -373,6 +715,33 @@ class DatasetElementFactory(object):
         # Let's order the elements in the same way as the input.
         return [elements[_id] for _id in elements_id]
 
+    def get_specific_elements_view(self, elements_id:list) -> list:
+        """
+        Same as get_specific_elements_info() but retrieves lightweight read-only views rather than ODM objects.
+        :param elements_id: list of IDs of the elements to retrieve.
+        :return: list of DatasetElementView, in the same order as the input.
+        """
+        can_view_inner_element = bool(self.token.privileges & Privileges.RO_WATCH_DATASET)
+        can_view_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_view_inner_element, can_view_others_elements]):
+            abort(401, message="Your token does not have privileges enough to view these elements")
+
+        if len(elements_id) > global_config.get_page_size():
+            abort(416, message="Page size exceeded")
+
+        elements = {e._id: e for e in DatasetElementView.find({"dataset_id": {"$in": [self.dataset._id]},
+                                                                "_id": {"$in": elements_id}},
+                                                               db=self.read_session.impl.db)}
+
+        elements_not_found = [element_id for element_id in elements_id if element_id not in elements]
+
+        if len(elements_not_found) > 0:
+            raise KeyError("Elements not found: {}".format(elements_not_found).replace("ObjectId(", "").replace(")", ""))
+
+        # Let's order the elements in the same way as the input.
+        return [elements[_id] for _id in elements_id]
+
     def discover_real_id(self, elements_id:list) -> dict:
         """
         Discovers the real ID for elements whose ID has recently changed, like for example in cloned elements.
@@ -416,7 +785,42 @@ class DatasetElementFactory(object):
 
         return content
 
-    def get_elements_content(self, elements_id:list) -> dict:
+    def get_element_content_range(self, element_id:ObjectId, start:int, end:int=None) -> File:
+        """
+        Retrieves a slice of the content of an element. See GenericStorage.get_file_range() for the slice semantics.
+        :param element_id: ID of the element.
+        :param start: first byte of the slice.
+        :param end: byte after the last byte of the slice.
+        :return: File with the slice as content and the size of the whole content.
+        """
+        # The get_element_info() method is going to make all the required checks for the retrieval of the content.
+        dataset_element = self.get_element_info(element_id)
+
+        if dataset_element.file_ref_id is None:
+            abort(404, message="Element could not be found.")
+
+        return self.storage.get_file_range(dataset_element.file_ref_id, start, end)
+
+    def get_element_content_hash(self, element_id:ObjectId) -> str:
+        """
+        Retrieves the SHA256 hash of the content of an element, without reading the content from the storage.
+        :param element_id: ID of the element.
+        :return: SHA256 hash string of the content.
+        """
+        # The get_element_info() method is going to make all the required checks for the retrieval of the hash.
+        dataset_element = self.get_element_info(element_id)
+
+        if dataset_element.file_ref_id is None:
+            abort(404, message="Element could not be found.")
+
+        content_hash = self.storage.get_file_hash(dataset_element.file_ref_id)
+
+        if content_hash is None:
+            abort(404, message="Element could not be found.")
+
+        return content_hash
+
+    def __get_elements_with_content(self, elements_id:list) -> list:
         # The get_specific_elements_info() method is going to make all the required checks for the retrieval of the thumbnail.
         dataset_elements = [d for d in self.get_specific_elements_info(elements_id)]
 
@@ -426,10 +830,146 @@ class DatasetElementFactory(object):
             lost_elements = [element_id for element_id in elements_id if element_id not in retrieved_elements_ids]
             abort(404, message="The following elements couldn't be retrieved: {}".format(lost_elements))
 
-        files_ids = {d.file_ref_id for d in dataset_elements}
-        files = {file.id: file for file in self.storage.get_files(list(files_ids))}
-        contents = {element._id: files[element.file_ref_id].content for element in dataset_elements}
-        return contents
+        return dataset_elements
+
+    def get_elements_content(self, elements_id:list) -> dict:
+        return {element_id: content for element_id, content in self.iterate_elements_content(elements_id)}
+
+    def iterate_elements_content(self, elements_id:list):
+        """
+        Retrieves the content of the elements as they are read from the storage, in the order they are fetched.
+        All the checks are done before returning, so that no error is raised during the iteration.
+        :param elements_id: list of IDs of the elements to retrieve.
+        :return: generator of tuples (element_id, content).
+        """
+        dataset_elements = self.__get_elements_with_content(elements_id)
+
+        # Elements sharing the same content read it once.
+        elements_by_file = {}
+
+        for element in dataset_elements:
+            elements_by_file.setdefault(element.file_ref_id, []).append(element._id)
+
+        async_storage = global_config.get_async_storage() # type: AsyncStorage
+
+        def contents_generator():
+            # Files are read in byte-budgeted batches fetched concurrently, and handed as their batches complete.
+            for file in async_storage.iterate_files(list(elements_by_file)):
+                for element_id in elements_by_file[file.id]:
+                    yield element_id, file.content
+
+        return contents_generator()
+
+    def get_version(self) -> int:
+        """
+        Retrieves the version of the dataset, which increases with every change of its elements. Reading it is enough
+        to validate a copy of the manifest, without building it.
+        :return: version of the dataset.
+        """
+        can_view_inner_element = bool(self.token.privileges & Privileges.RO_WATCH_DATASET)
+        can_view_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_view_inner_element, can_view_others_elements]):
+            abort(401, message="Your token does not have privileges enough to view these elements")
+
+        return DatasetVersion.get(self.dataset._id, db=self.read_session.impl.db)
+
+    def get_manifest(self) -> Manifest:
+        """
+        Retrieves the manifest of the dataset: the ID, SHA256, size and modification date of every element.
+        The manifest is kept while the version of the dataset remains the same. Otherwise it is rebuilt, reusing the
+        entries of the elements whose content and modification date did not change.
+        :return: Manifest of the dataset.
+        """
+        can_view_inner_element = bool(self.token.privileges & Privileges.RO_WATCH_DATASET)
+        can_view_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_view_inner_element, can_view_others_elements]):
+            abort(401, message="Your token does not have privileges enough to view these elements")
+
+        db = self.read_session.impl.db
+
+        # The version is read before the elements, thus the manifest is never older than its version.
+        version = DatasetVersion.get(self.dataset._id, db=db)
+        previous_manifest = manifest_cache.get(self.dataset._id)
+
+        if previous_manifest is not None and previous_manifest.version == version:
+            return previous_manifest
+
+        previous_entries = {} if previous_manifest is None else previous_manifest.entries
+        entries = {}
+        outdated_documents = []
+
+        for document in db[DatasetElementDAO.__mongometa__.name].find({'dataset_id': self.dataset._id},
+                                                                       {'file_ref_id': 1, 'modification_date': 1}):
+            fields = (document.get('file_ref_id'), document['modification_date'])
+            previous_entry = previous_entries.get(document['_id'])
+
+            if previous_entry is not None and previous_entry[:2] == fields:
+                entries[document['_id']] = previous_entry
+            else:
+                outdated_documents.append(document)
+
+        # Hashes and sizes of the new contents are read from the storage in pages.
+        page_size = global_config.get_page_size()
+
+        for index in range(0, len(outdated_documents), page_size):
+            documents = outdated_documents[index:index+page_size]
+            files_info = self.storage.get_files_info([document['file_ref_id'] for document in documents
+                                                      if document.get('file_ref_id') is not None])
+
+            for document in documents:
+                file_ref_id = document.get('file_ref_id')
+                sha256, size = files_info.get(file_ref_id, (None, 0))
+                entries[document['_id']] = (file_ref_id, document['modification_date'],
+                                            encode_manifest_entry(document['_id'], sha256, size, document['modification_date']))
+
+        content = encode_manifest(version, [entries[element_id][2] for element_id in sorted(entries)])
+        manifest = Manifest(version, entries, content)
+        manifest_cache.put(self.dataset._id, manifest)
+
+        return manifest
+
+    def get_changes(self, since:int) -> tuple:
+        """
+        Retrieves the changes of the elements of the dataset after the given version, one page at most.
+        :param since: version of the dataset known by the client.
+        :return: tuple (version, latest_version, entries). Version is the one reached after applying the entries, and
+        latest_version the current version of the dataset. Entries are the ones of the change log (see DatasetChangeLog).
+        """
+        can_view_inner_element = bool(self.token.privileges & Privileges.RO_WATCH_DATASET)
+        can_view_others_elements = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
+
+        if not any([can_view_inner_element, can_view_others_elements]):
+            abort(401, message="Your token does not have privileges enough to view these elements")
+
+        db = self.read_session.impl.db
+        latest_version, latest_date = DatasetVersion.get_last_change(self.dataset._id, db=db)
+
+        if not 0 <= since <= latest_version:
+            abort(400, message="The version must be between 0 and {}.".format(latest_version))
+
+        entries = DatasetChangeLog.find(self.dataset._id, since, limit=global_config.get_page_size(), db=db)
+
+        # Entries are appended right after the version is increased, thus concurrent modifications might leave a gap
+        # for an instant. Only the entries before the first gap are returned.
+        version = since
+        gap_date = latest_date
+
+        for index, entry in enumerate(entries):
+            if entry['seq'] != version + 1:
+                gap_date = entry['date']
+                entries = entries[:index]
+                break
+
+            version = entry['seq']
+
+        if version == since and since < latest_version:
+            if gap_date is None or (now() - gap_date).total_seconds() > CHANGES_GAP_TIMEOUT:
+                abort(410, message="The changes after this version are not available anymore. The manifest of the "
+                                   "dataset must be retrieved again.")
+
+        return version, max(version, latest_version), entries
 
     def destroy_element(self, element_id:ObjectId) -> DatasetDAO:
         can_destroy_inner_element = bool(self.token.privileges & Privileges.DESTROY_ELEMENTS)
@@ -449,10 +989,18 @@ class DatasetElementFactory(object):
         if not self.dataset.has_element(dataset_element) and not can_destroy_others_elements:
             abort(401, message="The element does not exist inside the dataset, can't be destroyed.")
 
+        changes_by_dataset = {self.dataset._id: [{'op': 'delete', 'element_id': dataset_element._id}]}
+
+        # Datasets sharing an element owned by this dataset get a clone of it.
+        shared_elements = {}
+        if dataset_element.dataset_id[0] == self.dataset._id and len(dataset_element.dataset_id) > 1:
+            shared_elements[dataset_element._id] = list(dataset_element.dataset_id[1:])
+
         dataset_element.delete(owner_id=self.dataset._id)
 
         self.session.flush()
-        self.dataset = self.session.refresh(self.dataset)
+        self.__append_clones_remaps(shared_elements, changes_by_dataset)
+        DatasetChangeLog.append(changes_by_dataset)
 
         return self.dataset
 
@@ -485,11 +1033,21 @@ class DatasetElementFactory(object):
             lost_elements = [element_id for element_id in elements_ids if element_id not in retrieved_elements_ids]
             abort(404, message="The following elements couldn't be deleted (they don't exist?): {}".format(lost_elements))
 
+        changes_by_dataset = {self.dataset._id: []}
+
+        # Datasets sharing an element owned by this dataset get a clone of it.
+        shared_elements = {}
+
         for d in dataset_elements:
+            changes_by_dataset[self.dataset._id].append({'op': 'delete', 'element_id': d._id})
+
+            if d.dataset_id[0] == self.dataset._id and len(d.dataset_id) > 1:
+                shared_elements[d._id] = list(d.dataset_id[1:])
+
             d.delete(owner_id=self.dataset._id)
 
         self.session.flush()
-
-        self.dataset = self.session.refresh(self.dataset)
+        self.__append_clones_remaps(shared_elements, changes_by_dataset)
+        DatasetChangeLog.append(changes_by_dataset)
 
         return self.dataset
@@ -21,7 +21,13 @@
 # MA  02110-1301, USA.
 
 from flask_restful import abort
-from mldatahub.odm.dataset_dao import DatasetDAO
+from pymongo.errors import DuplicateKeyError
+from mldatahub.cache.dataset_cache import CachedDataset, get_dataset, invalidate_dataset
+from mldatahub.cache.manifest_cache import manifest_cache
+from mldatahub.odm.dataset_dao import DatasetDAO, DatasetElementDAO
+from mldatahub.odm.dataset_change_log import DatasetChangeLog
+from mldatahub.odm.dataset_version import DatasetVersion
+from mldatahub.odm.dataset_view import DatasetView
 from mldatahub.odm.token_dao import TokenDAO
 from mldatahub.helper.timing_helper import now
 from mldatahub.config.config import global_config
@@ -38,6 +44,9 @@ class DatasetFactory(object):
         self.token = token
         self.session = global_config.get_session()
 
+        # Tokens that require to read their own writes are always served by the primary binding.
+        self.read_session = self.session if self.token.read_your_writes else global_config.get_read_session()
+
     def create_dataset(self, *args, **kwargs) -> DatasetDAO:
         can_create_inner_dataset = bool(self.token.privileges & Privileges.CREATE_DATASET)
         can_create_others_dataset = bool(self.token.privileges & Privileges.ADMIN_CREATE_TOKEN)
@@ -88,14 +97,19 @@ class DatasetFactory(object):
             dataset = None
             abort(400, message=str(ex))
 
-        self.session.flush()
+        try:
+            self.session.flush()
+        except DuplicateKeyError:
+            self.session.expunge(dataset)
+            abort(400, message="Url prefix already taken.")
 
         return dataset
 
     def fork_dataset(self, dataset_url_prefix, token_src, *args, **kwargs) -> DatasetDAO:
         source_factory = DatasetFactory(token_src)
 
-        target_dataset = source_factory.get_dataset(dataset_url_prefix)
+        # The cached header is only used to check the access, the fork count of the DAO is modified.
+        target_dataset = DatasetDAO.query.get(_id=source_factory.get_dataset(dataset_url_prefix)._id)
 
         if target_dataset is None:
             abort(404, message="Dataset wasn't found.")
@@ -131,6 +145,8 @@ class DatasetFactory(object):
             #fork_dataset.add_element(element.title, element.description, element.file_ref_id, element.http_ref, list(element.tags))
 
         self.session.flush()
+        invalidate_dataset(target_dataset.url_prefix)
+        DatasetChangeLog.append({fork_dataset._id: [{'op': 'reset'}]})
 
         return fork_dataset
 
@@ -190,11 +206,18 @@ class DatasetFactory(object):
 
             edit_dataset[k] = v
 
-        self.session.flush()
+        try:
+            self.session.flush()
+        except DuplicateKeyError:
+            self.session.expunge(edit_dataset)
+            abort(400, message="Url prefix already taken.")
+
+        invalidate_dataset(edit_url_prefix)
+        DatasetChangeLog.append({edit_dataset._id: [{'op': 'dataset'}]})
 
         return edit_dataset
 
-    def get_dataset(self, url_prefix:str) -> DatasetDAO:
+    def get_dataset(self, url_prefix:str) -> CachedDataset:
         can_view_inner_dataset = bool(self.token.privileges & Privileges.RO_WATCH_DATASET)
         can_view_others_dataset = bool(self.token.privileges & Privileges.ADMIN_EDIT_TOKEN)
 
@@ -204,7 +227,7 @@ class DatasetFactory(object):
         if url_prefix is None or url_prefix == "":
             abort(400, message="Url prefix of the dataset is required")
 
-        view_dataset = DatasetDAO.query.get(url_prefix=url_prefix)
+        view_dataset = get_dataset(url_prefix)
 
         if view_dataset is None:
             abort(404, message="Dataset wasn't found.")
@@ -214,6 +237,13 @@ class DatasetFactory(object):
 
         return view_dataset
 
+    def get_datasets_view(self) -> list:
+        """
+        Retrieves lightweight read-only views of the datasets linked to the token.
+        :return: list of DatasetView.
+        """
+        return DatasetView.find({'_id': {'$in': list(self.token._datasets)}}, db=self.read_session.impl.db)
+
     def destroy_dataset(self, url_prefix:str) -> bool:
         can_destroy_inner_dataset = bool(self.token.privileges & Privileges.DESTROY_DATASET)
         can_destroy_others_dataset = bool(self.token.privileges & Privileges.ADMIN_DESTROY_TOKEN)
@@ -231,7 +261,22 @@ class DatasetFactory(object):
         if dataset is None:
             abort(404, message="Dataset wasn't found.")
 
+        # Elements owned by the dataset are removed from its forks as well.
+        shared_elements = self.session.impl.db[DatasetElementDAO.__mongometa__.name].find(
+            {'dataset_id.0': dataset._id, 'dataset_id.1': {'$exists': True}}, {'dataset_id': 1})
+        forks_changes = {}
+
+        for element in shared_elements:
+            for dataset_id in element['dataset_id'][1:]:
+                forks_changes.setdefault(dataset_id, []).append({'op': 'delete', 'element_id': element['_id']})
+
         dataset.delete()
         self.session.flush()
+        invalidate_dataset(url_prefix)
+
+        DatasetVersion.remove(dataset._id)
+        DatasetChangeLog.remove(dataset._id)
+        DatasetChangeLog.append(forks_changes)
+        manifest_cache.remove(dataset._id)
 
         return True
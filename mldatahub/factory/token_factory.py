@@ -21,6 +21,8 @@
 # MA  02110-1301, USA.
 
 from flask_restful import abort
+from mldatahub.cache.token_cache import invalidate_token
+from pymongo.errors import DuplicateKeyError
 from mldatahub.config.config import global_config
 from mldatahub.config.privileges import Privileges
 from mldatahub.helper.timing_helper import now
@@ -74,13 +76,22 @@ class TokenFactory(object):
             if not can_create_all_inner_tokens:
                 abort(401, message="This token can't create such privileged tokens.")
 
+            # Rate limits of tokens can only be set by admin.
+            if kwargs.get("max_access_times") is not None:
+                abort(401, message="This token can't set the rate limit of tokens.")
+
             if url_prefix != self.token.url_prefix:
                 abort(401, message="This token can't create tokens outside of its url prefix.")
 
         kwargs["url_prefix"] = url_prefix
 
         token = TokenDAO(*args, **kwargs)
-        self.session.flush()
+
+        try:
+            self.session.flush()
+        except DuplicateKeyError:
+            self.session.expunge(token)
+            abort(400, message="Specified token GUI already exists.")
 
         return token
 
@@ -161,6 +172,10 @@ class TokenFactory(object):
             if 'datasets' in kwargs:
                 abort(400, message="There is a parameter not allowed in the edit request.")
 
+            # Rate limits of tokens can only be changed by admin.
+            if kwargs.get('max_access_times') is not None:
+                abort(401, message="The token can't change the rate limit of tokens.")
+
         kwargs['modification_date'] = now()
 
         try:
@@ -171,7 +186,13 @@ class TokenFactory(object):
         except Exception as ex:
             abort(400, message="The token coulnd't be modified because of an invalid argument.")
 
-        self.session.flush()
+        try:
+            self.session.flush()
+        except DuplicateKeyError:
+            self.session.expunge(edit_token)
+            abort(400, message="Specified token GUI already exists.")
+
+        invalidate_token(token_gui)
 
         return edit_token
 
@@ -190,7 +211,10 @@ class TokenFactory(object):
         if edit_token is None:
             abort(400, message="The target token for linkage wasn't found.")
 
+        datasets = None
+
         if len(datasets_url_prefix) > 0 and type(datasets_url_prefix[0]) is DatasetDAO:
+            datasets = datasets_url_prefix
             datasets_url_prefix = [d.url_prefix for d in datasets_url_prefix]
 
         if not can_link_others:
@@ -208,13 +232,19 @@ class TokenFactory(object):
             if not all([prefix.split("/")[0] == self.token.url_prefix for prefix in datasets_url_prefix]):
                 abort(401, message="Dataset must belong to the token prefix.")
 
-        datasets = [DatasetDAO.query.get(url_prefix=url_prefix) for url_prefix in datasets_url_prefix]
-        datasets = [dataset for dataset in datasets if dataset is not None and dataset not in edit_token.datasets]
+        # A single query for all the prefixes. Already linked datasets are skipped.
+        if datasets is None:
+            datasets = DatasetDAO.query.find({'url_prefix': {'$in': list(datasets_url_prefix)}})
 
-        if len(datasets) > 0:
-            edit_token = edit_token.link_datasets(datasets)
+        datasets_ids = [dataset._id for dataset in datasets if not edit_token.has_dataset(dataset)]
 
         self.session.flush()
+
+        if len(datasets_ids) > 0:
+            TokenDAO.query.update({'_id': edit_token._id}, {'$addToSet': {'_datasets': {'$each': datasets_ids}}})
+            edit_token = self.session.refresh(edit_token)
+            invalidate_token(token_gui)
+
         return edit_token
 
     def unlink_datasets(self, token_gui, datasets_url_prefix):
@@ -245,14 +275,19 @@ class TokenFactory(object):
             if not all([prefix.split("/")[0] == self.token.url_prefix for prefix in datasets_url_prefix]):
                 abort(401, message="Dataset must belong to the token prefix.")
 
-        datasets = [dataset for dataset in edit_token.datasets if dataset.url_prefix in datasets_url_prefix]
+        # A single query for all the prefixes. Only linked datasets can be unlinked.
+        datasets = DatasetDAO.query.find({'url_prefix': {'$in': list(datasets_url_prefix)}})
+        datasets_ids = [dataset._id for dataset in datasets if edit_token.has_dataset(dataset)]
 
-        if len(datasets) > 0:
-            edit_token = edit_token.unlink_datasets(datasets)
-        else:
+        if len(datasets_ids) == 0:
             abort(400, message="Tokens couldn't be unlinked.")
 
         self.session.flush()
+
+        TokenDAO.query.update({'_id': edit_token._id}, {'$pullAll': {'_datasets': datasets_ids}})
+        edit_token = self.session.refresh(edit_token)
+        invalidate_token(token_gui)
+
         return edit_token
 
 
@@ -282,4 +317,5 @@ class TokenFactory(object):
 
         delete_token.delete()
         self.session.flush()
+        invalidate_token(token_gui)
         return True
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import hashlib
+import struct
+from bson import ObjectId
+
+__author__ = 'Iván de Paz Centeno'
+
+
+FRAMES_MIMETYPE = "application/x-mldatahub-frames"
+
+# Each frame is: 12 bytes of element ID + 32 bytes of SHA256 digest + 8 bytes of big-endian size + raw content.
+FRAME_HEADER = struct.Struct(">12s32sQ")
+
+
+class InvalidFrames(Exception):
+    def __init__(self, message="The frames are truncated or corrupted."):
+        Exception.__init__(self, message)
+
+
+def stream_frames(entries):
+    """
+    Encodes the contents into length-prefixed frames on the fly. Contents are not copied nor compressed.
+    :param entries: iterable of (element_id, content) tuples. Element ID must be an ObjectId and content must be bytes.
+    :return: generator of chunks of bytes of the frames.
+    """
+    for element_id, content in entries:
+        yield FRAME_HEADER.pack(ObjectId(element_id).binary, hashlib.sha256(content).digest(), len(content))
+        yield content
+
+
+def encode_frames(entries):
+    """
+    Encodes the contents into length-prefixed frames at once.
+    :param entries: iterable of (element_id, content) tuples.
+    :return: bytes of the frames.
+    """
+    return b"".join(stream_frames(entries))
+
+
+def iterate_frames(file):
+    """
+    Reads the frames from a file object, one by one.
+    :param file: seekable file object with the frames, like a SpooledTemporaryFile.
+    :return: tuple (keys, generator). Keys is the list of element IDs of the frames, retrieved by skipping the contents.
+    The generator yields tuples (element_id, content) and raises InvalidFrames on the first frame whose hash mismatches.
+    """
+    start = file.tell()
+    end = file.seek(0, 2)
+    keys = []
+
+    position = file.seek(start)
+
+    while position < end:
+        header = file.read(FRAME_HEADER.size)
+
+        if len(header) < FRAME_HEADER.size:
+            raise InvalidFrames()
+
+        element_id, _, size = FRAME_HEADER.unpack(header)
+        position = file.seek(size, 1)
+
+        if position > end:
+            raise InvalidFrames()
+
+        keys.append(ObjectId(element_id))
+
+    file.seek(start)
+
+    def frames_generator():
+        for _ in keys:
+            element_id, sha256, size = FRAME_HEADER.unpack(file.read(FRAME_HEADER.size))
+            content = file.read(size)
+
+            if len(content) < size or hashlib.sha256(content).digest() != sha256:
+                raise InvalidFrames("Invalid hash for key: {}".format(ObjectId(element_id)))
+
+            yield ObjectId(element_id), content
+
+    return keys, frames_generator()
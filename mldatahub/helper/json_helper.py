@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import datetime
+import json
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def _default(obj):
+    """
+    Encodes the types that JSON lacks, the same way serialize() does with str(): IDs as hex strings and dates as
+    "YYYY-MM-DD HH:MM:SS.ffffff". Objects with a serialize() method are encoded by their serialization, so that
+    lists of them can be encoded without being serialized beforehand.
+    :param obj: object to encode.
+    :return: JSON-compatible object.
+    """
+    if isinstance(obj, (ObjectId, datetime.datetime, datetime.date)):
+        return str(obj)
+
+    if hasattr(obj, "serialize"):
+        return obj.serialize()
+
+    raise TypeError("Object of type {} is not JSON serializable".format(type(obj).__name__))
+
+
+def stdlib_dumps(data, indent: bool=False) -> bytes:
+    """
+    Encodes data into JSON with the standard library.
+    :param data: data to encode.
+    :param indent: flag to indent the output, for humans.
+    :return: UTF-8 bytes of the JSON.
+    """
+    return json.dumps(data, default=_default, indent=4 if indent else None).encode()
+
+
+def orjson_dumps(data, indent: bool=False) -> bytes:
+    """
+    Encodes data into JSON with orjson. Dates are passed through to _default() so that their format matches the
+    standard library one.
+    :param data: data to encode.
+    :param indent: flag to indent the output, for humans.
+    :return: UTF-8 bytes of the JSON.
+    """
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    if indent:
+        option |= orjson.OPT_INDENT_2
+
+    return orjson.dumps(data, default=_default, option=option)
+
+
+# orjson is optional: it is used when installed.
+dumps = stdlib_dumps if orjson is None else orjson_dumps
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import datetime
+import struct
+from bson import ObjectId
+
+__author__ = 'Iván de Paz Centeno'
+
+
+MANIFEST_MIMETYPE = "application/x-mldatahub-manifest"
+
+# The manifest is: 4 bytes of magic + 8 bytes of big-endian dataset version + 8 bytes of big-endian entries count,
+# followed by the entries.
+MANIFEST_MAGIC = b"MDHM"
+MANIFEST_HEADER = struct.Struct(">4sQQ")
+
+# Each entry is: 12 bytes of element ID + 32 bytes of SHA256 digest + 8 bytes of big-endian size +
+# 8 bytes of big-endian modification date, in milliseconds since epoch.
+# Elements without content have a SHA256 digest of zeros and a size of 0.
+MANIFEST_ENTRY = struct.Struct(">12s32sQQ")
+
+NO_CONTENT_SHA256 = bytes(32)
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class InvalidManifest(Exception):
+    def __init__(self, message="The manifest is truncated or corrupted."):
+        Exception.__init__(self, message)
+
+
+def date_to_millis(date: datetime.datetime) -> int:
+    """
+    Converts a date, as stored in the DB, to milliseconds since epoch.
+    :param date: naive datetime.
+    :return: integer of milliseconds.
+    """
+    return (date - EPOCH) // datetime.timedelta(milliseconds=1)
+
+
+def encode_manifest_entry(element_id, sha256, size, modification_date) -> bytes:
+    """
+    Encodes the entry of an element for the manifest.
+    :param element_id: ObjectId of the element.
+    :param sha256: hex string of the SHA256 of the content of the element, None if it has no content.
+    :param size: size of the content of the element.
+    :param modification_date: datetime of the last modification of the element.
+    :return: bytes of the entry.
+    """
+    digest = NO_CONTENT_SHA256 if sha256 is None else bytes.fromhex(sha256)
+
+    return MANIFEST_ENTRY.pack(ObjectId(element_id).binary, digest, size or 0, date_to_millis(modification_date))
+
+
+def encode_manifest(version, entries) -> bytes:
+    """
+    Builds the manifest from the encoded entries.
+    :param version: version of the dataset.
+    :param entries: list of encoded entries, as returned by encode_manifest_entry().
+    :return: bytes of the manifest.
+    """
+    return MANIFEST_HEADER.pack(MANIFEST_MAGIC, version, len(entries)) + b"".join(entries)
+
+
+def decode_manifest(manifest: bytes):
+    """
+    Decodes a manifest.
+    :param manifest: bytes of the manifest.
+    :return: tuple (version, entries). Entries is a list of tuples (element_id, sha256, size, modification_date),
+    with sha256 as a hex string (None for elements without content) and modification_date in milliseconds.
+    """
+    if len(manifest) < MANIFEST_HEADER.size:
+        raise InvalidManifest()
+
+    magic, version, count = MANIFEST_HEADER.unpack_from(manifest)
+
+    if magic != MANIFEST_MAGIC or len(manifest) != MANIFEST_HEADER.size + count * MANIFEST_ENTRY.size:
+        raise InvalidManifest()
+
+    entries = []
+
+    for element_id, digest, size, modification_date in MANIFEST_ENTRY.iter_unpack(manifest[MANIFEST_HEADER.size:]):
+        sha256 = None if digest == NO_CONTENT_SHA256 else digest.hex()
+        entries.append((ObjectId(element_id), sha256, size, modification_date))
+
+    return version, entries
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from ming import mim
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def is_in_memory(collection) -> bool:
+    """
+    Checks whether a collection belongs to the in-memory backend of ming (session URIs starting by "mim://"), which
+    lacks some features of Mongo: the aggregations only support the $match, $project, $sort and $limit stages, and the
+    bulk writes only apply their first operation.
+    :param collection: pymongo collection.
+    :return: True if the collection is in memory, False otherwise.
+    """
+    return isinstance(collection, mim.Collection)
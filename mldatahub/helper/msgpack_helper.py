@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import datetime
+from bson import ObjectId
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+__author__ = 'Iván de Paz Centeno'
+
+
+MSGPACK_MIMETYPE = "application/msgpack"
+
+# MessagePack extension type of the IDs: the 12 bytes of the ObjectId.
+OBJECT_ID_EXT_TYPE = 1
+
+
+def _default(obj):
+    """
+    Encodes the types that MessagePack lacks. IDs are packed as the extension type OBJECT_ID_EXT_TYPE and dates as
+    MessagePack timestamps (naive dates are local dates, see timing_helper.now()). Objects with a serialize_native()
+    or a serialize() method are encoded by their serialization.
+    :param obj: object to encode.
+    :return: MessagePack-compatible object.
+    """
+    if isinstance(obj, ObjectId):
+        return msgpack.ExtType(OBJECT_ID_EXT_TYPE, obj.binary)
+
+    if isinstance(obj, datetime.datetime):
+        return msgpack.Timestamp.from_datetime(obj)
+
+    if hasattr(obj, "serialize_native"):
+        return obj.serialize_native()
+
+    if hasattr(obj, "serialize"):
+        return obj.serialize()
+
+    raise TypeError("Object of type {} is not MessagePack serializable".format(type(obj).__name__))
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == OBJECT_ID_EXT_TYPE:
+        return ObjectId(data)
+
+    return msgpack.ExtType(code, data)
+
+
+def _to_local_date(value):
+    """
+    Turns the timestamps, decoded as UTC datetimes, into naive local dates like the ones stored in the DB (see
+    timing_helper.now()), so that they can be compared with them.
+    """
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+
+    return value
+
+
+def _object_hook(obj: dict) -> dict:
+    for key, value in obj.items():
+        if isinstance(value, datetime.datetime):
+            obj[key] = _to_local_date(value)
+
+    return obj
+
+
+def _list_hook(items: list) -> list:
+    for index, item in enumerate(items):
+        if isinstance(item, datetime.datetime):
+            items[index] = _to_local_date(item)
+
+    return items
+
+
+def packb(data) -> bytes:
+    """
+    Encodes data into MessagePack.
+    :param data: data to encode.
+    :return: bytes of the MessagePack.
+    """
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def unpackb(content: bytes):
+    """
+    Decodes MessagePack data. IDs are decoded as ObjectId and timestamps as naive local dates, as the dates of the DB.
+    :param content: bytes of the MessagePack.
+    :return: decoded data.
+    """
+    return _to_local_date(msgpack.unpackb(content, ext_hook=_ext_hook, timestamp=3, raw=False, strict_map_key=False,
+                                          object_hook=_object_hook, list_hook=_list_hook))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import hashlib
+import time
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+from pyzip import PyZip, InvalidKeysHashes
+
+__author__ = 'Iván de Paz Centeno'
+
+
+HASHES_KEY = "__SHA256__HASHES__.zip"
+
+# Signatures of formats whose content is already compressed. Deflating them again only wastes CPU.
+COMPRESSED_SIGNATURES = [
+    (0, b"\xff\xd8\xff"),               # JPEG
+    (0, b"\x89PNG\r\n\x1a\n"),          # PNG
+    (0, b"GIF8"),                       # GIF
+    (8, b"WEBP"),                       # WEBP
+    (0, b"PK\x03\x04"),                 # ZIP
+    (0, b"\x1f\x8b"),                   # GZIP
+    (0, b"BZh"),                        # BZIP2
+    (0, b"\xfd7zXZ\x00"),               # XZ
+    (0, b"\x28\xb5\x2f\xfd"),           # ZSTD
+    (0, b"7z\xbc\xaf\x27\x1c"),         # 7Z
+    (0, b"OggS"),                       # OGG
+    (0, b"ID3"),                        # MP3
+    (4, b"ftyp"),                       # MP4
+]
+
+
+def is_compressed(content):
+    """
+    Checks whether the content is already compressed by looking at its signature.
+    :param content: bytes to check.
+    :return: True if the content belongs to a compressed format, False otherwise.
+    """
+    return any([content[offset:offset+len(signature)] == signature for offset, signature in COMPRESSED_SIGNATURES])
+
+
+class _StreamBuffer(object):
+    """
+    Write-only file object that keeps the bytes written by the zip until they are drained.
+    It is not seekable, so that the zip writes each entry sequentially.
+    """
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_zip(entries, store_hashes=True):
+    """
+    Generates a zip archive on the fly, entry by entry. The result is readable by PyZip().from_bytes().
+    Only one entry is held in memory at a time. Contents already compressed are stored rather than deflated.
+    :param entries: iterable of (key, content) tuples. Content must be bytes.
+    :param store_hashes: boolean flag to append the SHA256 hashes of the entries, as PyZip does.
+    :return: generator of chunks of bytes of the archive.
+    """
+    buffer = _StreamBuffer()
+    hashes = {}
+
+    with ZipFile(buffer, mode="w") as z:
+        for key, content in entries:
+            info = ZipInfo(str(key), date_time=time.localtime(time.time())[:6])
+            info.compress_type = ZIP_STORED if is_compressed(content) else ZIP_DEFLATED
+            info.external_attr = 0o600 << 16
+
+            z.writestr(info, content)
+
+            if store_hashes:
+                hashes[str(key)] = hashlib.sha256(content).hexdigest().encode()
+
+            yield buffer.drain()
+
+        if store_hashes:
+            z.writestr(HASHES_KEY, PyZip(hashes).to_bytes(store_hashes=False))
+
+    yield buffer.drain()
+
+
+def iterate_zip(file):
+    """
+    Reads a zip archive created by PyZip (or by stream_zip()) entry by entry, without loading it whole in memory.
+    :param file: seekable file object with the archive, like a SpooledTemporaryFile.
+    :return: tuple (keys, generator). Keys is the list of keys of the entries, available before reading any content.
+    The generator yields tuples (key, content) and raises InvalidKeysHashes on the first entry whose hash mismatches.
+    """
+    z = ZipFile(file)
+
+    hashes = None
+    if HASHES_KEY in z.namelist():
+        hashes = PyZip().from_bytes(z.read(HASHES_KEY), inflate=False)
+
+    keys = [key for key in z.namelist() if key != HASHES_KEY and key[-1] != "/"]
+
+    def entries_generator():
+        with z:
+            for key in keys:
+                content = z.read(key)
+
+                if hashes is not None and hashlib.sha256(content).hexdigest().encode() != hashes[key]:
+                    raise InvalidKeysHashes([key])
+
+                yield key, content
+
+    return keys, entries_generator()
@@ -44,6 +44,17 @@ class FileLog(object):
         self.__thread_storer = Thread(target=self.__thread_func__, daemon=True)
         self.__thread_storer.start()
 
+    def after_fork(self):
+        """
+        Starts the storer thread again in a forked process, as threads are not inherited by the child processes.
+        Lines queued before the fork are discarded: they belong to the parent process.
+        """
+        self.__lock = Lock()
+        self.__buffer = []
+        self.__finish_requested = False
+        self.__thread_storer = Thread(target=self.__thread_func__, daemon=True)
+        self.__thread_storer.start()
+
     def set_file_uri(self, new_uri):
         self.__file_uri = new_uri
 
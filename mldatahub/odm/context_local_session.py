@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from contextvars import ContextVar
+from ming import Session
+from ming.odm import ODMSession, ThreadLocalODMSession
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class ContextLocalODMSession(ThreadLocalODMSession):
+    """
+    Proxy to the ODM session of the current context, rather than the one of the current thread.
+    Each thread runs in a context of its own, thus it behaves as the ThreadLocalODMSession for threads. The ASGI app runs
+    each request in a context of its own too, so the steps of a request share its session even when they are run by
+    different threads, and the requests never share theirs.
+
+    All the ODM sessions are built on the same document session, whose "bind" can be replaced to rebind all of them.
+    """
+    def __init__(self, bind):
+        """
+        :param bind: ming DataStore to bind the sessions to.
+        """
+        doc_session = Session(bind)
+        super().__init__(doc_session=doc_session)
+        self.doc_session = doc_session
+        self.context_session = ContextVar("odm_session_{}".format(id(self)), default=None)
+
+    def _get(self):
+        session = self.context_session.get()
+
+        if session is None:
+            session = ODMSession(doc_session=self.doc_session)
+            self.context_session.set(session)
+
+        return session
+
+    def close(self):
+        self._get().close()
+        self.context_session.set(None)
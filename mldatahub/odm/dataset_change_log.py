@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from pymongo import ASCENDING
+from mldatahub.config.config import global_config
+from mldatahub.helper.timing_helper import now
+from mldatahub.odm.dataset_version import DatasetVersion
+
+__author__ = 'Iván de Paz Centeno'
+
+
+session = global_config.get_session()
+
+
+class DatasetChangeLog(object):
+    """
+    Log of the changes of the elements of each dataset.
+    Every modification appends an entry per affected dataset, whose sequence number is the new version of the
+    dataset. Entries are removed by Mongo once they are older than the "change_log_ttl" config value.
+
+    Each entry holds a list of changes, which are dicts with an "op" key:
+        - insert, update, delete: of the element "element_id".
+        - remap: the element "element_id" was replaced by a clone of it, "new_id".
+        - dataset: the dataset itself was modified.
+        - reset: the elements of the dataset must be retrieved again (like after a fork).
+    """
+    collection_name = "dataset_change"
+
+    # Changes over this number in a single entry are replaced by a reset, to keep the entries small.
+    max_changes_per_entry = 10000
+
+    @classmethod
+    def __collection(cls, db=None):
+        if db is None:
+            db = session.impl.db
+
+        return db[cls.collection_name]
+
+    @classmethod
+    def ensure_indexes(cls):
+        """
+        Creates the indexes of the log: the sequence numbers are unique per dataset and the entries expire.
+        """
+        collection = cls.__collection()
+        collection.create_index([('dataset_id', ASCENDING), ('seq', ASCENDING)], unique=True)
+        collection.create_index('date', expireAfterSeconds=global_config.get_change_log_ttl())
+
+    @classmethod
+    def append(cls, changes_by_dataset: dict) -> dict:
+        """
+        Appends the changes of the datasets to the log, increasing their versions.
+        :param changes_by_dataset: associative array with dataset ID -> list of changes.
+        :return: associative array with dataset ID -> new version.
+        """
+        versions = DatasetVersion.increment(changes_by_dataset.keys())
+        date = now()
+        entries = []
+
+        for dataset_id, changes in changes_by_dataset.items():
+            if len(changes) > cls.max_changes_per_entry:
+                changes = [{'op': 'reset'}]
+
+            entries.append({'dataset_id': dataset_id, 'seq': versions[dataset_id], 'date': date, 'changes': changes})
+
+        if len(entries) > 0:
+            cls.__collection().insert_many(entries)
+
+        return versions
+
+    @classmethod
+    def find(cls, dataset_id, since: int, limit: int=0, db=None) -> list:
+        """
+        Retrieves the entries of a dataset after the given sequence number.
+        :param dataset_id: ID of the dataset.
+        :param since: sequence number after which the entries are wanted.
+        :param limit: max number of entries to retrieve (0 for no limit).
+        :param db: pymongo database to read from. If None, the one from the ODM session is used.
+        :return: list of entries, sorted by sequence number.
+        """
+        return list(cls.__collection(db).find({'dataset_id': dataset_id, 'seq': {'$gt': since}},
+                                              {'_id': 0, 'dataset_id': 0}).sort('seq', ASCENDING).limit(limit))
+
+    @classmethod
+    def remove(cls, dataset_id):
+        """
+        Removes the log of a dataset, once the dataset is destroyed.
+        :param dataset_id: ID of the dataset.
+        """
+        cls.__collection().delete_many({'dataset_id': dataset_id})
@@ -20,7 +20,6 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
 # MA  02110-1301, USA.
 
-from multiprocessing import Lock
 from bson import ObjectId
 from mldatahub.helper.timing_helper import now
 from mldatahub.config.config import global_config
@@ -32,7 +31,6 @@ from ming.odm import ForeignIdProperty, MappedClass, FieldProperty
 __author__ = 'Iván de Paz Centeno'
 
 
-lock = Lock()
 session = global_config.get_session()
 
 class GIterator(object):
@@ -54,6 +52,7 @@ class DatasetDAO(MappedClass):
     class __mongometa__:
         session = session
         name = 'dataset'
+        unique_indexes = [('url_prefix',)]
 
     _id = FieldProperty(schema.ObjectId)
     url_prefix = FieldProperty(schema.String)
@@ -89,10 +88,7 @@ class DatasetDAO(MappedClass):
 
     def __init__(self, url_prefix, title, description, reference, tags=None, creation_date=now(), modification_date=now(),
                  fork_count=0, forked_from=None, forked_from_id=None):
-        with lock:
-            if DatasetDAO.query.get(url_prefix=url_prefix) is not None:
-                raise Exception("Url prefix already taken.")
-
+        # Uniqueness of the url prefix is guaranteed by the unique index: a duplicated one fails on flush.
         if forked_from_id is None and forked_from is not None:
             forked_from_id = forked_from._id
 
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from pymongo import ReturnDocument
+from mldatahub.config.config import global_config
+from mldatahub.helper.timing_helper import now
+
+__author__ = 'Iván de Paz Centeno'
+
+
+session = global_config.get_session()
+
+
+class DatasetVersion(object):
+    """
+    Version counter of the elements of each dataset. It is increased every time the elements of the dataset change,
+    so that anything derived from them (like the manifest) can be kept while the version remains the same.
+    Counters live in their own collection, apart from the dataset documents which are saved as a whole by the ODM.
+    """
+    collection_name = "dataset_version"
+
+    @classmethod
+    def __collection(cls, db=None):
+        if db is None:
+            db = session.impl.db
+
+        return db[cls.collection_name]
+
+    @classmethod
+    def increment(cls, datasets_ids) -> dict:
+        """
+        Increases the version of the specified datasets.
+        :param datasets_ids: iterable of IDs of the datasets.
+        :return: associative array with dataset ID -> new version.
+        """
+        collection = cls.__collection()
+        update = {'$inc': {'version': 1}, '$set': {'date': now()}}
+
+        return {dataset_id: collection.find_one_and_update({'_id': dataset_id}, update, upsert=True,
+                                                           return_document=ReturnDocument.AFTER)['version']
+                for dataset_id in set(datasets_ids)}
+
+    @classmethod
+    def get(cls, dataset_id, db=None) -> int:
+        """
+        Retrieves the version of a dataset.
+        :param dataset_id: ID of the dataset.
+        :param db: pymongo database to read from. If None, the one from the ODM session is used.
+        :return: version of the dataset, 0 if its elements were never modified.
+        """
+        return cls.get_last_change(dataset_id, db)[0]
+
+    @classmethod
+    def get_last_change(cls, dataset_id, db=None) -> tuple:
+        """
+        Retrieves the version of a dataset together with the date it was increased.
+        :param dataset_id: ID of the dataset.
+        :param db: pymongo database to read from. If None, the one from the ODM session is used.
+        :return: tuple (version, date). Date is None if the elements of the dataset were never modified.
+        """
+        document = cls.__collection(db).find_one({'_id': dataset_id})
+
+        if document is None:
+            return 0, None
+
+        return document['version'], document.get('date')
+
+    @classmethod
+    def remove(cls, dataset_id):
+        """
+        Removes the version of a dataset, once the dataset is destroyed.
+        :param dataset_id: ID of the dataset.
+        """
+        cls.__collection().delete_one({'_id': dataset_id})
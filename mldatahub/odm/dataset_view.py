@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from collections import Counter
+from mldatahub.config.config import global_config
+from mldatahub.helper.mongo_helper import is_in_memory
+from mldatahub.odm.dataset_dao import DatasetDAO, DatasetElementDAO, DatasetCommentDAO, DatasetElementCommentDAO
+
+__author__ = 'Iván de Paz Centeno'
+
+
+session = global_config.get_session()
+
+
+def _collection(dao_class, db=None):
+    """
+    Retrieves the raw pymongo collection backing the specified DAO class.
+    :param dao_class: mapped class whose collection is wanted.
+    :param db: pymongo database to use. If None, the one from the ODM session is used.
+    :return: pymongo collection.
+    """
+    if db is None:
+        db = session.impl.db
+
+    return db[dao_class.__mongometa__.name]
+
+
+def _count_by(collection, field, ids, unwind=False):
+    """
+    Counts the documents of a collection grouped by the given field, restricted to the specified ids.
+    It is done in a single aggregation rather than one count() per id.
+    :param collection: pymongo collection to aggregate.
+    :param field: name of the field that references the ids.
+    :param ids: list of ids to count documents for.
+    :param unwind: flag to unwind the field before grouping (for fields that hold lists of ids).
+    :return: Counter with id -> number of documents.
+    """
+    if len(ids) == 0:
+        return Counter()
+
+    if is_in_memory(collection):
+        # The in-memory backend can't group: the references are counted here instead.
+        ids_set = set(ids)
+        counter = Counter()
+
+        for document in collection.find({field: {'$in': ids}}, {field: 1}):
+            values = document.get(field, []) if unwind else [document.get(field)]
+            counter.update(value for value in values if value in ids_set)
+
+        return counter
+
+    pipeline = [{'$match': {field: {'$in': ids}}}]
+
+    if unwind:
+        pipeline += [{'$unwind': '${}'.format(field)}, {'$match': {field: {'$in': ids}}}]
+
+    pipeline.append({'$group': {'_id': '${}'.format(field), 'count': {'$sum': 1}}})
+
+    return Counter({group['_id']: group['count'] for group in collection.aggregate(pipeline)})
+
+
+def _stringify(serialization: dict, fields: list) -> dict:
+    """
+    Converts the given fields of a native serialization into strings, as the JSON serialization of the DAOs does.
+    :param serialization: dict with the native serialization. It is modified in place.
+    :param fields: names of the fields to convert. Fields not present are skipped.
+    :return: the same dict.
+    """
+    for field in fields:
+        if field in serialization:
+            serialization[field] = str(serialization[field])
+
+    return serialization
+
+
+class DatasetElementView(object):
+    """
+    Read-only view of a dataset element, built straight from a raw pymongo document.
+    It skips the ODM hydration, validation and identity map, which makes it way cheaper for listings.
+    Its serialization matches DatasetElementDAO.serialize().
+    """
+    __slots__ = ("_id", "_previous_id", "title", "description", "file_ref_id", "http_ref", "tags",
+                 "addition_date", "modification_date", "dataset_id", "comments_count")
+
+    projection = {field: 1 for field in __slots__ if field != "comments_count"}
+
+    def __init__(self, document: dict, comments_count: int=0):
+        """
+        Initializer of the view.
+        :param document: raw pymongo document of the element.
+        :param comments_count: number of comments of the element.
+        """
+        self._id = document['_id']
+        self._previous_id = document.get('_previous_id')
+        self.title = document.get('title')
+        self.description = document.get('description')
+        self.file_ref_id = document.get('file_ref_id')
+        self.http_ref = document.get('http_ref')
+        self.tags = document.get('tags') or []
+        self.addition_date = document.get('addition_date')
+        self.modification_date = document.get('modification_date')
+        self.dataset_id = document.get('dataset_id') or []
+        self.comments_count = comments_count
+
+    @classmethod
+    def find(cls, query: dict, skip: int=0, limit: int=0, db=None) -> list:
+        """
+        Retrieves the views of the elements that match the query, sorted by addition date.
+        :param query: pymongo query for the elements.
+        :param skip: number of elements to skip.
+        :param limit: max number of elements to retrieve (0 for no limit).
+        :param db: pymongo database to read from. If None, the one from the ODM session is used.
+        :return: list of DatasetElementView.
+        """
+        cursor = _collection(DatasetElementDAO, db).find(query, cls.projection).sort("addition_date", 1)
+
+        if skip > 0:
+            cursor = cursor.skip(skip)
+
+        if limit > 0:
+            cursor = cursor.limit(limit)
+
+        documents = list(cursor)
+        comments_count = _count_by(_collection(DatasetElementCommentDAO, db), 'element_id',
+                                   [document['_id'] for document in documents])
+
+        return [cls(document, comments_count[document['_id']]) for document in documents]
+
+    def serialize_native(self) -> dict:
+        """
+        Serialization that keeps the IDs and dates in their own types, for the binary formats (like msgpack).
+        :return: dict with the serialization.
+        """
+        response = {
+            "title": self.title,
+            "description": self.description,
+            "_id": self._id,
+            "addition_date": self.addition_date,
+            "modification_date": self.modification_date,
+            "http_ref": self.http_ref,
+        }
+
+        if self._previous_id is not None:
+            response['previous_id'] = self._previous_id
+
+        response['comments_count'] = self.comments_count
+        response['has_content'] = self.file_ref_id is not None
+        response['tags'] = list(self.tags)
+        return response
+
+    def serialize(self) -> dict:
+        return _stringify(self.serialize_native(), ["title", "description", "_id", "addition_date",
+                                                    "modification_date", "http_ref", "previous_id"])
+
+
+class DatasetView(object):
+    """
+    Read-only view of a dataset, built straight from a raw pymongo document.
+    Its serialization matches DatasetDAO.serialize().
+    """
+    __slots__ = ("_id", "url_prefix", "title", "description", "reference", "creation_date", "modification_date",
+                 "size", "tags", "fork_count", "forked_from_id", "comments_count", "elements_count", "fork_father")
+
+    projection = {field: 1 for field in __slots__ if field not in ["comments_count", "elements_count", "fork_father"]}
+
+    def __init__(self, document: dict, comments_count: int=0, elements_count: int=0, fork_father: str=None):
+        """
+        Initializer of the view.
+        :param document: raw pymongo document of the dataset.
+        :param comments_count: number of comments of the dataset.
+        :param elements_count: number of elements linked to the dataset.
+        :param fork_father: url prefix of the dataset this one was forked from, if any.
+        """
+        self._id = document['_id']
+        self.url_prefix = document.get('url_prefix')
+        self.title = document.get('title')
+        self.description = document.get('description')
+        self.reference = document.get('reference')
+        self.creation_date = document.get('creation_date')
+        self.modification_date = document.get('modification_date')
+        self.size = document.get('size')
+        self.tags = document.get('tags') or []
+        self.fork_count = document.get('fork_count')
+        self.forked_from_id = document.get('forked_from_id')
+        self.comments_count = comments_count
+        self.elements_count = elements_count
+        self.fork_father = fork_father
+
+    @classmethod
+    def find(cls, query: dict, db=None) -> list:
+        """
+        Retrieves the views of the datasets that match the query.
+        Counters and fork fathers are resolved with one aggregation per collection rather than per dataset.
+        :param query: pymongo query for the datasets.
+        :param db: pymongo database to read from. If None, the one from the ODM session is used.
+        :return: list of DatasetView.
+        """
+        datasets_collection = _collection(DatasetDAO, db)
+        documents = list(datasets_collection.find(query, cls.projection))
+        ids = [document['_id'] for document in documents]
+
+        comments_count = _count_by(_collection(DatasetCommentDAO, db), 'dataset_id', ids)
+        elements_count = _count_by(_collection(DatasetElementDAO, db), 'dataset_id', ids, unwind=True)
+
+        fathers_ids = list({document['forked_from_id'] for document in documents if document.get('forked_from_id') is not None})
+
+        if len(fathers_ids) > 0:
+            fork_fathers = {father['_id']: father['url_prefix'] for father in
+                            datasets_collection.find({'_id': {'$in': fathers_ids}}, {'url_prefix': 1})}
+        else:
+            fork_fathers = {}
+
+        return [cls(document, comments_count[document['_id']], elements_count[document['_id']],
+                    fork_fathers.get(document.get('forked_from_id'))) for document in documents]
+
+    def serialize_native(self) -> dict:
+        """
+        Serialization that keeps the numbers and dates in their own types, for the binary formats (like msgpack).
+        :return: dict with the serialization.
+        """
+        response = {
+            "title": self.title,
+            "description": self.description,
+            "reference": self.reference,
+            "creation_date": self.creation_date,
+            "modification_date": self.modification_date,
+            "url_prefix": self.url_prefix,
+            "fork_count": self.fork_count,
+            "size": self.size,
+        }
+
+        response['comments_count'] = self.comments_count
+        response['elements_count'] = self.elements_count
+        response['tags'] = list(self.tags)
+        response['fork_father'] = self.fork_father
+
+        return response
+
+    def serialize(self) -> dict:
+        return _stringify(self.serialize_native(), ["title", "description", "reference", "creation_date",
+                                                    "modification_date", "url_prefix", "fork_count", "size"])
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+
+from pymongo import ASCENDING
+from mldatahub.config.config import global_config
+from mldatahub.helper.timing_helper import now
+
+__author__ = 'Iván de Paz Centeno'
+
+
+session = global_config.get_session()
+
+
+class FileChunk(object):
+    """
+    Chunks of the contents stored by parts. Chunks are identified by the file they belong to and their index.
+
+    The chunks of an upload by parts are staged under the ID of the upload, which becomes the ID of the file once the
+    upload is committed. Staged chunks have a date, and are removed by Mongo once it is older than 1.5 times the
+    "upload_session_ttl" config value: the dates of the chunks of an active upload are refreshed once every half of
+    the TTL, so that they outlive their session. Committing the upload drops the date of its chunks, which become the
+    content of the file. Contents bigger than a chunk that are put whole are stored by chunks too.
+    """
+    collection_name = "file_chunk"
+
+    @classmethod
+    def __collection(cls, db=None):
+        if db is None:
+            db = session.impl.db
+
+        return db[cls.collection_name]
+
+    @classmethod
+    def ensure_indexes(cls):
+        """
+        Creates the indexes of the chunks: chunks are unique per file and index, and staged chunks expire.
+        """
+        collection = cls.__collection()
+        collection.create_index([('file_id', ASCENDING), ('index', ASCENDING)], unique=True)
+        collection.create_index('date', expireAfterSeconds=global_config.get_upload_session_ttl() * 3 // 2)
+
+    @classmethod
+    def put(cls, file_id, index: int, content_bytes: bytes):
+        """
+        Stages a chunk. A chunk uploaded twice replaces the previous one.
+        :param file_id: ID of the upload.
+        :param index: index of the chunk within the content.
+        :param content_bytes: content of the chunk.
+        """
+        update = {'$set': {'content': content_bytes, 'size': len(content_bytes), 'date': now()}}
+
+        cls.__collection().update_one({'file_id': file_id, 'index': index}, update, upsert=True)
+
+    @classmethod
+    def put_content(cls, file_id, content_bytes: bytes, chunk_size: int):
+        """
+        Stores a whole content by chunks, as the content of a file.
+        :param file_id: ID of the file.
+        :param content_bytes: content of the file.
+        :param chunk_size: size of every chunk but the last one.
+        """
+        cls.__collection().insert_many([{'file_id': file_id, 'index': index,
+                                         'content': content_bytes[offset:offset+chunk_size],
+                                         'size': len(content_bytes[offset:offset+chunk_size])}
+                                        for index, offset in enumerate(range(0, len(content_bytes), chunk_size))])
+
+    @classmethod
+    def touch(cls, file_id):
+        """
+        Refreshes the date of the staged chunks of an upload, so that they don't expire while the upload is active.
+        :param file_id: ID of the upload.
+        """
+        cls.__collection().update_many({'file_id': file_id, 'date': {'$exists': True}}, {'$set': {'date': now()}})
+
+    @classmethod
+    def get_sizes(cls, file_id) -> dict:
+        """
+        Retrieves the chunks of a file or an upload, without their content.
+        :param file_id: ID of the file or the upload.
+        :return: associative array with index -> size of the chunk.
+        """
+        return {document['index']: document['size'] for document in
+                cls.__collection().find({'file_id': file_id}, {'index': 1, 'size': 1})}
+
+    @classmethod
+    def iterate(cls, file_id, chunks_count: int):
+        """
+        Iterates over the content of the chunks of a file or an upload, in order. Chunks are read one by one, so that
+        only one of them is held at a time.
+        :param file_id: ID of the file or the upload.
+        :param chunks_count: number of chunks to read.
+        :return: generator of the contents of the chunks. Missing chunks are yielded as None.
+        """
+        collection = cls.__collection()
+
+        for index in range(chunks_count):
+            document = collection.find_one({'file_id': file_id, 'index': index}, {'content': 1})
+            yield None if document is None else document['content']
+
+    @classmethod
+    def promote(cls, file_id, chunks_count: int) -> int:
+        """
+        Turns the staged chunks of an upload into the content of the file with the same ID, by dropping their date.
+        Chunks beyond the content are left to expire.
+        :param file_id: ID of the upload.
+        :param chunks_count: number of chunks of the content.
+        :return: number of chunks promoted.
+        """
+        return cls.__collection().update_many({'file_id': file_id, 'index': {'$lt': chunks_count}},
+                                              {'$unset': {'date': ""}}).matched_count
+
+    @classmethod
+    def get_contents(cls, files_ids: list, db=None) -> dict:
+        """
+        Retrieves the whole contents of files stored by chunks.
+        :param files_ids: list of IDs of the files.
+        :param db: pymongo database to read from. If None, the one from the ODM session is used.
+        :return: associative array with ID -> content, with the chunks joined.
+        """
+        chunks_by_file = {}
+
+        for document in cls.__collection(db).find({'file_id': {'$in': files_ids}, 'date': {'$exists': False}},
+                                                  {'file_id': 1, 'index': 1, 'content': 1}):
+            chunks_by_file.setdefault(document['file_id'], []).append((document['index'], document['content']))
+
+        return {file_id: b"".join(content for _, content in sorted(chunks)) for file_id, chunks in chunks_by_file.items()}
+
+    @classmethod
+    def get_range(cls, file_id, first_index: int, last_index: int, db=None) -> bytes:
+        """
+        Retrieves the content of consecutive chunks of a file, without reading the rest of them.
+        :param file_id: ID of the file.
+        :param first_index: index of the first chunk.
+        :param last_index: index of the last chunk, included.
+        :param db: pymongo database to read from. If None, the one from the ODM session is used.
+        :return: the contents of the chunks, joined.
+        """
+        query = {'file_id': file_id, 'index': {'$gte': first_index, '$lte': last_index}, 'date': {'$exists': False}}
+
+        return b"".join(document['content'] for document in
+                        cls.__collection(db).find(query, {'content': 1}).sort('index', ASCENDING))
+
+    @classmethod
+    def remove(cls, file_id):
+        """
+        Removes the chunks of a file or an upload.
+        :param file_id: ID of the file or the upload.
+        """
+        cls.__collection().delete_many({'file_id': file_id})
+
+    @classmethod
+    def remove_files(cls, files_ids: list):
+        """
+        Removes the chunks of several files.
+        :param files_ids: list of IDs of the files.
+        """
+        cls.__collection().delete_many({'file_id': {'$in': files_ids}})
+
+    @classmethod
+    def remove_all(cls):
+        """
+        Removes every chunk, staged or not.
+        """
+        cls.__collection().delete_many({})
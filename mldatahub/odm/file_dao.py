@@ -21,6 +21,7 @@
 # MA  02110-1301, USA.
 
 from mldatahub.config.config import global_config
+from mldatahub.odm.file_chunk import FileChunk
 from ming import schema
 from ming.odm import MappedClass, FieldProperty
 
@@ -38,13 +39,19 @@ class FileDAO(MappedClass):
     _id = FieldProperty(schema.ObjectId)
     size = FieldProperty(schema.Int)
     sha256 = FieldProperty(schema.String)
+    # Size of the chunks of the content, for the files stored by chunks. None if the content is stored inline.
+    chunk_size = FieldProperty(schema.Int(if_missing=None))
 
     @property
     def content(self):
+        if self.chunk_size is not None:
+            return FileChunk.get_contents([self._id]).get(self._id, b"")
+
         return FileContentDAO.query.get(_id=self._id).content
 
     def delete(self):
         FileDAO.query.remove({'_id': self._id})
+        FileChunk.remove(self._id)
 
 class FileContentDAO(FileDAO):
     content = FieldProperty(schema.Binary)
@@ -41,6 +41,7 @@ class TokenDAO(MappedClass):
     class __mongometa__:
         session = session
         name = 'token'
+        unique_indexes = [('token_gui',)]
 
     _id = FieldProperty(schema.ObjectId)
     token_gui = FieldProperty(schema.String)
@@ -52,6 +53,8 @@ class TokenDAO(MappedClass):
     end_date = FieldProperty(schema.datetime)
     privileges = FieldProperty(schema.Int)
     url_prefix = FieldProperty(schema.String)
+    read_your_writes = FieldProperty(schema.Bool(if_missing=False))
+    max_access_times = FieldProperty(schema.Int(if_missing=0))
     _datasets= ForeignIdProperty('DatasetDAO', uselist=True)
 
     class DIterator(object):
@@ -75,45 +78,54 @@ class TokenDAO(MappedClass):
 
     def __init__(self, description, max_dataset_count, max_dataset_size, url_prefix, token_gui=None,
                  creation_date=now(), modification_date=now(), end_date=token_future_end(),
-                 privileges=Privileges.RO_WATCH_DATASET):
+                 privileges=Privileges.RO_WATCH_DATASET, read_your_writes=False, max_access_times=0):
 
+        # Uniqueness of the token GUI is guaranteed by the unique index: a duplicated one fails on flush.
         if token_gui is None:
             token_gui = self.generate_token()
-        else:
-            if self.query.get(token_gui=token_uuid) is not None:
-                raise Exception("Specified token GUI already exists.")
 
         kwargs = {k: v for k, v in locals().items() if k not in ["self", "__class__"]}
         super().__init__(**kwargs)
 
     def generate_token(self):
-
-        token_uuid = str(uuid.uuid4().hex)
-        while self.query.get(token_gui=token_uuid) is not None:
-            token_uuid = str(uuid.uuid4().hex)
-
-        return token_uuid
+        return str(uuid.uuid4().hex)
 
     def unlink_dataset(self, dataset):
         return self.unlink_datasets([dataset])
 
     def unlink_datasets(self, datasets):
-        datasets_translated = [d._id for d in datasets]
+        datasets_translated = {d._id for d in datasets}
         self._datasets = [d for d in self._datasets if d not in datasets_translated]
+        self._datasets_ids = None
         return self
 
     def link_dataset(self, dataset):
         return self.link_datasets([dataset])
 
     def link_datasets(self, datasets):
-        self._datasets += [d._id for d in datasets]
+        self._datasets += [d._id for d in datasets if not self.has_dataset(d)]
+        self._datasets_ids = None
         return self
 
+    @property
+    def datasets_ids(self) -> set:
+        """
+        :return: set with the IDs of the datasets linked to this token. It is built once and kept until the links
+        are modified through link_datasets() or unlink_datasets().
+        """
+        datasets_ids = getattr(self, "_datasets_ids", None)
+
+        if datasets_ids is None:
+            datasets_ids = set(self._datasets)
+            self._datasets_ids = datasets_ids
+
+        return datasets_ids
+
     def has_dataset(self, dataset):
         return self.has_dataset_id(dataset._id)
 
     def has_dataset_id(self, dataset_id: ObjectId):
-        return dataset_id in self._datasets
+        return dataset_id in self.datasets_ids
 
     def update(self):
         return session.refresh(self)
@@ -121,7 +133,7 @@ class TokenDAO(MappedClass):
     def serialize(self):
         fields = ["token_gui", "url_prefix", "description", "max_dataset_count",
                   "max_dataset_size", "creation_date",
-                  "modification_date", "end_date", "privileges"]
+                  "modification_date", "end_date", "privileges", "read_your_writes", "max_access_times"]
 
         return {f: str(self[f]) for f in fields}
 
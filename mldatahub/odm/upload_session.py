@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+
+from bson import ObjectId
+from mldatahub.config.config import global_config
+from mldatahub.helper.timing_helper import now
+
+__author__ = 'Iván de Paz Centeno'
+
+
+session = global_config.get_session()
+
+
+class UploadSession(object):
+    """
+    Session of the upload by chunks of the content of an element. Chunks are staged in the storage until the session
+    is committed. Sessions are removed by Mongo once their last activity is older than the "upload_session_ttl" config
+    value.
+    """
+    collection_name = "upload_session"
+
+    @classmethod
+    def __collection(cls):
+        return session.impl.db[cls.collection_name]
+
+    @classmethod
+    def ensure_indexes(cls):
+        """
+        Creates the TTL index of the sessions.
+        """
+        cls.__collection().create_index('date', expireAfterSeconds=global_config.get_upload_session_ttl())
+
+    @classmethod
+    def create(cls, token_id, dataset_id, element_id, size: int, chunk_size: int, sha256: str=None) -> dict:
+        """
+        Opens an upload session for the content of an element.
+        :param token_id: ID of the token that uploads the content. Only this token can access the session.
+        :param dataset_id: ID of the dataset of the element.
+        :param element_id: ID of the element whose content is uploaded.
+        :param size: size in bytes of the whole content.
+        :param chunk_size: size in bytes of every chunk but the last one.
+        :param sha256: SHA256 hash of the whole content, if known beforehand. It is verified on commit.
+        :return: the session, as a dict.
+        """
+        date = now()
+        document = {'_id': ObjectId(), 'token_id': token_id, 'dataset_id': dataset_id, 'element_id': element_id,
+                    'size': size, 'chunk_size': chunk_size, 'sha256': sha256, 'date': date,
+                    'chunks_date': date}
+
+        cls.__collection().insert_one(document)
+
+        return document
+
+    @classmethod
+    def get(cls, upload_id) -> dict:
+        """
+        Retrieves an upload session.
+        :param upload_id: ID of the session.
+        :return: the session as a dict, or None if it does not exist (or expired).
+        """
+        return cls.__collection().find_one({'_id': upload_id})
+
+    @classmethod
+    def chunks_expire_soon(cls, upload: dict) -> bool:
+        """
+        Checks whether the chunks staged by a session must be refreshed, which happens once every half of the TTL.
+        :param upload: the session, as a dict.
+        :return: True if the chunks were refreshed half of the TTL ago or earlier.
+        """
+        return (now() - upload['chunks_date']).total_seconds() >= global_config.get_upload_session_ttl() / 2
+
+    @classmethod
+    def touch(cls, upload_id, chunks_refreshed: bool=False):
+        """
+        Records activity in a session, so that it expires after the TTL since its last chunk rather than since it
+        was opened.
+        :param upload_id: ID of the session.
+        :param chunks_refreshed: whether the chunks staged by the session were refreshed too.
+        """
+        date = now()
+        update = {'date': date}
+
+        if chunks_refreshed:
+            update['chunks_date'] = date
+
+        cls.__collection().update_one({'_id': upload_id}, {'$set': update})
+
+    @classmethod
+    def remove(cls, upload_id):
+        """
+        Removes an upload session, once it is committed or aborted.
+        :param upload_id: ID of the session.
+        """
+        cls.__collection().delete_one({'_id': upload_id})
+
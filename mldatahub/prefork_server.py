@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import os
+from gunicorn.app.base import BaseApplication
+from mldatahub.config.config import global_config
+from mldatahub.log.file_log import file_logger
+
+
+__author__ = "Iván de Paz Centeno"
+
+
+def get_workers_count():
+    """
+    :return: number of worker processes to prefork. A value of 0 in the config means one per CPU core.
+    """
+    workers = int(global_config.get_workers())
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    return workers
+
+
+def post_fork(server, worker):
+    """
+    Gunicorn hook executed inside every worker right after it is forked.
+    The Mongo clients and the threads of the master are not usable in the worker, so they are created again. Then the
+    worker is set up to serve the API; the app itself is built right after this hook, by PreforkServer.load().
+    """
+    from mldatahub.entry_point import setup_process
+
+    global_config.reset_connections()
+    file_logger.after_fork()
+    setup_process()
+
+
+class PreforkServer(BaseApplication):
+    """
+    Embedded gunicorn server that preforks several workers serving the app, each of them with its own thread pool.
+    The master neither imports the API modules nor connects to Mongo: the app is built inside each worker (no
+    preload), so that a SIGHUP to the master reloads the code of the API gracefully and no Mongo client is shared
+    between processes. Workers are recycled after a number of requests.
+    """
+    def __init__(self, app_factory, options=None):
+        self.app_factory = app_factory
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+
+    def load(self):
+        return self.app_factory()
+
+    @classmethod
+    def from_config(cls, app_factory):
+        """
+        Creates the server with the options from the global config. Invalid options are reported here, in the master.
+        :param app_factory: function that builds the WSGI app.
+        :return: PreforkServer instance.
+        """
+        threads = int(global_config.get_threads())
+
+        options = {
+            'bind': "{}:{}".format(global_config.get_host(), global_config.get_port()),
+            'workers': get_workers_count(),
+            'threads': threads,
+            'worker_class': "gthread" if threads > 1 else "sync",
+            'max_requests': int(global_config.get_max_requests()),
+            'max_requests_jitter': int(global_config.get_max_requests_jitter()),
+            'timeout': int(global_config.get_worker_timeout()),
+            'graceful_timeout': int(global_config.get_graceful_timeout()),
+            'preload_app': False,
+            'post_fork': post_fork,
+        }
+
+        return cls(app_factory, options)
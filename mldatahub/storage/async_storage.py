@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from mldatahub.config.config import global_config
+from mldatahub.storage.generic_storage import GenericStorage, File
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class AsyncStorage(object):
+    """
+    Asynchronous counterpart of the GenericStorage, to overlap many storage calls from a single thread.
+    """
+    async def get_file_async(self, file_id) -> File:
+        raise NotImplementedError()
+
+    async def get_files_async(self, files_ids:list) -> list:
+        raise NotImplementedError()
+
+    async def iterate_files_async(self, files_ids:list):
+        raise NotImplementedError()
+        # The yield makes it an asynchronous generator, as the implementations.
+        yield
+
+    def iterate_files(self, files_ids:list):
+        raise NotImplementedError()
+
+    async def put_files_contents_async(self, content_bytes_list:list, force_ids:list=None) -> list:
+        raise NotImplementedError()
+
+    async def stream_file(self, file_id, chunk_size:int=None):
+        raise NotImplementedError()
+        # The yield makes it an asynchronous generator, as the implementations.
+        yield
+
+    def close(self):
+        pass
+
+
+class ExecutorStorage(AsyncStorage):
+    """
+    Adapter that exposes any synchronous storage as an AsyncStorage, by running its calls in a bounded pool of threads.
+    Batch calls are split into smaller batches limited by size, that are run concurrently so that their round trips
+    and their hashing overlap instead of being serialized.
+    """
+    def __init__(self, storage: GenericStorage, max_workers: int, batch_size: int):
+        """
+        :param storage: synchronous storage to adapt.
+        :param max_workers: maximum number of storage calls running at the same time.
+        :param batch_size: byte budget of each of the calls in which batch calls are split. Files bigger than the
+                           budget go alone in their own call.
+        """
+        self.storage = storage
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="storage")
+
+    @staticmethod
+    def __call(func, *args):
+        try:
+            return func(*args)
+        finally:
+            # Each call is a unit of work of its own: the threads of the pool don't serve requests, so nobody else
+            # clears what the storage left in their ODM session.
+            global_config.get_session().clear()
+
+    async def __run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.__call, func, *args)
+
+    def __split(self, items: list, sizes: list) -> list:
+        batches = []
+        batch = []
+        batch_size = 0
+
+        for item, size in zip(items, sizes):
+            if len(batch) > 0 and batch_size + size > self.batch_size:
+                batches.append(batch)
+                batch = []
+                batch_size = 0
+
+            batch.append(item)
+            batch_size += size
+
+        if len(batch) > 0:
+            batches.append(batch)
+
+        return batches
+
+    def __split_files(self, files_ids: list, files_info: dict) -> list:
+        # Sizes are read without the contents, so that the batches are planned before reading anything big.
+        return self.__split(files_ids, [files_info.get(file_id, (None, 0))[1] for file_id in files_ids])
+
+    async def get_file_async(self, file_id) -> File:
+        return await self.__run(self.storage.get_file, file_id)
+
+    async def get_files_async(self, files_ids:list) -> list:
+        """
+        Retrieves multiple files, reading their batches concurrently.
+        :param files_ids: list of IDs of the files.
+        :return: list of File in the same order as the IDs.
+        """
+        files_info = await self.__run(self.storage.get_files_info, files_ids)
+        batches = await asyncio.gather(*[self.__run(self.storage.get_files, batch)
+                                         for batch in self.__split_files(files_ids, files_info)])
+
+        return [file for batch in batches for file in batch]
+
+    async def iterate_files_async(self, files_ids:list):
+        """
+        Retrieves multiple files, reading their batches concurrently and yielding the files as their batches complete,
+        thus not in the order of the IDs. Only as many batches as workers are read at the same time, to bound the
+        memory held by the iteration.
+        :param files_ids: list of IDs of the files.
+        :return: asynchronous generator of File.
+        """
+        files_info = await self.__run(self.storage.get_files_info, files_ids)
+        batches = iter(self.__split_files(files_ids, files_info))
+        pending = set()
+
+        try:
+            while True:
+                # The next batches are requested before handing the completed ones.
+                for batch in islice(batches, self.max_workers - len(pending)):
+                    pending.add(asyncio.ensure_future(self.__run(self.storage.get_files, batch)))
+
+                if len(pending) == 0:
+                    break
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for future in done:
+                    for file in future.result():
+                        yield file
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def iterate_files(self, files_ids:list):
+        """
+        Synchronous counterpart of iterate_files_async(), for the callers that don't run an event loop. Batches are
+        read concurrently in the pool as well, and the iteration can be resumed from any thread.
+        :param files_ids: list of IDs of the files.
+        :return: generator of File.
+        """
+        files_info = self.executor.submit(self.__call, self.storage.get_files_info, files_ids).result()
+        batches = iter(self.__split_files(files_ids, files_info))
+        pending = set()
+
+        try:
+            while True:
+                # The next batches are requested before handing the completed ones.
+                for batch in islice(batches, self.max_workers - len(pending)):
+                    pending.add(self.executor.submit(self.__call, self.storage.get_files, batch))
+
+                if len(pending) == 0:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    for file in future.result():
+                        yield file
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def put_files_contents_async(self, content_bytes_list:list, force_ids:list=None) -> list:
+        """
+        Puts a set of content files in the storage, storing their batches concurrently.
+        :param content_bytes_list: list of binary contents.
+        :param force_ids: list of IDs for each of the contents, or None to generate new IDs.
+        :return: list of IDs of the files in the same order.
+        """
+        if force_ids is not None:
+            return await self.__run(self.storage.put_files_contents, content_bytes_list, force_ids)
+
+        # Repeated contents go to the same batch, otherwise concurrent batches could store them twice.
+        unique_contents = list(dict.fromkeys(content_bytes_list))
+
+        batches = self.__split(unique_contents, [len(content) for content in unique_contents])
+        batches_ids = await asyncio.gather(*[self.__run(self.storage.put_files_contents, batch) for batch in batches])
+
+        id_by_content = {content: file_id for batch, batch_ids in zip(batches, batches_ids)
+                         for content, file_id in zip(batch, batch_ids)}
+
+        return [id_by_content[content] for content in content_bytes_list]
+
+    async def stream_file(self, file_id, chunk_size:int=None):
+        """
+        Iterates over the content of a file by chunks. Each chunk is read as a range of the file when it is requested,
+        thus only one chunk is held at a time.
+        :param file_id: ID of the file.
+        :param chunk_size: size of each chunk. If None, the "upload_chunk_size" config value is used, which is the size
+                           of the chunks in which the storage splits the contents.
+        :raise FileNotFoundError: if the file does not exist.
+        """
+        chunk_size = chunk_size or global_config.get_upload_chunk_size()
+        offset = 0
+
+        while True:
+            file = await self.__run(self.storage.get_file_range, file_id, offset, offset + chunk_size)
+
+            if file is None:
+                raise FileNotFoundError()
+
+            if len(file.content) > 0:
+                yield file.content
+
+            offset += chunk_size
+
+            if offset >= file.size:
+                break
+
+    def close(self):
+        self.executor.shutdown(wait=True)
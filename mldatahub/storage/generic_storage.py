@@ -51,12 +51,39 @@ class GenericStorage(object):
     def get_files(self, file_ids:list) -> list:
         pass
 
+    def get_file_hash(self, file_id) -> str:
+        pass
+
+    def get_files_info(self, files_ids:list) -> dict:
+        pass
+
+    def get_files_by_hash(self, sha256_hashes:list) -> dict:
+        pass
+
+    def get_file_range(self, file_id, start, end) -> File:
+        pass
+
     def put_file_content(self, content_bytes):
         pass
 
     def put_files_contents(self, content_bytes):
         pass
 
+    def put_file_chunk(self, upload_id, index, content_bytes):
+        pass
+
+    def get_file_chunks_sizes(self, upload_id) -> dict:
+        pass
+
+    def touch_file_chunks(self, upload_id):
+        pass
+
+    def put_file_from_chunks(self, upload_id, chunks_count, sha256=None):
+        pass
+
+    def delete_file_chunks(self, upload_id):
+        pass
+
     def delete_file(self, file_id):
         pass
 
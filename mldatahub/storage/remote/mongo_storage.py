@@ -21,11 +21,14 @@
 # MA  02110-1301, USA.
 
 from bson import ObjectId
+from mldatahub.cache.single_flight import SingleFlight
 from mldatahub.config.config import global_config
 from ming.odm.odmsession import ODMCursor
 from mldatahub.log.logger import Logger
+from mldatahub.odm.file_chunk import FileChunk
 from mldatahub.odm.file_dao import FileDAO, FileContentDAO
 from mldatahub.storage.exceptions.file_size_exceeded import FileSizeExceeded
+from mldatahub.storage.exceptions.invalid_chunks import InvalidChunks
 from mldatahub.storage.generic_storage import GenericStorage, File
 import hashlib
 
@@ -48,12 +51,18 @@ class MongoStorage(GenericStorage):
     """
     Represents the storage, backed by MongoDB.
     """
-    def __init__(self):
+    def __init__(self, chunk_size: int=None):
         """
         Constructor of the storage class.
+        :param chunk_size: size in bytes from which contents are stored by chunks of this size. If None, the
+                           "upload_chunk_size" config value is used.
         :return:
         """
         self.session = global_config.get_session()
+        self.chunk_size = chunk_size or global_config.get_upload_chunk_size()
+
+        # Concurrent reads of the same files share a single query.
+        self.reads = SingleFlight()
 
     def __get_hashed_sha256_file(self, sha256_hash: str) -> FileDAO:
         """
@@ -72,6 +81,31 @@ class MongoStorage(GenericStorage):
         """
         return FileDAO.query.find({'sha256': {'$in': sha256_hashes}})
 
+    def __new_file(self, content_bytes: bytes, sha256: str, force_id: ObjectId=None) -> FileDAO:
+        """
+        Creates the file of a content, to be flushed by the caller. Contents bigger than a chunk are stored by chunks,
+        so that a range of them can be read without reading the whole content.
+        :param content_bytes: content of the file.
+        :param sha256: SHA256 hash of the content.
+        :param force_id: ID to put to the file, or None to generate a new one.
+        :return: the FileDAO of the content.
+        """
+        length = len(content_bytes)
+
+        if length <= self.chunk_size:
+            file = FileContentDAO(content=content_bytes, size=length, sha256=sha256)
+        else:
+            file = FileDAO(size=length, sha256=sha256, chunk_size=self.chunk_size)
+
+        if force_id is not None:
+            file._id = force_id
+
+        # The chunks are stored before the file is flushed, as in put_file_from_chunks().
+        if file.chunk_size is not None:
+            FileChunk.put_content(file._id, content_bytes, file.chunk_size)
+
+        return file
+
     def put_file_content(self, content_bytes: bytes, force_id: ObjectId=None) -> ObjectId:
         """
         Puts the content of a file in the storage.
@@ -100,11 +134,7 @@ class MongoStorage(GenericStorage):
                     # We delete it in case to avoid conflicts.
                     self.delete_file(force_id)
 
-            file = FileContentDAO(content=content_bytes, size=length, sha256=sha256)
-
-            if force_id is not None:
-                file._id = force_id
-
+            file = self.__new_file(content_bytes, sha256, force_id)
             self.session.flush()
 
         return file._id
@@ -140,11 +170,7 @@ class MongoStorage(GenericStorage):
             self.delete_files(list(unhashed_content_ids))
 
         for hash, descr in unhashed_content.items():
-            content_bytes = descr['content']
-            file = FileContentDAO(content=content_bytes, size=len(content_bytes), sha256=hash)
-            if descr['force_id'] is not None:
-                file._id = descr['force_id']
-            files.append(file)
+            files.append(self.__new_file(descr['content'], hash, descr['force_id']))
 
         self.session.flush()
 
@@ -156,26 +182,261 @@ class MongoStorage(GenericStorage):
 
         return [file_by_hash[hash_by_content[content]]._id for content in content_bytes_list]
 
+    def put_file_chunk(self, upload_id: ObjectId, index: int, content_bytes: bytes):
+        """
+        Stages a chunk of a content uploaded by parts, until it is turned into a file by put_file_from_chunks().
+        :param upload_id: ID of the upload the chunk belongs to.
+        :param index: index of the chunk within the content.
+        :param content_bytes: content of the chunk.
+        """
+        FileChunk.put(upload_id, index, content_bytes)
+
+    def get_file_chunks_sizes(self, upload_id: ObjectId) -> dict:
+        """
+        Retrieves the chunks staged for an upload.
+        :param upload_id: ID of the upload.
+        :return: associative array with index -> size of the chunk.
+        """
+        return FileChunk.get_sizes(upload_id)
+
+    def touch_file_chunks(self, upload_id: ObjectId):
+        """
+        Refreshes the staged chunks of an upload, so that they don't expire while the upload is active.
+        :param upload_id: ID of the upload.
+        """
+        FileChunk.touch(upload_id)
+
+    def put_file_from_chunks(self, upload_id: ObjectId, chunks_count: int, sha256: str=None) -> ObjectId:
+        """
+        Turns the staged chunks of an upload into a file. The file takes the ID of the upload and keeps the chunks as
+        its content, thus the content is never held as a whole.
+        Chunks are read and hashed one by one. If the content is already stored, the chunks are removed and the stored
+        file is returned instead. If the expected hash is known, this is checked before reading any chunk.
+        :param upload_id: ID of the upload.
+        :param chunks_count: number of chunks of the content.
+        :param sha256: expected SHA256 hash of the content, or None to skip the verification.
+        :return: ID of the file.
+        """
+        chunks_sizes = FileChunk.get_sizes(upload_id)
+        missing_chunks = [index for index in range(chunks_count) if index not in chunks_sizes]
+
+        if len(missing_chunks) > 0:
+            raise InvalidChunks("The following chunks are missing: {}".format(missing_chunks))
+
+        # Ranges of the content are located by the size of its chunks.
+        chunk_size = chunks_sizes.get(0, 0)
+
+        if any(chunks_sizes[index] != chunk_size for index in range(chunks_count - 1)) or \
+                chunks_sizes.get(chunks_count - 1, 0) > chunk_size:
+            raise InvalidChunks("Every chunk but the last one must have the same size, and the last one can't be bigger.")
+
+        length = sum(chunks_sizes[index] for index in range(chunks_count))
+
+        if length >= FILE_SIZE_LIMIT:
+            raise FileSizeExceeded("File size limit of {} Bytes exceeded".format(FILE_SIZE_LIMIT))
+
+        file = None if sha256 is None else self.__get_hashed_sha256_file(sha256)
+
+        if file is None:
+            hasher = hashlib.sha256()
+
+            for chunk in FileChunk.iterate(upload_id, chunks_count):
+                if chunk is None:
+                    raise InvalidChunks("A chunk was removed before the content could be assembled.")
+
+                hasher.update(chunk)
+
+            content_sha256 = hasher.hexdigest()
+
+            if sha256 is not None and content_sha256 != sha256:
+                raise InvalidChunks("The SHA256 hash of the content does not match the expected one.")
+
+            file = self.__get_hashed_sha256_file(content_sha256)
+
+        if file is not None:
+            FileChunk.remove(upload_id)
+            return file._id
+
+        if chunks_count == 0:
+            file = FileContentDAO(content=b"", size=0, sha256=content_sha256)
+            self.session.flush()
+            return file._id
+
+        # The chunks are promoted before the file is created: a failure in between leaves orphan chunks rather than a
+        # file without content.
+        if FileChunk.promote(upload_id, chunks_count) != chunks_count:
+            FileChunk.remove(upload_id)
+            raise InvalidChunks("A chunk was removed before the content could be assembled.")
+
+        file = FileDAO(size=length, sha256=content_sha256, chunk_size=chunk_size)
+        file._id = upload_id
+        self.session.flush()
+
+        return file._id
+
+    def delete_file_chunks(self, upload_id: ObjectId):
+        FileChunk.remove(upload_id)
+
+    def __read_files(self, files_ids: list) -> dict:
+        """
+        Reads the files, joining the read of the same files if it is already in flight. Many clients usually request
+        the same first pages of a dataset at the same time, e.g. when a training job starts.
+        :param files_ids: list of IDs of the files to read.
+        :return: associative array with ID -> File. It is shared by the joined reads, thus it must not be modified.
+        """
+        return self.reads.do(tuple(files_ids), self.__query_files, files_ids)
+
+    def __query_files(self, files_ids: list) -> dict:
+        """
+        Reads the files from the read-only binding (usually the secondaries of the replica set) as raw documents.
+        Files that are not found there (because of the replication lag) are read from the primary.
+        :param files_ids: list of IDs of the files to read.
+        :return: associative array with ID -> File
+        """
+        read_session = global_config.get_read_session()
+
+        files = self.__find_files(read_session.impl.db, files_ids)
+
+        missing_ids = [file_id for file_id in files_ids if file_id not in files]
+
+        if len(missing_ids) > 0 and read_session is not self.session:
+            files.update(self.__find_files(self.session.impl.db, missing_ids))
+
+        return files
+
+    def __find_files(self, db, files_ids: list) -> dict:
+        """
+        Reads the files from a database. The chunks of the files stored by chunks are joined into their content.
+        :param db: pymongo database to read from.
+        :param files_ids: list of IDs of the files to read.
+        :return: associative array with ID -> File
+        """
+        documents = list(db[FileContentDAO.__mongometa__.name].find({'_id': {'$in': files_ids}}))
+
+        chunked_ids = [document['_id'] for document in documents if document.get('chunk_size') is not None]
+        chunked_contents = FileChunk.get_contents(chunked_ids, db) if len(chunked_ids) > 0 else {}
+
+        return {document['_id']: File(document['_id'], chunked_contents.get(document['_id'], document.get('content')),
+                                      document['size']) for document in documents}
+
     def get_file(self, file_id:ObjectId) -> File:
-        file = FileContentDAO.query.get(_id=file_id)
-        return File(file._id, file.content, file.size)
+        return self.__read_files([file_id]).get(file_id)
+
+    def get_file_hash(self, file_id:ObjectId) -> str:
+        """
+        Retrieves the SHA256 hash of a file without reading its content.
+        :param file_id: ID of the file.
+        :return: SHA256 hash string of the content, or None if the file does not exist.
+        """
+        read_session = global_config.get_read_session()
+        collection_name = FileDAO.__mongometa__.name
+
+        document = read_session.impl.db[collection_name].find_one({'_id': file_id}, {'sha256': 1})
+
+        if document is None and read_session is not self.session:
+            document = self.session.impl.db[collection_name].find_one({'_id': file_id}, {'sha256': 1})
+
+        return None if document is None else document['sha256']
+
+    def get_files_info(self, files_ids:list) -> dict:
+        """
+        Retrieves the SHA256 hash and the size of multiple files without reading their content.
+        :param files_ids: list of IDs of the files.
+        :return: associative array with ID -> (SHA256 hash string, size). Files that do not exist are not included.
+        """
+        read_session = global_config.get_read_session()
+        collection_name = FileDAO.__mongometa__.name
+        projection = {'sha256': 1, 'size': 1}
+
+        files_info = {document['_id']: (document['sha256'], document['size'])
+                      for document in read_session.impl.db[collection_name].find({'_id': {'$in': files_ids}}, projection)}
+
+        missing_ids = [file_id for file_id in files_ids if file_id not in files_info]
+
+        if len(missing_ids) > 0 and read_session is not self.session:
+            files_info.update({document['_id']: (document['sha256'], document['size']) for document in
+                               self.session.impl.db[collection_name].find({'_id': {'$in': missing_ids}}, projection)})
+
+        return files_info
+
+    def get_files_by_hash(self, sha256_hashes:list) -> dict:
+        """
+        Retrieves the IDs of the files whose content matches the specified SHA256 hashes, without reading their content.
+        :param sha256_hashes: list of SHA256 hash strings.
+        :return: associative array with SHA256 hash string -> ID. Hashes that are not stored are not included.
+        """
+        read_session = global_config.get_read_session()
+        collection_name = FileDAO.__mongometa__.name
+        projection = {'sha256': 1}
+
+        files_ids = {document['sha256']: document['_id']
+                     for document in read_session.impl.db[collection_name].find({'sha256': {'$in': sha256_hashes}}, projection)}
+
+        missing_hashes = [sha256 for sha256 in sha256_hashes if sha256 not in files_ids]
+
+        if len(missing_hashes) > 0 and read_session is not self.session:
+            files_ids.update({document['sha256']: document['_id'] for document in
+                              self.session.impl.db[collection_name].find({'sha256': {'$in': missing_hashes}}, projection)})
+
+        return files_ids
+
+    def get_file_range(self, file_id:ObjectId, start:int, end:int=None) -> File:
+        """
+        Retrieves a slice of the content of a file. The slice follows the python semantics: end is exclusive and can
+        be None to read until the end of the content. A negative start reads the suffix of the content.
+        Only the chunks that cover the slice are read for the files stored by chunks. The rest of the files are at most
+        one chunk big (unless stored before the contents were split), thus they are read and sliced here.
+        :param file_id: ID of the file.
+        :param start: first byte of the slice.
+        :param end: byte after the last byte of the slice.
+        :return: File with the slice as content and the size of the whole file, or None if the file does not exist.
+        """
+        read_session = global_config.get_read_session()
+        db = read_session.impl.db
+        collection_name = FileContentDAO.__mongometa__.name
+
+        document = db[collection_name].find_one({'_id': file_id})
+
+        if document is None and read_session is not self.session:
+            db = self.session.impl.db
+            document = db[collection_name].find_one({'_id': file_id})
+
+        if document is None:
+            return None
+
+        chunk_size = document.get('chunk_size')
+
+        if chunk_size is None:
+            return File(file_id, document['content'][start:end], document['size'])
+
+        start, end, _ = slice(start, end).indices(document['size'])
+
+        if end <= start:
+            return File(file_id, b"", document['size'])
+
+        first_index = start // chunk_size
+        offset = first_index * chunk_size
+
+        content = FileChunk.get_range(file_id, first_index, (end - 1) // chunk_size, db)
+
+        return File(file_id, content[start - offset:end - offset], document['size'])
 
     def get_files(self, files_ids:list) -> list:
         # We need to ensure the order of the output. It must be the same order as the input
-        file_by_id = {file._id: File(file._id, file.content, file.size) for file in FileContentDAO.query.find({'_id': {'$in' : files_ids}})}
+        file_by_id = self.__read_files(files_ids)
 
         return [file_by_id[id] for id in files_ids]
 
     def delete_file(self, file_id:ObjectId):
-        file = self.get_file(file_id)
-
-        if file is None:
+        if file_id not in self:
             raise FileNotFoundError()
 
-        FileDAO.query.remove({'_id': file.id})
+        FileDAO.query.remove({'_id': file_id})
+        FileChunk.remove(file_id)
 
     def delete_files(self, files_ids:list):
         FileDAO.query.remove({'_id': {'$in': files_ids}})
+        FileChunk.remove_files(files_ids)
 
     def __contains__(self, item):
         return FileDAO.query.get(_id=item) is not None
@@ -198,3 +459,4 @@ class MongoStorage(GenericStorage):
 
     def delete(self):
         FileDAO.query.remove()
+        FileChunk.remove_all()
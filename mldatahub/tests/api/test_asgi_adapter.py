@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+
+from mldatahub.config.config import global_config
+global_config.set_session_uri("mongodb://localhost:27017/unittests")
+import asyncio
+import unittest
+from flask import Flask, Response, jsonify, request, stream_with_context
+from mldatahub.api.asgi_adapter import AsgiAdapter
+
+__author__ = 'Iván de Paz Centeno'
+
+
+def http_scope(method, path, query_string=b"", headers=None):
+    return {'type': "http", 'method': method, 'path': path, 'query_string': query_string, 'headers': headers or [],
+            'http_version': "1.1", 'scheme': "http", 'server': ("localhost", 5555), 'client': ("127.0.0.1", 40000)}
+
+
+def call(app, scope, body_chunks=None):
+    """
+    Runs the ASGI app for a single request.
+    :return: list of messages sent by the app.
+    """
+    body_chunks = body_chunks or [b""]
+    incoming = [{'type': "http.request", 'body': chunk, 'more_body': index < len(body_chunks) - 1}
+                for index, chunk in enumerate(body_chunks)]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if len(incoming) > 0 else {'type': "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+class TestAsgiAdapter(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+
+        @app.route("/echo", methods=["GET", "POST"])
+        def echo():
+            return jsonify({'method': request.method, 'args': request.args.to_dict(), 'body': request.get_data().decode(),
+                            'token': request.headers.get("_tok")})
+
+        session = global_config.get_session()
+        self.identity_maps = []
+
+        @app.route("/stream")
+        def stream():
+            def generate():
+                for i in range(3):
+                    # The request context and the ODM session are kept among the chunks.
+                    self.identity_maps.append(session.imap)
+                    yield "{}{}".format(request.args['prefix'], i).encode()
+
+            self.identity_maps.append(session.imap)
+            return Response(stream_with_context(generate()), mimetype="text/plain")
+
+        @app.teardown_request
+        def teardown(exception=None):
+            self.identity_maps.append(session.imap)
+
+        # Bodies bigger than 4 bytes are spooled to disk.
+        self.adapter = AsgiAdapter(app, max_workers=2, max_request_size=12, spool_size=4)
+
+    def test_requests_are_served(self):
+        """
+        Requests are translated to the WSGI app and its responses are sent back.
+        """
+        sent = call(self.adapter, http_scope("POST", "/echo", b"a=1", [(b"_tok", b"token"), (b"content-type", b"text/plain")]),
+                    [b"hello ", b"world"])
+
+        self.assertEqual(sent[0]['type'], "http.response.start")
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b"content-type", b"application/json"), sent[0]['headers'])
+
+        body = b"".join(message['body'] for message in sent[1:])
+        self.assertEqual(Response(body, mimetype="application/json").json,
+                         {'method': "POST", 'args': {'a': "1"}, 'body': "hello world", 'token': "token"})
+        self.assertFalse(sent[-1].get('more_body', False))
+
+        sent = call(self.adapter, http_scope("GET", "/missing"))
+        self.assertEqual(sent[0]['status'], 404)
+
+    def test_streamed_responses_are_sent_by_chunks(self):
+        """
+        Each chunk of a streamed response is sent as soon as it is generated, within the context of the request.
+        """
+        sent = call(self.adapter, http_scope("GET", "/stream", b"prefix=chunk"))
+
+        chunks = [message['body'] for message in sent[1:] if message.get('more_body', False)]
+        self.assertEqual(chunks, [b"chunk0", b"chunk1", b"chunk2"])
+        self.assertEqual(sent[-1], {'type': "http.response.body", 'body': b""})
+
+        # The handler, the chunks and the teardown of the request share its ODM session, whatever their thread.
+        self.assertGreaterEqual(len(self.identity_maps), 5)
+        self.assertEqual(len({id(identity_map) for identity_map in self.identity_maps}), 1)
+
+        call(self.adapter, http_scope("GET", "/stream", b"prefix=chunk"))
+        self.assertEqual(len({id(identity_map) for identity_map in self.identity_maps}), 2)
+
+    def test_slow_clients_do_not_hold_threads(self):
+        """
+        A thread is not held while a chunk is sent to a slow client: other requests are served meanwhile.
+        """
+        adapter = AsgiAdapter(self.adapter.wsgi_app, max_workers=1)
+        echo_sent = []
+
+        async def serve():
+            stream_sent = []
+            first_chunk_sent = asyncio.Event()
+            client_ready = asyncio.Event()
+
+            async def receive():
+                return {'type': "http.request", 'body': b"", 'more_body': False}
+
+            async def slow_send(message):
+                stream_sent.append(message)
+
+                if message.get('more_body', False) and not first_chunk_sent.is_set():
+                    first_chunk_sent.set()
+                    await client_ready.wait()
+
+            async def send(message):
+                echo_sent.append(message)
+
+            stream = asyncio.ensure_future(adapter(http_scope("GET", "/stream", b"prefix=chunk"), receive, slow_send))
+            await first_chunk_sent.wait()
+
+            # The only thread of the pool is free while the streamed response waits for its client.
+            await asyncio.wait_for(adapter(http_scope("GET", "/echo"), receive, send), 5)
+            client_ready.set()
+            await stream
+
+            return stream_sent
+
+        stream_sent = asyncio.run(serve())
+
+        self.assertEqual(echo_sent[0]['status'], 200)
+        self.assertEqual([message['body'] for message in stream_sent[1:] if message.get('more_body', False)],
+                         [b"chunk0", b"chunk1", b"chunk2"])
+
+    def test_big_requests_are_rejected(self):
+        """
+        Bodies bigger than the maximum request size are answered with a 413.
+        """
+        sent = call(self.adapter, http_scope("POST", "/echo"), [b"0123456", b"789ABC"])
+        self.assertEqual(sent[0]['status'], 413)
+
+    def test_lifespan_is_acknowledged(self):
+        """
+        The startup and shutdown of the server are acknowledged.
+        """
+        incoming = [{'type': "lifespan.startup"}, {'type': "lifespan.shutdown"}]
+        sent = []
+
+        async def receive():
+            return incoming.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.adapter({'type': "lifespan"}, receive, send))
+        self.assertEqual(sent, [{'type': "lifespan.startup.complete"}, {'type': "lifespan.shutdown.complete"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from mldatahub.config.config import global_config
+global_config.set_session_uri("mongodb://localhost:27017/unittests")
+import gzip
+import json
+import unittest
+from flask import Flask, Response, jsonify
+from mldatahub.api.compression import register_compression
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestCompression(unittest.TestCase):
+
+    def setUp(self):
+        app = Flask(__name__)
+        register_compression(app)
+
+        self.listing = [{'_id': str(i), 'title': "element {}".format(i), 'description': "description"} for i in range(100)]
+
+        @app.route("/listing")
+        def listing():
+            response = jsonify(self.listing)
+            response.set_etag("listing")
+            return response
+
+        @app.route("/small")
+        def small():
+            return jsonify({'_id': "0"})
+
+        @app.route("/image")
+        def image():
+            return Response(b"\0" * 4096, mimetype="image/jpeg")
+
+        @app.route("/stream")
+        def stream():
+            return Response((json.dumps(element).encode() for element in self.listing), mimetype="application/json")
+
+        self.client = app.test_client()
+
+    def test_json_is_compressed_when_accepted(self):
+        """
+        JSON responses are compressed only if the client accepts the coding.
+        """
+        response = self.client.get("/listing", headers={'Accept-Encoding': "gzip"})
+
+        self.assertEqual(response.headers['Content-Encoding'], "gzip")
+        self.assertIn("Accept-Encoding", response.headers['Vary'])
+        self.assertEqual(json.loads(gzip.decompress(response.data)), self.listing)
+        self.assertEqual(response.get_etag(), ("listing", True))
+
+        response = self.client.get("/listing")
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.json, self.listing)
+
+        response = self.client.get("/listing", headers={'Accept-Encoding': "gzip;q=0"})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_small_and_disallowed_responses_are_not_compressed(self):
+        """
+        Responses under the size threshold or whose mimetype is not in the allowlist are sent as they are.
+        """
+        response = self.client.get("/small", headers={'Accept-Encoding': "gzip"})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.json, {'_id': "0"})
+
+        response = self.client.get("/image", headers={'Accept-Encoding': "gzip"})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, b"\0" * 4096)
+
+    def test_streams_are_compressed_incrementally(self):
+        """
+        Streamed responses are compressed chunk by chunk.
+        """
+        response = self.client.get("/stream", headers={'Accept-Encoding': "gzip"})
+
+        self.assertEqual(response.headers['Content-Encoding'], "gzip")
+        self.assertNotIn('Content-Length', response.headers)
+        self.assertEqual(gzip.decompress(response.data),
+                         b"".join(json.dumps(element).encode() for element in self.listing))
+
+
+if __name__ == '__main__':
+    unittest.main()
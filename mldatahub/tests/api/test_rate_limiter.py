@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from mldatahub.config.config import global_config
+global_config.set_session_uri("mongodb://localhost:27017/unittests")
+from datetime import timedelta
+from time import sleep
+import unittest
+from mldatahub.api.rate_limiter import TokenBucketRateLimiter, MongoRateLimiter, RATE_LIMITS_COLLECTION, \
+    ACCESS_WINDOWS_COLLECTION
+from mldatahub.helper.timing_helper import now
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.session = global_config.get_session()
+
+    def test_token_bucket_limits_accesses(self):
+        """
+        Token bucket rate limiter allows the max accesses per key within the window, and refills afterwards.
+        """
+        rate_limiter = TokenBucketRateLimiter(0.5, shards_count=4, sync_interval=60)
+
+        self.assertTrue(all(rate_limiter.allow("key1", 5) for _ in range(5)))
+        self.assertFalse(rate_limiter.allow("key1", 5))
+
+        # Other keys have their own bucket
+        self.assertTrue(rate_limiter.allow("key2", 5))
+
+        sleep(0.6)
+        self.assertTrue(all(rate_limiter.allow("key1", 5) for _ in range(5)))
+        self.assertFalse(rate_limiter.allow("key1", 5))
+
+    def test_token_bucket_shares_accesses(self):
+        """
+        Accesses made in other processes are taken from the local buckets on sync.
+        """
+        rate_limiter1 = TokenBucketRateLimiter(60, sync_interval=60)
+        rate_limiter2 = TokenBucketRateLimiter(60, sync_interval=60)
+
+        self.assertTrue(rate_limiter1.allow("key", 10))
+        self.assertTrue(rate_limiter2.allow("key", 10))
+        rate_limiter1.sync()
+        rate_limiter2.sync()
+
+        self.assertTrue(all(rate_limiter2.allow("key", 10) for _ in range(5)))
+        rate_limiter2.sync()
+
+        # rate_limiter1 receives the 6 accesses of rate_limiter2 on sync.
+        rate_limiter1.sync()
+        self.assertTrue(all(rate_limiter1.allow("key", 10) for _ in range(3)))
+        self.assertFalse(rate_limiter1.allow("key", 10))
+
+    def test_token_bucket_rate_limiter_counters_expire(self):
+        """
+        Counters of the accesses are synced in batch and expire after two windows without syncs.
+        """
+        rate_limiter = TokenBucketRateLimiter(60, sync_interval=60)
+
+        self.assertTrue(rate_limiter.allow("key1", 10))
+        self.assertTrue(rate_limiter.allow("key2", 10))
+        self.assertTrue(rate_limiter.allow("key2", 10))
+        rate_limiter.sync()
+
+        counters = {document['_id']: document for document in self.session.impl.db[RATE_LIMITS_COLLECTION].find()}
+
+        self.assertEqual({key: document['accesses'] for key, document in counters.items()}, {'key1': 1, 'key2': 2})
+        self.assertTrue(all(document['expires'] > now() + timedelta(seconds=60) for document in counters.values()))
+
+    def test_token_bucket_syncs_in_background(self):
+        """
+        Accesses are synced by a background thread, not by the requests.
+        """
+        rate_limiter = TokenBucketRateLimiter(60, sync_interval=0.1)
+        collection = self.session.impl.db[RATE_LIMITS_COLLECTION]
+
+        self.assertTrue(rate_limiter.allow("key", 10))
+        sleep(0.2)
+        self.assertIsNone(collection.find_one({'_id': "key"}))
+
+        rate_limiter.start()
+
+        try:
+            sleep(0.3)
+            self.assertEqual(collection.find_one({'_id': "key"})['accesses'], 1)
+        finally:
+            rate_limiter.stop()
+
+        self.assertIsNone(rate_limiter.sync_thread)
+
+    def test_mongo_rate_limiter_limits_accesses(self):
+        """
+        Mongo rate limiter keeps the accesses in the DB, in a window per key.
+        """
+        rate_limiter = MongoRateLimiter(0.5)
+
+        self.assertTrue(all(rate_limiter.allow("key", 5) for _ in range(6)))
+        self.assertFalse(rate_limiter.allow("key", 5))
+
+        # Other keys have their own window
+        self.assertTrue(rate_limiter.allow("key2", 5))
+
+        sleep(0.6)
+        self.assertTrue(rate_limiter.allow("key", 5))
+
+        window = self.session.impl.db[ACCESS_WINDOWS_COLLECTION].find_one({'_id': "key"})
+        self.assertEqual(window['accesses'], 1)
+        self.assertTrue(window['expires'] > now())
+
+    def tearDown(self):
+        self.session.impl.db[RATE_LIMITS_COLLECTION].delete_many({})
+        self.session.impl.db[ACCESS_WINDOWS_COLLECTION].delete_many({})
+
+
+if __name__ == '__main__':
+    unittest.main()
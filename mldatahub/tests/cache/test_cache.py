@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from mldatahub.config.config import global_config
+global_config.set_session_uri("mongodb://localhost:27017/unittests")
+from time import sleep
+import unittest
+from mldatahub.cache.dataset_cache import get_dataset, CachedDataset, dataset_cache
+from mldatahub.cache.token_cache import get_token, CachedToken
+from mldatahub.cache.versioned_cache import VersionedCache, CACHE_VERSIONS_COLLECTION
+from mldatahub.config.privileges import Privileges
+from mldatahub.factory.dataset_factory import DatasetFactory
+from mldatahub.factory.token_factory import TokenFactory
+from mldatahub.odm.dataset_dao import DatasetDAO, DatasetElementDAO
+from mldatahub.odm.token_dao import TokenDAO
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestVersionedCache(unittest.TestCase):
+
+    def setUp(self):
+        self.session = global_config.get_session()
+        self.session.impl.db[CACHE_VERSIONS_COLLECTION].delete_many({})
+
+    def test_cache_entries_expire(self):
+        """
+        Cache keeps the entries during the time to live.
+        """
+        cache = VersionedCache("test", 0.2, 0)
+        cache.put("key", "value", cache.get_generation())
+
+        self.assertEqual(cache.get("key"), "value")
+        self.assertIsNone(cache.get("key2"))
+
+        sleep(0.3)
+        self.assertIsNone(cache.get("key"))
+
+    def test_cache_discards_invalidated_values(self):
+        """
+        Values read before an invalidation are not cached.
+        """
+        cache = VersionedCache("test", 60, 0)
+        generation = cache.get_generation()
+        cache.invalidate(["key"])
+        cache.put("key", "old value", generation)
+
+        self.assertIsNone(cache.get("key"))
+
+    def test_cache_is_invalidated_across_processes(self):
+        """
+        Invalidations done by a process are seen by the rest of processes through the version counter.
+        """
+        cache1 = VersionedCache("test", 60, 0)
+        cache2 = VersionedCache("test", 60, 0)
+
+        cache1.put("key", "value", cache1.get_generation())
+        cache1.put("key2", "value2", cache1.get_generation())
+        cache2.put("key", "value", cache2.get_generation())
+
+        cache1.invalidate(["key"])
+
+        # The process that invalidates keeps the rest of its entries
+        self.assertIsNone(cache1.get("key"))
+        self.assertEqual(cache1.get("key2"), "value2")
+        self.assertIsNone(cache2.get("key"))
+
+    def tearDown(self):
+        self.session.impl.db[CACHE_VERSIONS_COLLECTION].delete_many({})
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.session = global_config.get_session()
+
+    def test_token_cache_is_invalidated_by_factory(self):
+        """
+        Tokens are cached and the modifications done by the factory invalidate them.
+        """
+        admin = TokenDAO("admin", 1, 1, "admin", privileges=Privileges.ADMIN_EDIT_TOKEN + Privileges.ADMIN_DESTROY_TOKEN)
+        token = TokenDAO("token", 1, 1, "user1", privileges=Privileges.RO_WATCH_DATASET)
+        dataset = DatasetDAO("user1/dataset1", "example_dataset", "dataset for testing purposes", "none")
+        self.session.flush()
+
+        cached_token = get_token(token.token_gui)
+        self.assertIsInstance(cached_token, CachedToken)
+        self.assertIs(get_token(token.token_gui), cached_token)
+        self.assertFalse(cached_token.has_dataset(dataset))
+
+        TokenFactory(admin).link_datasets(token.token_gui, [dataset.url_prefix])
+        self.assertTrue(get_token(token.token_gui).has_dataset(dataset))
+
+        TokenFactory(admin).unlink_datasets(token.token_gui, [dataset.url_prefix])
+        self.assertFalse(get_token(token.token_gui).has_dataset(dataset))
+
+        TokenFactory(admin).edit_token(token.token_gui, privileges=Privileges.EDIT_DATASET)
+        self.assertEqual(get_token(token.token_gui).privileges, Privileges.EDIT_DATASET)
+
+        TokenFactory(admin).delete_token(token.token_gui)
+        self.assertIsNone(get_token(token.token_gui))
+
+    def tearDown(self):
+        DatasetDAO.query.remove()
+        TokenDAO.query.remove()
+
+
+class TestDatasetCache(unittest.TestCase):
+
+    def setUp(self):
+        self.session = global_config.get_session()
+
+    def test_dataset_cache_is_invalidated_by_factory(self):
+        """
+        Datasets are cached and the modifications done by the factory invalidate them.
+        """
+        admin = TokenDAO("admin", 1, 1, "admin", privileges=Privileges.ADMIN_EDIT_TOKEN + Privileges.ADMIN_DESTROY_TOKEN +
+                                                            Privileges.ADMIN_CREATE_TOKEN)
+        dataset = DatasetDAO("user1/dataset1", "example_dataset", "dataset for testing purposes", "none", tags=["a"])
+        dataset.add_element("element", "element for testing purposes", None)
+        self.session.flush()
+
+        cached_dataset = get_dataset(dataset.url_prefix)
+        self.assertIsInstance(cached_dataset, CachedDataset)
+        self.assertIs(get_dataset(dataset.url_prefix), cached_dataset)
+        self.assertIs(DatasetFactory(admin).get_dataset(dataset.url_prefix), cached_dataset)
+        self.assertEqual(cached_dataset.serialize(), dataset.serialize())
+        self.assertEqual(len(cached_dataset.elements), 1)
+
+        DatasetFactory(admin).edit_dataset(dataset.url_prefix, title="new title")
+        self.assertEqual(get_dataset(dataset.url_prefix).title, "new title")
+
+        DatasetFactory(admin).fork_dataset(dataset.url_prefix, admin, url_prefix="user1/dataset2")
+        self.assertEqual(get_dataset(dataset.url_prefix).fork_count, 1)
+        self.assertEqual(get_dataset("user1/dataset2").forked_from._id, dataset._id)
+
+        DatasetFactory(admin).destroy_dataset(dataset.url_prefix)
+        self.assertIsNone(get_dataset(dataset.url_prefix))
+
+    def tearDown(self):
+        dataset_cache.invalidate()
+        DatasetDAO.query.remove()
+        DatasetElementDAO.query.remove()
+        TokenDAO.query.remove()
+
+
+if __name__ == '__main__':
+    unittest.main()
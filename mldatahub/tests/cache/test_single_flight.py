@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import sleep
+import unittest
+from mldatahub.cache.single_flight import SingleFlight
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.calls = []
+        self.release = Event()
+
+    def slow_read(self, key):
+        self.calls.append(key)
+        self.release.wait(10)
+
+        if key == "missing":
+            raise KeyError(key)
+
+        return {'key': key}
+
+    def wait_for_joiners(self, count):
+        while self.flight.coalesced < count:
+            sleep(0.01)
+
+    def test_concurrent_calls_are_coalesced(self):
+        """
+        Concurrent calls with the same key share a single execution and its result.
+        """
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(self.flight.do, "page0", self.slow_read, "page0") for _ in range(3)]
+            self.wait_for_joiners(2)
+
+            other = pool.submit(self.flight.do, "page1", self.slow_read, "page1")
+            self.release.set()
+
+            results = [future.result() for future in futures]
+
+        self.assertEqual(sorted(self.calls), ["page0", "page1"])
+        self.assertEqual(results, [{'key': "page0"}] * 3)
+        self.assertIs(results[0], results[1])
+        self.assertEqual(other.result(), {'key': "page1"})
+
+        # Finished calls are not kept: a later call is executed again.
+        self.flight.do("page0", self.slow_read, "page0")
+        self.assertEqual(self.calls.count("page0"), 2)
+        self.assertEqual(self.flight.calls, {})
+
+    def test_exceptions_are_shared(self):
+        """
+        The exception raised by a coalesced call is raised to all the callers.
+        """
+        with ThreadPoolExecutor(2) as pool:
+            futures = [pool.submit(self.flight.do, "missing", self.slow_read, "missing") for _ in range(2)]
+            self.wait_for_joiners(1)
+            self.release.set()
+
+            for future in futures:
+                with self.assertRaises(KeyError):
+                    future.result()
+
+        self.assertEqual(self.calls, ["missing"])
+        self.assertEqual(self.flight.calls, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,14 +23,24 @@
 from mldatahub.config.config import global_config
 global_config.set_session_uri("mongodb://localhost:27017/unittests")
 global_config.set_page_size(2)
+from mldatahub.cache.dataset_cache import dataset_cache
 from mldatahub.factory.dataset_factory import DatasetFactory
 from mldatahub.factory.dataset_element_factory import DatasetElementFactory
-from werkzeug.exceptions import Unauthorized, BadRequest, RequestedRangeNotSatisfiable, NotFound, Conflict
+from werkzeug.exceptions import Unauthorized, BadRequest, RequestedRangeNotSatisfiable, NotFound, Conflict, Gone
 from mldatahub.config.privileges import Privileges
 import unittest
 from mldatahub.odm.dataset_dao import DatasetDAO, DatasetCommentDAO, DatasetElementDAO, DatasetElementCommentDAO
+from mldatahub.odm.dataset_change_log import DatasetChangeLog
+from mldatahub.odm.file_chunk import FileChunk
 from mldatahub.odm.file_dao import FileDAO
 from mldatahub.odm.token_dao import TokenDAO
+from mldatahub.odm.upload_session import UploadSession
+from mldatahub.entry_point import ensure_indexes
+from mldatahub.helper.manifest_helper import decode_manifest
+from mldatahub.helper.zip_helper import stream_zip
+from pyzip import PyZip
+import datetime
+import hashlib
 
 
 __author__ = 'Iván de Paz Centeno'
@@ -42,6 +52,7 @@ class TestDatasetElementFactory(unittest.TestCase):
 
     def setUp(self):
         self.session = global_config.get_session()
+        ensure_indexes()
         DatasetDAO.query.remove()
         DatasetCommentDAO.query.remove()
         DatasetElementDAO.query.remove()
@@ -643,6 +654,18 @@ class TestDatasetElementFactory(unittest.TestCase):
         element_content = DatasetElementFactory(admin, dataset2).get_element_content(element3._id)
         self.assertEqual(element_content, b"content2")
 
+        # The hash of the content is available for its validation
+        content_hash = DatasetElementFactory(admin, dataset2).get_element_content_hash(element3._id)
+        self.assertEqual(content_hash, hashlib.sha256(b"content2").hexdigest())
+
+        # Slices of the content can be retrieved
+        file = DatasetElementFactory(admin, dataset2).get_element_content_range(element3._id, 1, 4)
+        self.assertEqual(file.content, b"ont")
+        self.assertEqual(file.size, len(b"content2"))
+
+        with self.assertRaises(Unauthorized) as ex:
+            file = DatasetElementFactory(admin, dataset2).get_element_content_range(element._id, 1, 4)
+
     def test_dataset_multiple_elements_content_retrieval(self):
         """
         Factory can retrieve content of multiple elements at once.
@@ -676,6 +699,55 @@ class TestDatasetElementFactory(unittest.TestCase):
         self.assertEqual(contents[element._id], b"content1")
         self.assertEqual(contents[element3._id], b"content2")
 
+        # Contents can also be streamed into a zip, one by one.
+        with self.assertRaises(RequestedRangeNotSatisfiable) as ex:
+            contents = DatasetElementFactory(editor, dataset).iterate_elements_content([element._id, element2._id, element3._id])
+
+        contents = DatasetElementFactory(editor, dataset).iterate_elements_content([element._id, element3._id])
+        packet = PyZip().from_bytes(b"".join(stream_zip(contents)))
+
+        self.assertEqual(packet[element._id], b"content1")
+        self.assertEqual(packet[element3._id], b"content2")
+
+    def test_dataset_elements_content_retrieval_by_batches(self):
+        """
+        Factory fetches the contents in concurrent batches limited by size, and elements sharing a content read it once.
+        """
+        editor = TokenDAO("normal user privileged with link", 1, 1, "user1",
+                          privileges=Privileges.RO_WATCH_DATASET
+                          )
+
+        dataset = DatasetDAO("user1/dataset1", "example_dataset", "dataset for testing purposes", "none",
+                             tags=["example", "0"])
+
+        self.session.flush()
+
+        editor = editor.link_dataset(dataset)
+
+        file_id1 = storage.put_file_content(b"content1")
+        file_id2 = storage.put_file_content(b"content22")
+
+        element = DatasetElementDAO("example1", "none", file_id1, dataset=dataset)
+        element2 = DatasetElementDAO("example2", "none", file_id1, dataset=dataset)
+        element3 = DatasetElementDAO("example3", "none", file_id2, dataset=dataset)
+
+        self.session.flush()
+        dataset = dataset.update()
+
+        initial_page_size = global_config.get_page_size()
+        async_storage = global_config.get_async_storage()
+        initial_batch_size = async_storage.batch_size
+        global_config.set_page_size(3)
+
+        try:
+            for budget in [1, 10, 100]:
+                async_storage.batch_size = budget
+                contents = DatasetElementFactory(editor, dataset).get_elements_content([element._id, element2._id, element3._id])
+
+                self.assertEqual(contents, {element._id: b"content1", element2._id: b"content1", element3._id: b"content22"})
+        finally:
+            async_storage.batch_size = initial_batch_size
+            global_config.set_page_size(initial_page_size)
 
     def test_dataset_elements_edit(self):
         """
@@ -721,6 +793,23 @@ class TestDatasetElementFactory(unittest.TestCase):
         self.assertEqual(element3.description, "ffff")
         self.assertEqual(storage.get_file(element3.file_ref_id).content, b"New Content!")
 
+        # Contents can also be edited from an iterable, stored one by one.
+        contents = iter([(element._id, b"content5"), (element3._id, b"content6")])
+
+        with self.assertRaises(RequestedRangeNotSatisfiable) as ex:
+            DatasetElementFactory(editor, dataset).edit_elements_content([element._id, element2._id, element3._id], contents)
+
+        DatasetElementFactory(editor, dataset).edit_elements_content([element._id, element3._id], contents)
+
+        self.session.flush()
+
+        element = element.update()
+        element3 = element3.update()
+
+        self.assertEqual(element.title, "asd6")
+        self.assertEqual(storage.get_file(element.file_ref_id).content, b"content5")
+        self.assertEqual(storage.get_file(element3.file_ref_id).content, b"content6")
+
     def test_clone_element(self):
         """
         Factory can clone elements.
@@ -981,6 +1070,278 @@ class TestDatasetElementFactory(unittest.TestCase):
 
         print(forked_dataset.elements[0].title)
 
+    def test_dataset_manifest(self):
+        """
+        Factory builds the manifest of the dataset for its current version, including the forks sharing elements.
+        """
+        editor = TokenDAO("normal user privileged with link", 100, 200, "user1",
+                     privileges=Privileges.RO_WATCH_DATASET + Privileges.CREATE_DATASET + Privileges.EDIT_DATASET +
+                                Privileges.ADD_ELEMENTS + Privileges.EDIT_ELEMENTS + Privileges.DESTROY_ELEMENTS
+                 )
+
+        main_dataset = DatasetFactory(editor).create_dataset(url_prefix="foobar", title="foo", description="bar",
+                                                             reference="none", tags=["a"])
+        editor = editor.link_dataset(main_dataset)
+
+        elements = DatasetElementFactory(editor, main_dataset).create_elements([{
+            'title': 't{}'.format(i),
+            'description': 'desc{}'.format(i),
+            'http_ref': 'none',
+            'tags': ['none'],
+            'content': "content{}".format(i).encode()
+        } for i in range(3)])
+
+        DatasetElementFactory(editor, main_dataset).create_element(title="t3", description="desc3", http_ref="none")
+
+        manifest = DatasetElementFactory(editor, main_dataset).get_manifest()
+        version, entries = decode_manifest(manifest.content)
+        entries = {element_id: (sha256, size) for element_id, sha256, size, _ in entries}
+
+        self.assertEqual(version, manifest.version)
+        self.assertEqual(len(entries), 4)
+        self.assertEqual(entries[elements[1]._id], (hashlib.sha256(b"content1").hexdigest(), 8))
+        self.assertEqual(len([entry for entry in entries.values() if entry == (None, 0)]), 1)
+
+        # Manifest is kept while the dataset does not change
+        self.assertIs(DatasetElementFactory(editor, main_dataset).get_manifest(), manifest)
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_version(), manifest.version)
+
+        forked_dataset = DatasetFactory(editor).fork_dataset(main_dataset.url_prefix, editor, url_prefix="foo")
+        editor = editor.link_dataset(forked_dataset)
+        self.session.flush()
+
+        fork_manifest = DatasetElementFactory(editor, forked_dataset).get_manifest()
+        self.assertEqual(decode_manifest(fork_manifest.content)[1], decode_manifest(manifest.content)[1])
+
+        # Edition of a shared element clones it in the fork, thus both manifests change.
+        DatasetElementFactory(editor, main_dataset).edit_element(elements[0]._id, content=b"new content")
+
+        self.assertGreater(DatasetElementFactory(editor, main_dataset).get_version(), manifest.version)
+
+        new_manifest = DatasetElementFactory(editor, main_dataset).get_manifest()
+        self.assertGreater(new_manifest.version, manifest.version)
+        new_entries = {element_id: sha256 for element_id, sha256, _, _ in decode_manifest(new_manifest.content)[1]}
+        self.assertEqual(new_entries[elements[0]._id], hashlib.sha256(b"new content").hexdigest())
+        self.assertEqual(new_manifest.entries[elements[1]._id], manifest.entries[elements[1]._id])
+
+        new_fork_manifest = DatasetElementFactory(editor, forked_dataset).get_manifest()
+        self.assertGreater(new_fork_manifest.version, fork_manifest.version)
+        fork_entries = {element_id: sha256 for element_id, sha256, _, _ in decode_manifest(new_fork_manifest.content)[1]}
+        self.assertNotIn(elements[0]._id, fork_entries)
+        self.assertIn(hashlib.sha256(b"content0").hexdigest(), fork_entries.values())
+
+        DatasetElementFactory(editor, main_dataset).destroy_elements([elements[1]._id, elements[2]._id])
+        self.assertEqual(len(decode_manifest(DatasetElementFactory(editor, main_dataset).get_manifest().content)[1]), 2)
+
+    def test_dataset_changes(self):
+        """
+        Factory logs the changes of the elements in every dataset affected, including the forks sharing them.
+        """
+        editor = TokenDAO("normal user privileged with link", 100, 200, "user1",
+                     privileges=Privileges.RO_WATCH_DATASET + Privileges.CREATE_DATASET + Privileges.EDIT_DATASET +
+                                Privileges.ADD_ELEMENTS + Privileges.EDIT_ELEMENTS + Privileges.DESTROY_ELEMENTS
+                 )
+
+        main_dataset = DatasetFactory(editor).create_dataset(url_prefix="foobar", title="foo", description="bar",
+                                                             reference="none", tags=["a"])
+        editor = editor.link_dataset(main_dataset)
+
+        elements = DatasetElementFactory(editor, main_dataset).create_elements([{
+            'title': 't{}'.format(i),
+            'description': 'desc{}'.format(i),
+            'http_ref': 'none',
+            'tags': ['none'],
+        } for i in range(3)])
+
+        version, latest_version, entries = DatasetElementFactory(editor, main_dataset).get_changes(0)
+        self.assertEqual((version, latest_version), (1, 1))
+        self.assertEqual(entries[0]['changes'], [{'op': 'insert', 'element_id': e._id} for e in elements])
+
+        forked_dataset = DatasetFactory(editor).fork_dataset(main_dataset.url_prefix, editor, url_prefix="foo")
+        editor = editor.link_dataset(forked_dataset)
+        self.session.flush()
+
+        self.assertEqual(DatasetElementFactory(editor, forked_dataset).get_changes(0)[2][0]['changes'], [{'op': 'reset'}])
+
+        # Edition from the main dataset replaces the element by a clone in the fork.
+        DatasetElementFactory(editor, main_dataset).edit_element(elements[0]._id, title="new title")
+        clone_id = forked_dataset.get_elements({'_previous_id': elements[0]._id}).first()._id
+
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_changes(1)[2][0]['changes'],
+                         [{'op': 'update', 'element_id': elements[0]._id}])
+        self.assertEqual(DatasetElementFactory(editor, forked_dataset).get_changes(1)[2][0]['changes'],
+                         [{'op': 'remap', 'element_id': elements[0]._id, 'new_id': clone_id}])
+
+        # Edition from the fork replaces the element by a clone in the fork only.
+        DatasetElementFactory(editor, forked_dataset).edit_element(elements[1]._id, title="new title")
+        clone_id = forked_dataset.get_elements({'_previous_id': elements[1]._id}).first()._id
+
+        self.assertEqual(DatasetElementFactory(editor, forked_dataset).get_changes(2)[2][0]['changes'],
+                         [{'op': 'remap', 'element_id': elements[1]._id, 'new_id': clone_id},
+                          {'op': 'update', 'element_id': clone_id}])
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_changes(2)[0], 2)
+
+        # Removal from the main dataset keeps a clone in the fork.
+        DatasetElementFactory(editor, main_dataset).destroy_elements([elements[2]._id])
+        clone_id = forked_dataset.get_elements({'_previous_id': elements[2]._id}).first()._id
+
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_changes(2)[2][0]['changes'],
+                         [{'op': 'delete', 'element_id': elements[2]._id}])
+        self.assertEqual(DatasetElementFactory(editor, forked_dataset).get_changes(3)[2][0]['changes'],
+                         [{'op': 'remap', 'element_id': elements[2]._id, 'new_id': clone_id}])
+
+        with self.assertRaises(BadRequest):
+            DatasetElementFactory(editor, main_dataset).get_changes(4)
+
+        # Expired entries can't be retrieved.
+        changes_collection = self.session.impl.db[DatasetChangeLog.collection_name]
+        changes_collection.delete_many({'dataset_id': main_dataset._id, 'seq': 1})
+
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_changes(1)[0], 3)
+
+        changes_collection.update_many({'dataset_id': main_dataset._id}, {'$set': {'date': datetime.datetime(2017, 1, 1)}})
+
+        with self.assertRaises(Gone):
+            DatasetElementFactory(editor, main_dataset).get_changes(0)
+
+    def test_dataset_elements_content_by_hash(self):
+        """
+        Factory negotiates the contents to upload by hash and lets elements reference the stored ones by their hash.
+        """
+        editor = TokenDAO("normal user privileged with link", 100, 200, "user1",
+                     privileges=Privileges.RO_WATCH_DATASET + Privileges.CREATE_DATASET + Privileges.EDIT_DATASET +
+                                Privileges.ADD_ELEMENTS + Privileges.EDIT_ELEMENTS + Privileges.DESTROY_ELEMENTS
+                 )
+        watcher = TokenDAO("normal user watcher", 100, 200, "user2", privileges=Privileges.RO_WATCH_DATASET)
+
+        main_dataset = DatasetFactory(editor).create_dataset(url_prefix="foobar", title="foo", description="bar",
+                                                             reference="none", tags=["a"])
+        editor = editor.link_dataset(main_dataset)
+        watcher = watcher.link_dataset(main_dataset)
+        self.session.flush()
+
+        element = DatasetElementFactory(editor, main_dataset).create_element(title="t0", description="desc0",
+                                                                            http_ref="none", content=b"content0")
+
+        hashes = [hashlib.sha256("content{}".format(i).encode()).hexdigest() for i in range(3)]
+
+        missing = DatasetElementFactory(editor, main_dataset).get_missing_contents(hashes[:2])
+        self.assertEqual(missing, hashes[1:2])
+
+        with self.assertRaises(RequestedRangeNotSatisfiable):
+            DatasetElementFactory(editor, main_dataset).get_missing_contents(hashes)
+
+        with self.assertRaises(Unauthorized):
+            DatasetElementFactory(watcher, main_dataset).get_missing_contents(hashes[:2])
+
+        # Stored contents are referenced by hash; unknown hashes are refused.
+        element2 = DatasetElementFactory(editor, main_dataset).create_element(title="t1", description="desc1",
+                                                                             content_sha256=hashes[0].upper())
+        self.assertEqual(element2.file_ref_id, element.file_ref_id)
+
+        with self.assertRaises(NotFound):
+            DatasetElementFactory(editor, main_dataset).create_elements([{'title': 't2', 'description': 'desc2',
+                                                                          'content_sha256': hashes[1]}])
+
+        with self.assertRaises(BadRequest):
+            DatasetElementFactory(editor, main_dataset).create_element(title="t2", description="desc2",
+                                                                       content=b"content0", content_sha256=hashes[0])
+
+        elements = DatasetElementFactory(editor, main_dataset).create_elements([
+            {'title': 't2', 'description': 'desc2', 'content': b"content1"},
+            {'title': 't3', 'description': 'desc3', 'content_sha256': hashes[0]},
+        ])
+        self.assertEqual(elements[1].file_ref_id, element.file_ref_id)
+
+        DatasetElementFactory(editor, main_dataset).edit_element(element._id, content_sha256=hashes[1])
+        self.session.flush()
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_element_content(element._id), b"content1")
+
+        DatasetElementFactory(editor, main_dataset).edit_elements({element2._id: {'content_sha256': hashes[1]}})
+        self.session.flush()
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_element_content(element2._id), b"content1")
+
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_missing_contents(hashes[1:]), hashes[2:])
+
+    def test_dataset_element_upload_by_chunks(self):
+        """
+        Factory uploads the content of an element by chunks, that can be resumed and committed.
+        """
+        editor = TokenDAO("normal user privileged with link", 100, 200, "user1",
+                     privileges=Privileges.RO_WATCH_DATASET + Privileges.CREATE_DATASET + Privileges.EDIT_DATASET +
+                                Privileges.ADD_ELEMENTS + Privileges.EDIT_ELEMENTS + Privileges.DESTROY_ELEMENTS
+                 )
+        editor2 = TokenDAO("normal user privileged with link", 100, 200, "user2",
+                     privileges=Privileges.RO_WATCH_DATASET + Privileges.EDIT_ELEMENTS
+                 )
+
+        main_dataset = DatasetFactory(editor).create_dataset(url_prefix="foobar", title="foo", description="bar",
+                                                             reference="none", tags=["a"])
+        editor = editor.link_dataset(main_dataset)
+        editor2 = editor2.link_dataset(main_dataset)
+        self.session.flush()
+
+        element = DatasetElementFactory(editor, main_dataset).create_element(title="t0", description="desc0",
+                                                                            http_ref="none")
+
+        initial_chunk_size = global_config.get_upload_chunk_size()
+        global_config.set_upload_chunk_size(4)
+
+        try:
+            upload = DatasetElementFactory(editor, main_dataset).create_upload(element._id, 10)
+        finally:
+            global_config.set_upload_chunk_size(initial_chunk_size)
+
+        upload_id = upload['_id']
+        self.assertEqual(DatasetElementFactory.get_upload_chunks_count(upload), 3)
+
+        DatasetElementFactory(editor, main_dataset).put_upload_chunk(upload_id, 2, b"89")
+        DatasetElementFactory(editor, main_dataset).put_upload_chunk(upload_id, 0, b"0123")
+
+        with self.assertRaises(BadRequest):
+            DatasetElementFactory(editor, main_dataset).put_upload_chunk(upload_id, 1, b"45")
+
+        with self.assertRaises(RequestedRangeNotSatisfiable):
+            DatasetElementFactory(editor, main_dataset).put_upload_chunk(upload_id, 3, b"")
+
+        # Sessions are private to their token
+        with self.assertRaises(NotFound):
+            DatasetElementFactory(editor2, main_dataset).put_upload_chunk(upload_id, 1, b"4567")
+
+        # Each chunk refreshes the session, and its staged chunks once every half of the TTL
+        db = self.session.impl.db
+        stale_date = datetime.datetime.now() - datetime.timedelta(seconds=global_config.get_upload_session_ttl())
+        db[UploadSession.collection_name].update_one({'_id': upload_id},
+                                                     {'$set': {'date': stale_date, 'chunks_date': stale_date}})
+        db[FileChunk.collection_name].update_many({'file_id': upload_id}, {'$set': {'date': stale_date}})
+
+        DatasetElementFactory(editor, main_dataset).put_upload_chunk(upload_id, 0, b"0123")
+
+        refreshed_upload = UploadSession.get(upload_id)
+        self.assertGreater(refreshed_upload['date'], stale_date)
+        self.assertGreater(refreshed_upload['chunks_date'], stale_date)
+        self.assertTrue(all(chunk['date'] > stale_date for chunk in db[FileChunk.collection_name].find({'file_id': upload_id})))
+
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_upload(upload_id)[1], [0, 2])
+
+        with self.assertRaises(Conflict):
+            DatasetElementFactory(editor, main_dataset).commit_upload(upload_id)
+
+        DatasetElementFactory(editor, main_dataset).put_upload_chunk(upload_id, 1, b"4567")
+        DatasetElementFactory(editor, main_dataset).commit_upload(upload_id)
+        self.session.flush()
+
+        self.assertEqual(DatasetElementFactory(editor, main_dataset).get_element_content(element._id), b"0123456789")
+
+        with self.assertRaises(NotFound):
+            DatasetElementFactory(editor, main_dataset).get_upload(upload_id)
+
+        upload = DatasetElementFactory(editor, main_dataset).create_upload(element._id, 3)
+        DatasetElementFactory(editor, main_dataset).abort_upload(upload['_id'])
+
+        with self.assertRaises(NotFound):
+            DatasetElementFactory(editor, main_dataset).commit_upload(upload['_id'])
+
     def test_dataset_element_serialization(self):
         """
         Tests that the element serialization works correctly
@@ -1018,7 +1379,72 @@ class TestDatasetElementFactory(unittest.TestCase):
 
         self.assertNotIn("previous_id", serial)
 
+    def test_dataset_elements_view_matches_serialization(self):
+        """
+        Factory can retrieve lightweight views of the elements that serialize as the ODM objects.
+        """
+        editor = TokenDAO("normal user privileged with link", 1, 5, "user1",
+                          privileges=Privileges.RO_WATCH_DATASET
+                          )
+
+        dataset = DatasetDAO("user1/dataset1", "example_dataset", "dataset for testing purposes", "none",
+                             tags=["example", "0"])
+
+        self.session.flush()
+
+        editor = editor.link_dataset(dataset)
+
+        elements = [DatasetElementDAO("example{}".format(x), "none", None, tags=["tag{}".format(x)], dataset=dataset) for x in range(2)]
+        elements[0].add_comment("author", "link", "comment1")
+        elements[0].add_comment("author", "link", "comment2")
+
+        self.session.flush()
+        self.session.clear()
+
+        dataset = DatasetDAO.query.get(_id=dataset._id)
+
+        factory = DatasetElementFactory(editor, dataset)
+
+        expected = [element.serialize() for element in factory.get_elements_info(page_size=2)]
+        retrieved = [element.serialize() for element in factory.get_elements_view(page_size=2)]
+
+        self.assertEqual(retrieved, expected)
+        self.assertEqual(retrieved[0]['comments_count'], 2)
+
+        ids = [elements[1]._id, elements[0]._id]
+        expected = [element.serialize() for element in factory.get_specific_elements_info(ids)]
+        retrieved = [element.serialize() for element in factory.get_specific_elements_view(ids)]
+
+        self.assertEqual(retrieved, expected)
+
+    def test_dataset_elements_read_your_writes(self):
+        """
+        Factory serves the reads of read-your-writes tokens from the main session.
+        """
+        reader = TokenDAO("normal user privileged with link", 1, 5, "user1",
+                          privileges=Privileges.RO_WATCH_DATASET)
+        writer = TokenDAO("normal user privileged with link", 1, 5, "user1",
+                          privileges=Privileges.RO_WATCH_DATASET, read_your_writes=True)
+
+        dataset = DatasetDAO("user1/dataset1", "example_dataset", "dataset for testing purposes", "none",
+                             tags=["example", "0"])
+
+        self.session.flush()
+
+        reader = reader.link_dataset(dataset)
+        writer = writer.link_dataset(dataset)
+
+        DatasetElementDAO("example", "none", None, dataset=dataset)
+        self.session.flush()
+
+        self.assertIs(DatasetElementFactory(reader, dataset).read_session, global_config.get_read_session())
+        self.assertIs(DatasetElementFactory(writer, dataset).read_session, self.session)
+        self.assertEqual(writer.serialize()['read_your_writes'], "True")
+
+        self.assertEqual(len(DatasetElementFactory(writer, dataset).get_elements_view(page_size=1)), 1)
+
     def tearDown(self):
+        dataset_cache.invalidate()
         DatasetDAO.query.remove()
         DatasetCommentDAO.query.remove()
         DatasetElementDAO.query.remove()
@@ -25,9 +25,11 @@ global_config.set_session_uri("mongodb://localhost:27017/unittests")
 from werkzeug.exceptions import Unauthorized, BadRequest
 from mldatahub.config.privileges import Privileges
 import unittest
+from mldatahub.cache.dataset_cache import dataset_cache
 from mldatahub.factory.dataset_factory import DatasetFactory
 from mldatahub.odm.dataset_dao import DatasetDAO, DatasetCommentDAO, DatasetElementDAO, DatasetElementCommentDAO
 from mldatahub.odm.token_dao import TokenDAO
+from mldatahub.entry_point import ensure_indexes
 
 
 __author__ = 'Iván de Paz Centeno'
@@ -47,6 +49,7 @@ class TestDatasetFactory(unittest.TestCase):
 
     def setUp(self):
         self.session = global_config.get_session()
+        ensure_indexes()
         DatasetDAO.query.remove()
         DatasetCommentDAO.query.remove()
         DatasetElementDAO.query.remove()
@@ -91,6 +94,10 @@ class TestDatasetFactory(unittest.TestCase):
         self.assertEqual(join_prefixes(creator.url_prefix, "admin"), dataset.url_prefix)
         self.assertEqual(dataset.description, "Dataset example admin")
 
+        # Url prefixes can't be duplicated
+        with self.assertRaises(BadRequest) as ex:
+            dataset = DatasetFactory(admin).create_dataset(url_prefix="user1/admin", title="Admin dataset", description="Dataset example admin", reference="Unknown")
+
     def test_dataset_modification(self):
         """
         Factory can modify datasets
@@ -302,7 +309,31 @@ class TestDatasetFactory(unittest.TestCase):
         with self.assertRaises(Unauthorized) as ex:
             dataset2 = DatasetFactory(creator).create_dataset(url_prefix="creator2", title="Creator dataset2", description="Dataset2 example creator", reference="Unknown")
 
+    def test_datasets_view_matches_serialization(self):
+        """
+        Factory can retrieve lightweight views of the token datasets that serialize as the ODM objects.
+        """
+        creator = TokenDAO("normal user privileged", 2, 10, "user1", privileges=Privileges.CREATE_DATASET + Privileges.RO_WATCH_DATASET)
+
+        dataset = DatasetFactory(creator).create_dataset(url_prefix="creator", title="Creator dataset", description="Dataset example creator", reference="Unknown", tags=["a"])
+        creator = creator.link_dataset(dataset)
+        forked_dataset = DatasetFactory(creator).fork_dataset(dataset.url_prefix, creator, url_prefix="forked")
+        creator = creator.link_dataset(forked_dataset)
+
+        DatasetElementDAO("a", "a", None, "noneaa", ["taga"], dataset=dataset)
+        dataset.add_comment("author", "link", "comment")
+
+        self.session.flush()
+        self.session.clear()
+
+        expected = sorted([d.serialize() for d in creator.datasets], key=lambda d: d['url_prefix'])
+        retrieved = sorted([d.serialize() for d in DatasetFactory(creator).get_datasets_view()], key=lambda d: d['url_prefix'])
+
+        self.assertEqual(retrieved, expected)
+        self.assertEqual(retrieved[1]['fork_father'], dataset.url_prefix)
+
     def tearDown(self):
+        dataset_cache.invalidate()
         DatasetDAO.query.remove()
         DatasetCommentDAO.query.remove()
         DatasetElementDAO.query.remove()
@@ -28,6 +28,7 @@ import unittest
 from mldatahub.odm.dataset_dao import DatasetDAO, DatasetCommentDAO, DatasetElementDAO, DatasetElementCommentDAO
 from mldatahub.factory.token_factory import TokenFactory
 from mldatahub.odm.token_dao import TokenDAO
+from mldatahub.entry_point import ensure_indexes
 
 
 __author__ = 'Iván de Paz Centeno'
@@ -37,6 +38,7 @@ class TestTokenFactory(unittest.TestCase):
 
     def setUp(self):
         self.session = global_config.get_session()
+        ensure_indexes()
         DatasetDAO.query.remove()
         DatasetCommentDAO.query.remove()
         DatasetElementDAO.query.remove()
@@ -126,6 +128,14 @@ class TestTokenFactory(unittest.TestCase):
         self.assertEqual(new_token.privileges, Privileges.ADD_ELEMENTS + Privileges.DESTROY_DATASET +
                                                                 Privileges.ADMIN_CREATE_TOKEN)
 
+        # Token GUIs can't be duplicated
+        with self.assertRaises(BadRequest) as ex:
+            new_token = TokenFactory(token3).create_token(description="example9",
+                                                         max_dataset_count=4,
+                                                         max_dataset_size=4,
+                                                         url_prefix="url1",
+                                                         token_gui=new_token.token_gui)
+
     def test_factory_can_get_tokens(self):
         """
         Factory can retrieve tokens.
@@ -223,6 +233,13 @@ class TestTokenFactory(unittest.TestCase):
         new_token = TokenFactory(token4).edit_token(token_gui=token2.token_gui, url_prefix="new_prefix")
         self.assertEqual("new_prefix", new_token.url_prefix)
 
+        # Token3 should not be able to change the rate limit, but Token4 should
+        with self.assertRaises(Unauthorized):
+            new_token = TokenFactory(token3).edit_token(token_gui=token2.token_gui, max_access_times=100)
+
+        new_token = TokenFactory(token4).edit_token(token_gui=token2.token_gui, max_access_times=100)
+        self.assertEqual(100, new_token.max_access_times)
+
         # token3 should not be allowed to change admin token token4
         with self.assertRaises(Unauthorized) as ex:
             new_token = TokenFactory(token3).edit_token(token_gui=token4.token_gui, description="New description")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import unittest
+from io import BytesIO
+from bson import ObjectId
+from mldatahub.helper.frame_helper import encode_frames, iterate_frames, InvalidFrames
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestFrameHelper(unittest.TestCase):
+
+    def test_frames_can_be_encoded_and_decoded(self):
+        """
+        Frames are read back in the same order, with the IDs available before reading the contents.
+        """
+        entries = [(ObjectId(), b"content1"), (ObjectId(), b""), (ObjectId(), b"content3" * 1000)]
+
+        keys, frames = iterate_frames(BytesIO(encode_frames(entries)))
+
+        self.assertEqual(keys, [element_id for element_id, _ in entries])
+        self.assertEqual(list(frames), entries)
+
+    def test_frames_corruption_is_detected(self):
+        """
+        Truncated frames or contents whose hash mismatches are rejected.
+        """
+        frames = encode_frames([(ObjectId(), b"content1"), (ObjectId(), b"content2")])
+
+        with self.assertRaises(InvalidFrames) as ex:
+            iterate_frames(BytesIO(frames[:-1]))
+
+        with self.assertRaises(InvalidFrames) as ex:
+            iterate_frames(BytesIO(frames[:10]))
+
+        keys, frames = iterate_frames(BytesIO(frames[:-1] + b"X"))
+
+        with self.assertRaises(InvalidFrames) as ex:
+            list(frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import datetime
+import json
+import unittest
+from bson import ObjectId
+from mldatahub.helper import json_helper
+from mldatahub.odm.dataset_view import DatasetElementView
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestJsonHelper(unittest.TestCase):
+
+    def setUp(self):
+        self.encoders = [json_helper.stdlib_dumps]
+
+        if json_helper.orjson is not None:
+            self.encoders.append(json_helper.orjson_dumps)
+
+    def test_ids_and_dates_are_encoded_like_str(self):
+        """
+        IDs and dates are encoded as str() does, whichever the encoder.
+        """
+        element_id = ObjectId()
+        date = datetime.datetime(2017, 11, 27, 10, 44, 0, 201000)
+
+        for dumps in self.encoders:
+            self.assertEqual(json.loads(dumps({'_id': element_id, 'date': date, 'size': 5})),
+                             {'_id': str(element_id), 'date': str(date), 'size': 5})
+
+            with self.assertRaises(TypeError):
+                dumps({'invalid': object()})
+
+    def test_views_are_encoded_by_their_serialization(self):
+        """
+        Lists of views are encoded as the list of their serializations.
+        """
+        date = datetime.datetime(2017, 11, 27, 10, 44, 0, 201000)
+        views = [DatasetElementView({'_id': ObjectId(), 'title': "t{}".format(i), 'description': "d", 'tags': ["a"],
+                                     'addition_date': date, 'modification_date': date}, i) for i in range(3)]
+
+        for dumps in self.encoders:
+            self.assertEqual(json.loads(dumps(views)), [view.serialize() for view in views])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import datetime
+import hashlib
+import unittest
+from bson import ObjectId
+from mldatahub.helper.manifest_helper import encode_manifest, encode_manifest_entry, decode_manifest, InvalidManifest
+
+__author__ = 'Iván de Paz Centeno'
+
+
+class TestManifestHelper(unittest.TestCase):
+
+    def test_manifest_can_be_encoded_and_decoded(self):
+        """
+        Manifest entries are read back with their hashes, sizes and modification dates.
+        """
+        element_id1 = ObjectId()
+        element_id2 = ObjectId()
+        sha256 = hashlib.sha256(b"content").hexdigest()
+        date = datetime.datetime(2017, 11, 27, 10, 44, 0, 201000)
+
+        manifest = encode_manifest(5, [encode_manifest_entry(element_id1, sha256, 7, date),
+                                       encode_manifest_entry(element_id2, None, 0, date)])
+
+        version, entries = decode_manifest(manifest)
+
+        self.assertEqual(version, 5)
+        self.assertEqual(entries, [(element_id1, sha256, 7, 1511779440201), (element_id2, None, 0, 1511779440201)])
+
+    def test_manifest_corruption_is_detected(self):
+        """
+        Truncated manifests are rejected.
+        """
+        manifest = encode_manifest(1, [encode_manifest_entry(ObjectId(), None, 0, datetime.datetime.now())])
+
+        self.assertEqual(decode_manifest(encode_manifest(0, [])), (0, []))
+
+        with self.assertRaises(InvalidManifest):
+            decode_manifest(manifest[:-1])
+
+        with self.assertRaises(InvalidManifest):
+            decode_manifest(manifest[:10])
+
+        with self.assertRaises(InvalidManifest):
+            decode_manifest(b"XXXX" + manifest[4:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+import datetime
+import unittest
+from bson import ObjectId
+from mldatahub.helper import msgpack_helper
+from mldatahub.odm.dataset_view import DatasetElementView
+
+__author__ = 'Iván de Paz Centeno'
+
+
+@unittest.skipIf(msgpack_helper.msgpack is None, "msgpack is not installed")
+class TestMsgpackHelper(unittest.TestCase):
+
+    def test_ids_and_dates_are_packed_natively(self):
+        """
+        IDs and dates are packed in their binary form and read back with their own types. Dates are read back as naive
+        local dates, as the ones of the DB.
+        """
+        element_id = ObjectId()
+        date = datetime.datetime(2017, 11, 27, 10, 44, 0, 201000, tzinfo=datetime.timezone.utc)
+
+        content = msgpack_helper.packb({'_id': element_id, 'date': date, 'content': b"\0\1", element_id: 5})
+        unpacked = msgpack_helper.unpackb(content)
+
+        local_date = date.astimezone().replace(tzinfo=None)
+        self.assertEqual(unpacked, {'_id': element_id, 'date': local_date, 'content': b"\0\1", element_id: 5})
+        self.assertEqual(msgpack_helper.unpackb(msgpack_helper.packb([date, [date]])), [local_date, [local_date]])
+        self.assertEqual(msgpack_helper.unpackb(msgpack_helper.packb(date)), local_date)
+        self.assertLess(len(content), len(str(element_id)) + len(str(date)) + 20)
+
+        with self.assertRaises(TypeError):
+            msgpack_helper.packb({'invalid': object()})
+
+    def test_views_are_packed_by_their_native_serialization(self):
+        """
+        Lists of views are packed as the list of their native serializations.
+        """
+        date = datetime.datetime(2017, 11, 27, 10, 44, 0, 201000)
+        views = [DatasetElementView({'_id': ObjectId(), 'title': "t{}".format(i), 'description': "d", 'tags': ["a"],
+                                     'addition_date': date, 'modification_date': date}, i) for i in range(3)]
+
+        unpacked = msgpack_helper.unpackb(msgpack_helper.packb(views))
+
+        self.assertEqual([element['_id'] for element in unpacked], [view._id for view in views])
+        self.assertEqual(unpacked[0]['addition_date'], date)
+        self.assertEqual(unpacked[2]['comments_count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
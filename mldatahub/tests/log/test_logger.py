@@ -85,6 +85,24 @@ class TestFileLogger(unittest.TestCase):
 
         self.assertIn("\r[INFO] [MAIN] HELLO1\n\r[DEBUG] [MAIN] HELLO2\n\r[ERROR] [MAIN] HELLO3\n\r[WARNING] [MAIN] HELLO4", self.pf['file.log'].decode())
 
+    def test_file_logger_restarts_after_fork(self):
+        """
+        Logger keeps storing lines in the file after its storer thread is recreated, as done in forked workers.
+        :return:
+        """
+        logger = Logger(show_timestamp=False, verbosity_level=verbose_levels.DEBUG, log_file="file.log")
+        logger.file_logger.after_fork()
+        logger.info("HELLO1")
+        logger.file_logger.finish(True)
+
+        # The storer thread is finished: a forked worker starts it again.
+        logger.file_logger.after_fork()
+        logger.info("HELLO2")
+        logger.file_logger.finish(True)
+
+        self.assertIn("\r[INFO] [MAIN] HELLO1", self.pf['file.log'].decode())
+        self.assertIn("\r[INFO] [MAIN] HELLO2", self.pf['file.log'].decode())
+
     def tearDown(self):
         del self.pf['file.log']
 
@@ -23,15 +23,18 @@
 __author__ = 'Iván de Paz Centeno'
 
 import unittest
+from pymongo.errors import DuplicateKeyError
 from mldatahub.config.config import global_config
 global_config.set_session_uri("mongodb://localhost:27017/unittests")
 from mldatahub.odm.dataset_dao import DatasetDAO, DatasetCommentDAO, DatasetElementDAO, DatasetElementCommentDAO
+from mldatahub.entry_point import ensure_indexes
 
 
 class TestDatasetODM(unittest.TestCase):
 
     def setUp(self):
         self.session = global_config.get_session()
+        ensure_indexes()
         DatasetDAO.query.remove()
         DatasetCommentDAO.query.remove()
         DatasetElementDAO.query.remove()
@@ -249,8 +252,10 @@ class TestDatasetODM(unittest.TestCase):
         """
         dataset = DatasetDAO("ip/asd5", "example5", "desc", "none")
         self.session.flush()
-        with self.assertRaises(Exception) as ex:
-            dataset2 = DatasetDAO("ip/asd5", "example5", "desc", "none")
+        dataset2 = DatasetDAO("ip/asd5", "example5", "desc", "none")
+        with self.assertRaises(DuplicateKeyError) as ex:
+            self.session.flush()
+        self.session.expunge(dataset2)
 
     def test_url_prefix_can_be_reutilized_on_delete(self):
         """
@@ -258,10 +263,12 @@ class TestDatasetODM(unittest.TestCase):
         :return:
         """
         dataset = DatasetDAO("ip/asd5", "example6", "desc", "none")
+        self.session.flush()
 
         dataset.delete()
 
         dataset2 = DatasetDAO("ip/asd5", "example6", "desc", "none")
+        self.session.flush()
         self.assertEqual(dataset2.url_prefix, "ip/asd5")
 
     def test_dataset_tags_allow_dicts(self):
@@ -27,12 +27,14 @@ from mldatahub.config.config import global_config
 global_config.set_session_uri("mongodb://localhost:27017/unittests")
 from mldatahub.odm.dataset_dao import DatasetDAO
 from mldatahub.odm.token_dao import TokenDAO
+from mldatahub.entry_point import ensure_indexes
 
 
 class TestTokenODM(unittest.TestCase):
 
     def setUp(self):
         self.session = global_config.get_session()
+        ensure_indexes()
 
     def test_token_can_be_created_and_destroyed(self):
         """
@@ -70,6 +72,31 @@ class TestTokenODM(unittest.TestCase):
         token1 = token1.unlink_dataset(dataset2)
         self.assertEqual(len(token1.datasets), 1)
 
+    def test_token_datasets_membership(self):
+        """
+        Tests that the membership of datasets is kept consistent with the links of the token.
+        :return:
+        """
+        token = TokenDAO("example_token", 2, 5, "dalap")
+
+        dataset1 = DatasetDAO("ex/ivan", "example1", "lalala", "none")
+        dataset2 = DatasetDAO("ex/ivan2", "example2", "lalala", "none")
+
+        token = token.link_datasets([dataset1])
+        self.assertTrue(token.has_dataset(dataset1))
+        self.assertFalse(token.has_dataset(dataset2))
+
+        # Linking twice the same dataset does not duplicate it.
+        token = token.link_datasets([dataset1, dataset2])
+        self.session.flush()
+
+        self.assertEqual(len(token._datasets), 2)
+        self.assertEqual(token.datasets_ids, {dataset1._id, dataset2._id})
+
+        token = token.unlink_dataset(dataset1)
+        self.assertFalse(token.has_dataset(dataset1))
+        self.assertTrue(token.has_dataset(dataset2))
+
     def tearDown(self):
         DatasetDAO.query.remove()
         TokenDAO.query.remove()
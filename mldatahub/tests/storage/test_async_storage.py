@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#
+# MLDataHub
+# Copyright (C) 2017 Iván de Paz Centeno <ipazc@unileon.es>.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; version 3
+# of the License or (at your option) any later version of
+# the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston,
+# MA  02110-1301, USA.
+
+__author__ = 'Iván de Paz Centeno'
+import asyncio
+import unittest
+from mldatahub.config.config import global_config
+global_config.set_session_uri("mongodb://localhost:27017/unittests")
+from mldatahub.odm.file_chunk import FileChunk
+from mldatahub.odm.file_dao import FileDAO
+from mldatahub.storage.remote.mongo_storage import MongoStorage
+from mldatahub.storage.async_storage import AsyncStorage, ExecutorStorage
+from bson import ObjectId
+
+
+class TestExecutorStorage(unittest.TestCase):
+
+    def setUp(self):
+        # Two of the contents fit in a batch.
+        self.storage = ExecutorStorage(MongoStorage(), max_workers=3, batch_size=16)
+
+    def test_files_are_put_and_read_by_batches(self):
+        """
+        Batch calls return the same results in the same order, even if they are split in concurrent calls.
+        """
+        contents = [b"content1", b"content2", b"content1", b"content3", b"content4", b"content2"]
+
+        files_ids = asyncio.run(self.storage.put_files_contents_async(contents))
+
+        self.assertEqual(len(files_ids), 6)
+        self.assertEqual(files_ids[0], files_ids[2])
+        self.assertEqual(files_ids[1], files_ids[5])
+        self.assertEqual(len(set(files_ids)), 4)
+        self.assertEqual(FileDAO.query.find().count(), 4)
+
+        files = asyncio.run(self.storage.get_files_async(files_ids))
+        self.assertEqual([file.content for file in files], contents)
+
+        force_ids = [ObjectId(), ObjectId()]
+        files_ids = asyncio.run(self.storage.put_files_contents_async([b"content5", b"content6"], force_ids))
+        self.assertEqual(files_ids, force_ids)
+        self.assertEqual(asyncio.run(self.storage.get_file_async(force_ids[1])).content, b"content6")
+
+    def test_files_are_iterated_as_their_batches_complete(self):
+        """
+        Files are iterated by batches, also from synchronous code, and the iteration can be left halfway.
+        """
+        contents = ["content{}".format(index).encode() for index in range(7)]
+        files_ids = asyncio.run(self.storage.put_files_contents_async(contents))
+
+        async def read_files(files_ids):
+            return {file.id: file.content async for file in self.storage.iterate_files_async(files_ids)}
+
+        self.assertEqual(asyncio.run(read_files(files_ids)), dict(zip(files_ids, contents)))
+
+        files = {file.id: file.content for file in self.storage.iterate_files(files_ids)}
+        self.assertEqual(files, dict(zip(files_ids, contents)))
+
+        iterator = self.storage.iterate_files(files_ids)
+        self.assertIn(next(iterator).content, contents)
+        iterator.close()
+
+        self.assertEqual(list(self.storage.iterate_files([])), [])
+
+    def test_base_storage_is_not_implemented(self):
+        """
+        Streams of the base class follow the same contract as the implementations: they are asynchronous iterators.
+        """
+        async def read_chunks():
+            return [chunk async for chunk in AsyncStorage().stream_file(ObjectId())]
+
+        with self.assertRaises(NotImplementedError):
+            asyncio.run(read_chunks())
+
+    def test_files_are_streamed_by_chunks(self):
+        """
+        The content of a file is streamed by chunks of the requested size, read as ranges of the file.
+        """
+        file_id = asyncio.run(self.storage.put_files_contents_async([b"0123456789"]))[0]
+        empty_file_id = asyncio.run(self.storage.put_files_contents_async([b""]))[0]
+
+        async def read_chunks(file_id, chunk_size):
+            return [chunk async for chunk in self.storage.stream_file(file_id, chunk_size)]
+
+        self.assertEqual(asyncio.run(read_chunks(file_id, 4)), [b"0123", b"4567", b"89"])
+        self.assertEqual(asyncio.run(read_chunks(file_id, None)), [b"0123456789"])
+        self.assertEqual(asyncio.run(read_chunks(empty_file_id, 4)), [])
+
+        # The streamed chunks don't need to match the chunks in which the storage splits the content
+        chunked_storage = ExecutorStorage(MongoStorage(chunk_size=3), max_workers=1, batch_size=16)
+        chunked_file_id = asyncio.run(chunked_storage.put_files_contents_async([b"abcdefghij"]))[0]
+
+        async def read_chunked_file():
+            return [chunk async for chunk in chunked_storage.stream_file(chunked_file_id, 4)]
+
+        try:
+            self.assertEqual(asyncio.run(read_chunked_file()), [b"abcd", b"efgh", b"ij"])
+        finally:
+            chunked_storage.close()
+
+        with self.assertRaises(FileNotFoundError):
+            asyncio.run(read_chunks(ObjectId(), 4))
+
+    def tearDown(self):
+        self.storage.close()
+        FileDAO.query.remove()
+        FileChunk.remove_all()
+
+if __name__ == '__main__':
+    unittest.main()
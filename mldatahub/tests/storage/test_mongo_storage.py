@@ -26,9 +26,12 @@ __author__ = 'Iván de Paz Centeno'
 import unittest
 from mldatahub.config.config import global_config
 global_config.set_session_uri("mongodb://localhost:27017/unittests")
+from mldatahub.odm.file_chunk import FileChunk
 from mldatahub.odm.file_dao import FileDAO, FileContentDAO
 from mldatahub.storage.remote.mongo_storage import MongoStorage
+from mldatahub.storage.exceptions.invalid_chunks import InvalidChunks
 from bson import ObjectId
+import hashlib
 
 
 class TestMongoStorage(unittest.TestCase):
@@ -146,6 +149,67 @@ class TestMongoStorage(unittest.TestCase):
         self.assertEqual(file_id, file_id2)
         self.assertNotEqual(file_id, file_id3)
 
+        # The hash can be retrieved without the content.
+        self.assertEqual(storage.get_file_hash(file_id), hashlib.sha256(content1).hexdigest())
+        self.assertEqual(storage.get_file_hash(file_id3), hashlib.sha256(content2).hexdigest())
+        self.assertIsNone(storage.get_file_hash(ObjectId()))
+
+        files_info = storage.get_files_info([file_id, file_id3, ObjectId()])
+        self.assertEqual(files_info, {file_id: (hashlib.sha256(content1).hexdigest(), len(content1)),
+                                      file_id3: (hashlib.sha256(content2).hexdigest(), len(content2))})
+
+        # Contents can be located by their hash, so that they are not uploaded twice.
+        files_ids = storage.get_files_by_hash([hashlib.sha256(content1).hexdigest(), hashlib.sha256(b"content3").hexdigest()])
+        self.assertEqual(files_ids, {hashlib.sha256(content1).hexdigest(): file_id})
+
+    def test_storage_file_range(self):
+        """
+        Storage can retrieve slices of the content of the files.
+        :return:
+        """
+        storage = MongoStorage()
+        file_id = storage.put_file_content(b"0123456789")
+
+        file = storage.get_file_range(file_id, 2, 5)
+        self.assertEqual(file.content, b"234")
+        self.assertEqual(file.size, 10)
+
+        self.assertEqual(storage.get_file_range(file_id, -3).content, b"789")
+        self.assertEqual(storage.get_file_range(file_id, 7, None).content, b"789")
+        self.assertEqual(storage.get_file_range(file_id, 20).content, b"")
+        self.assertIsNone(storage.get_file_range(ObjectId(), 0, 1))
+
+    def test_storage_chunked_file_range(self):
+        """
+        Storage stores the contents bigger than a chunk by chunks, and reads only the chunks that cover a slice.
+        :return:
+        """
+        storage = MongoStorage(chunk_size=3)
+        content = b"0123456789"
+        file_id = storage.put_file_content(content)
+        files_ids = storage.put_files_contents([b"ab", b"abcdefg"])
+
+        self.assertEqual(storage.get_file_chunks_sizes(file_id), {0: 3, 1: 3, 2: 3, 3: 1})
+        self.assertEqual(storage.get_file_chunks_sizes(files_ids[0]), {})
+        self.assertEqual(storage.get_file_chunks_sizes(files_ids[1]), {0: 3, 1: 3, 2: 1})
+        self.assertEqual([file.content for file in storage.get_files([file_id] + files_ids)],
+                         [content, b"ab", b"abcdefg"])
+
+        for start in range(-12, 12):
+            for end in [None] + list(range(-12, 12)):
+                file = storage.get_file_range(file_id, start, end)
+                self.assertEqual(file.content, content[start:end])
+                self.assertEqual(file.size, 10)
+
+        # Only the chunks covering the slice are read: the first chunk can be read without the others
+        global_config.get_session().impl.db[FileChunk.collection_name].delete_many({'file_id': file_id,
+                                                                                    'index': {'$gt': 0}})
+        self.assertEqual(storage.get_file_range(file_id, 0, 3).content, b"012")
+        self.assertEqual(storage.get_file_range(file_id, 1, 2).content, b"1")
+
+        storage.delete_files(files_ids)
+        self.assertEqual(storage.get_file_chunks_sizes(files_ids[1]), {})
+
     def test_storage_force_ids(self):
         """
         Storage can be forced to set custom ids to files.
@@ -198,8 +262,61 @@ class TestMongoStorage(unittest.TestCase):
         file_ids = storage.put_files_contents([content3, content2, content1], force_ids=[ObjectId("bbbbbbbbbbbbbbbbbbbbbbbb"), ObjectId("bbbbbbbbbbbbbbbbbbbbbbb1"), ObjectId("bbbbbbbbbbbbbbbbbbbbbbb2")])
         self.assertEqual(file_ids, [ObjectId("bbbbbbbbbbbbbbbbbbbbbbbb"), ObjectId("bbbbbbbbbbbbbbbbbbbbbbb1"), ObjectId("bbbbbbbbbbbbbbbbbbbbbbb2")])
 
+    def test_storage_file_from_chunks(self):
+        """
+        Storage stages chunks of a content and keeps them as the content of a file.
+        :return:
+        """
+        storage = MongoStorage()
+        upload_id = ObjectId()
+
+        storage.put_file_chunk(upload_id, 2, b"89")
+        storage.put_file_chunk(upload_id, 0, b"0000")
+        storage.put_file_chunk(upload_id, 0, b"0123")
+
+        self.assertEqual(storage.get_file_chunks_sizes(upload_id), {0: 4, 2: 2})
+
+        with self.assertRaises(InvalidChunks):
+            storage.put_file_from_chunks(upload_id, 3)
+
+        storage.put_file_chunk(upload_id, 1, b"4567")
+
+        with self.assertRaises(InvalidChunks):
+            storage.put_file_from_chunks(upload_id, 3, hashlib.sha256(b"wrong").hexdigest())
+
+        file_id = storage.put_file_from_chunks(upload_id, 3, hashlib.sha256(b"0123456789").hexdigest())
+
+        # The file takes the ID of the upload and keeps its chunks
+        self.assertEqual(file_id, upload_id)
+        self.assertEqual(storage.get_file(file_id).content, b"0123456789")
+        self.assertEqual(storage.get_files([file_id])[0].size, 10)
+        self.assertEqual(FileDAO.query.get(_id=file_id).content, b"0123456789")
+        self.assertEqual(storage.get_file_chunks_sizes(file_id), {0: 4, 1: 4, 2: 2})
+
+        # Contents already stored are deduplicated, and the chunks of the upload are discarded
+        upload_id2 = ObjectId()
+        storage.put_file_chunk(upload_id2, 0, b"01234")
+        storage.put_file_chunk(upload_id2, 1, b"56789")
+        self.assertEqual(storage.put_file_from_chunks(upload_id2, 2), file_id)
+        self.assertEqual(storage.get_file_chunks_sizes(upload_id2), {})
+        self.assertEqual(len(storage), 1)
+
+        # Every chunk but the last one must have the same size
+        upload_id3 = ObjectId()
+        storage.put_file_chunk(upload_id3, 0, b"ab")
+        storage.put_file_chunk(upload_id3, 1, b"cde")
+
+        with self.assertRaises(InvalidChunks):
+            storage.put_file_from_chunks(upload_id3, 2)
+
+        # Removing the file removes its chunks
+        storage.delete_file(file_id)
+        self.assertIsNone(storage.get_file(file_id))
+        self.assertEqual(storage.get_file_chunks_sizes(file_id), {})
+
     def tearDown(self):
         FileDAO.query.remove()
+        FileChunk.remove_all()
 
 if __name__ == '__main__':
     unittest.main()
@@ -22,6 +22,7 @@
 
 __author__ = "Iván de Paz Centeno"
 
-from mldatahub.entry_point import build_app
+from mldatahub.entry_point import setup_process, build_app
 
+setup_process()
 app = build_app()
\ No newline at end of file
@@ -50,6 +50,12 @@ setup(name='mldatahub',
           "flask_restful",
           "ming"
       ],
+      extras_require={
+          "zstd": ["zstandard"],
+          "orjson": ["orjson"],
+          "msgpack": ["msgpack"],
+          "gunicorn": ["gunicorn"]
+      },
       classifiers=[
           'Development Status :: 1 - Planning',
           'Environment :: Console',